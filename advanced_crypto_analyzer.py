@@ -10,17 +10,43 @@
 import pandas as pd
 import numpy as np
 import ta
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 import logging
 from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from config import INDICATOR_COMPACT
+from indicator_engine import LazyIndicatorFrame, add_indicators, compact_frame, warmup_rows
+from analysis_cache import config_hash, default_result_cache, frame_fingerprint, last_closed_timestamp
+
+# 綜合分析的轉折點信號（名稱, 分數），順序與 _comprehensive_analysis 的判斷順序相同；
+# 整段歷史分析以位元遮罩記錄每根K線觸發的信號（第 i 位元為第 i 個信號）
+BULLISH_SIGNALS = (
+    ("MACD金叉出現", 30), ("MACD柱狀圖轉綠", 20), ("RSI超賣區向上反彈", 25), ("RSI接近超賣區反彈", 15),
+    ("K線站回短期均線", 20), ("短期均線多頭排列", 15), ("跌破布林下軌後收回", 25), ("接近布林下軌支撐", 10),
+    ("反彈伴隨放量", 15)
+)
+BEARISH_SIGNALS = (
+    ("MACD死叉出現", 30), ("MACD柱狀圖轉紅", 20), ("RSI超買區向下回調", 25), ("RSI接近超買區回調", 15),
+    ("K線跌破短期均線", 20), ("短期均線空頭排列", 15), ("衝破布林上軌後拉回", 25), ("接近布林上軌壓力", 10),
+    ("高點爆量回調", 15)
+)
+
+# 綜合分析至少需要的指標列數（不足時回傳預設結果）
+MIN_ANALYSIS_ROWS = 50
+
+# 綜合分析的「接近超買/超賣區」：距 config 的 rsi_overbought / rsi_oversold 門檻在此範圍內
+RSI_NEAR_ZONE = 5
+
 class AdvancedCryptoAnalyzer:
     """高級加密貨幣技術分析器"""
     
-    def __init__(self):
+    def __init__(self, result_cache=None):
         self.logger = logging.getLogger('AdvancedCryptoAnalyzer')
+        # 指標框架與分析結果快取（預設為程序內共用）
+        self.result_cache = result_cache if result_cache is not None else default_result_cache
         
         # 技術指標參數配置
         self.config = {
@@ -72,12 +98,22 @@ class AdvancedCryptoAnalyzer:
         # 信號歷史記錄
         self.signal_history = []
         
+        # 使用融合式NumPy引擎計算指標（False時改用 ta 逐項計算）
+        self.use_fused_engine = True
+        # 精簡模式：振盪指標欄位以float32保存（見 indicator_engine.COMPACT_COLUMNS）
+        self.compact_indicators = INDICATOR_COMPACT
+    
     def calculate_all_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """計算所有技術指標"""
         try:
             if df is None or len(df) < 100:
                 self.logger.warning("資料不足，無法計算完整技術指標")
                 return None
+            
+            if self.use_fused_engine and 'volume' in df.columns:
+                df = add_indicators(df, self.config, self.compact_indicators).dropna()
+                self.logger.info(f"✅ 成功計算 {len(df)} 條記錄的所有技術指標（融合引擎）")
+                return df
                 
             df = df.copy()
             
@@ -180,6 +216,8 @@ class AdvancedCryptoAnalyzer:
             
             # 清理NaN值
             df = df.dropna()
+            if self.compact_indicators:
+                df = compact_frame(df)
             
             self.logger.info(f"✅ 成功計算 {len(df)} 條記錄的所有技術指標")
             return df
@@ -188,6 +226,37 @@ class AdvancedCryptoAnalyzer:
             self.logger.error(f"❌ 計算技術指標失敗: {e}")
             return None
     
+    def _result_key(self, kind: str, df: pd.DataFrame, market: str = None, period: int = None):
+        """結果快取的鍵，未指定市場/週期時不使用快取"""
+        if market is None or period is None or df is None or len(df) == 0:
+            return None
+        settings = config_hash(self.config, self.indicator_weights, self.use_fused_engine, self.compact_indicators)
+        return self.result_cache.make_key(kind, market, period, last_closed_timestamp(df, period), settings)
+    
+    def indicator_frame(self, df: pd.DataFrame, market: str = None, period: int = None):
+        """按需計算指標：回傳欄位與 calculate_all_indicators 相同的 LazyIndicatorFrame，
+        指標欄位第一次讀取時才計算（使用 ta 逐項計算時回傳完整的DataFrame）；
+        指定市場與週期時使用結果快取"""
+        key = self._result_key('frame', df, market, period)
+        if key is None:
+            return self._build_indicator_frame(df)
+        return self.result_cache.get_or_compute(key, frame_fingerprint(df), lambda: self._build_indicator_frame(df))
+    
+    def _build_indicator_frame(self, df: pd.DataFrame):
+        try:
+            if not self.use_fused_engine:
+                return self.calculate_all_indicators(df)
+            
+            if df is None or len(df) < 100:
+                self.logger.warning("資料不足，無法計算完整技術指標")
+                return None
+            
+            return LazyIndicatorFrame(df, self.config, warmup=warmup_rows(self.config), compact=self.compact_indicators)
+        
+        except Exception as e:
+            self.logger.error(f"❌ 建立指標框架失敗: {e}")
+            return None
+    
     def analyze_ma_cross_signals(self, df: pd.DataFrame) -> Dict:
         """根據教學模板分析移動平均線信號 - 重點關注多頭排列和均線交叉"""
         try:
@@ -541,11 +610,24 @@ class AdvancedCryptoAnalyzer:
         except Exception as e:
             return {'signal': 'NEUTRAL', 'strength': 0, 'details': f'成交量分析錯誤: {e}'}
     
-    def comprehensive_analysis(self, df: pd.DataFrame, current_price: float) -> Dict:
-        """根據轉折點檢測框架進行多指標交叉確認分析"""
+    def comprehensive_analysis(self, df: pd.DataFrame, current_price: float,
+                               market: str = None, period: int = None) -> Dict:
+        """根據轉折點檢測框架進行多指標交叉確認分析
+        
+        指定市場與週期時，相同K線與價格的分析結果直接由快取取得。
+        """
+        key = self._result_key('analysis', df, market, period)
+        if key is None:
+            return self._comprehensive_analysis(df, current_price)
+        fingerprint = frame_fingerprint(df) + (float(current_price),)
+        return self.result_cache.get_or_compute(
+            key, fingerprint, lambda: self._comprehensive_analysis(df, current_price, market, period))
+    
+    def _comprehensive_analysis(self, df: pd.DataFrame, current_price: float,
+                                market: str = None, period: int = None) -> Dict:
         try:
-            # 計算基礎技術指標
-            df = self.calculate_all_indicators(df)
+            # 計算基礎技術指標（只計算下方實際讀取的欄位）
+            df = self.indicator_frame(df, market, period)
             
             if len(df) < 50:
                 return self._empty_analysis()
@@ -582,11 +664,12 @@ class AdvancedCryptoAnalyzer:
             # 2. RSI 超賣反彈檢測
             rsi = latest.get('rsi', 50)
             prev_rsi = prev.get('rsi', 50)
+            oversold, overbought = self.config['rsi_oversold'], self.config['rsi_overbought']
             
-            if rsi < 30 and rsi > prev_rsi:
+            if rsi < oversold and rsi > prev_rsi:
                 bullish_reversal_signals.append("RSI超賣區向上反彈")
                 total_bullish_score += 25
-            elif rsi < 35 and rsi > prev_rsi + 2:
+            elif rsi < oversold + RSI_NEAR_ZONE and rsi > prev_rsi + 2:
                 bullish_reversal_signals.append("RSI接近超賣區反彈")
                 total_bullish_score += 15
                 
@@ -633,10 +716,10 @@ class AdvancedCryptoAnalyzer:
                 total_bearish_score += 20
                 
             # 2. RSI 超買回調檢測
-            if rsi > 70 and rsi < prev_rsi:
+            if rsi > overbought and rsi < prev_rsi:
                 bearish_reversal_signals.append("RSI超買區向下回調")
                 total_bearish_score += 25
-            elif rsi > 65 and rsi < prev_rsi - 2:
+            elif rsi > overbought - RSI_NEAR_ZONE and rsi < prev_rsi - 2:
                 bearish_reversal_signals.append("RSI接近超買區回調")
                 total_bearish_score += 15
                 
@@ -702,12 +785,7 @@ class AdvancedCryptoAnalyzer:
                 confidence = min(50, 20 + (total_signals * 5) + (abs(net_score) / 10))
                 
             # 交易建議
-            if final_signal in ['STRONG_BUY', 'BUY']:
-                advice = f"檢測到{len(bullish_reversal_signals)}個底部反彈信號：{', '.join(bullish_reversal_signals[:3])}。建議分批進場，設置止損。"
-            elif final_signal in ['STRONG_SELL', 'SELL']:
-                advice = f"檢測到{len(bearish_reversal_signals)}個高點回測信號：{', '.join(bearish_reversal_signals[:3])}。建議減倉或止盈。"
-            else:
-                advice = "轉折點信號不明確，建議觀望等待更明確的多指標確認信號。"
+            advice = self._reversal_advice(final_signal, bullish_reversal_signals, bearish_reversal_signals)
                 
             self.logger.info(f"📊 轉折點分析結果:")
             self.logger.info(f"   底部反彈信號: {len(bullish_reversal_signals)}個 (得分: {total_bullish_score})")
@@ -737,6 +815,158 @@ class AdvancedCryptoAnalyzer:
             self.logger.error(f"❌ 轉折點分析錯誤: {e}")
             return self._get_default_analysis()
     
+    @staticmethod
+    def _reversal_advice(final_signal: str, bullish_signals: List[str], bearish_signals: List[str]) -> str:
+        """依最終信號產生交易建議"""
+        if final_signal in ['STRONG_BUY', 'BUY']:
+            return f"檢測到{len(bullish_signals)}個底部反彈信號：{', '.join(bullish_signals[:3])}。建議分批進場，設置止損。"
+        if final_signal in ['STRONG_SELL', 'SELL']:
+            return f"檢測到{len(bearish_signals)}個高點回測信號：{', '.join(bearish_signals[:3])}。建議減倉或止盈。"
+        return "轉折點信號不明確，建議觀望等待更明確的多指標確認信號。"
+    
+    def comprehensive_analysis_history(self, df: pd.DataFrame, current_price: float = None,
+                                       market: str = None, period: int = None) -> Optional[pd.DataFrame]:
+        """整段歷史的綜合分析：以NumPy布林運算一次算出每根K線的多空分數、信號位元遮罩、建議與置信度
+        
+        每一列等同以該列為最後一根K線、以該列收盤價為目前價格呼叫 comprehensive_analysis
+        （指定 current_price 時用於最後一列），最後一列與逐列路徑的結果完全相同；
+        指標列數不足 MIN_ANALYSIS_ROWS 的前段不輸出。analysis_from_history 可將任一列轉回
+        comprehensive_analysis 的字典格式。
+        """
+        try:
+            frame = self.indicator_frame(df, market, period)
+            if frame is None or len(frame) < MIN_ANALYSIS_ROWS:
+                self.logger.warning("資料不足，無法計算歷史綜合分析")
+                return None
+            
+            # 與逐列路徑讀到的數值型別相同：iloc 取出的一列為單一數值型別時統一轉為float64，否則保留各欄型別
+            native = isinstance(frame, LazyIndicatorFrame) or frame.iloc[-1].dtype == object
+            names = ('macd', 'macd_signal', 'macd_histogram', 'rsi', 'ma7', 'ma25', 'bb_upper', 'bb_middle',
+                     'bb_lower', 'close', 'volume')
+            col = {name: frame[name].to_numpy(dtype=None if native else np.float64) for name in names}
+            prev = {name: np.concatenate((values[:1] * np.nan, values[:-1])) for name, values in col.items()}
+            
+            price = col['close'].astype(np.float64)
+            if current_price is not None:
+                price[-1] = current_price
+            volume = col['volume']
+            avg_volume = np.full(len(volume), np.nan)
+            avg_volume[9:] = sliding_window_view(volume, 10).mean(axis=-1)
+            
+            macd, macd_signal, macd_hist = col['macd'], col['macd_signal'], col['macd_histogram']
+            rsi, ma5, ma10 = col['rsi'], col['ma7'], col['ma25']
+            bb_upper, bb_middle, bb_lower = col['bb_upper'], col['bb_middle'], col['bb_lower']
+            prev_close = prev['close']
+            
+            # 各信號的觸發條件（與 _comprehensive_analysis 的 if/elif 判斷相同）
+            oversold, overbought = self.config['rsi_oversold'], self.config['rsi_overbought']
+            rsi_oversold = (rsi < oversold) & (rsi > prev['rsi'])
+            bb_reclaim = (prev_close < bb_lower) & (price > bb_lower)
+            bullish = np.column_stack([
+                (macd > macd_signal) & (prev['macd'] <= prev['macd_signal']),
+                (macd_hist > 0) & (prev['macd_histogram'] <= 0),
+                rsi_oversold,
+                ~rsi_oversold & (rsi < oversold + RSI_NEAR_ZONE) & (rsi > prev['rsi'] + 2),
+                (price > ma5) & (prev_close <= prev['ma7']),
+                ma5 > ma10,
+                bb_reclaim,
+                ~bb_reclaim & (price < bb_middle) & (price > bb_lower),
+                volume > avg_volume * 1.2
+            ])
+            rsi_overbought = (rsi > overbought) & (rsi < prev['rsi'])
+            bb_reject = (prev_close > bb_upper) & (price < bb_upper)
+            bearish = np.column_stack([
+                (macd < macd_signal) & (prev['macd'] >= prev['macd_signal']),
+                (macd_hist < 0) & (prev['macd_histogram'] >= 0),
+                rsi_overbought,
+                ~rsi_overbought & (rsi > overbought - RSI_NEAR_ZONE) & (rsi < prev['rsi'] - 2),
+                (price < ma5) & (prev_close >= prev['ma7']),
+                ma5 < ma10,
+                bb_reject,
+                ~bb_reject & (price > bb_middle) & (price < bb_upper),
+                (volume > avg_volume * 1.5) & (price < prev_close)
+            ])
+            
+            bits = 1 << np.arange(len(BULLISH_SIGNALS), dtype=np.int64)
+            bullish_score = bullish @ np.array([score for _, score in BULLISH_SIGNALS])
+            bearish_score = bearish @ np.array([score for _, score in BEARISH_SIGNALS])
+            bullish_count = bullish.sum(axis=1)
+            bearish_count = bearish.sum(axis=1)
+            net_score = bullish_score - bearish_score
+            total_signals = bullish_count + bearish_count
+            
+            # 多指標交叉確認（np.select 依序取第一個成立的條件，等同 if/elif）
+            bullish_confirmed = (bullish_count >= 3) & (bullish_score >= 60)
+            bearish_confirmed = (bearish_count >= 3) & (bearish_score >= 60)
+            conditions = [
+                bullish_confirmed & (bullish_count >= 4), bullish_confirmed,
+                bearish_confirmed & (bearish_count >= 4), bearish_confirmed,
+                net_score > 20, net_score < -20
+            ]
+            signal = np.select(conditions, ['STRONG_BUY', 'BUY', 'STRONG_SELL', 'SELL', 'BUY', 'SELL'], 'HOLD')
+            recommendation = np.select(conditions, [
+                '多指標確認底部反彈 - 強烈建議買進', '轉折點信號確認 - 建議買進',
+                '多指標確認高點回測 - 強烈建議賣出', '轉折點信號確認 - 建議賣出',
+                '偏多信號 - 建議買進', '偏空信號 - 建議賣出'
+            ], '信號不明確 - 建議持有觀望')
+            
+            strength = np.abs(net_score)
+            confidence = np.select([total_signals >= 4, total_signals >= 2], [
+                np.minimum(90, 40 + (total_signals * 8) + (strength / 5)),
+                np.minimum(75, 30 + (total_signals * 10) + (strength / 8))
+            ], np.minimum(50, 20 + (total_signals * 5) + (strength / 10)))
+            
+            history = pd.DataFrame({
+                'price': price,
+                'signal': signal.astype(object),
+                'recommendation': recommendation.astype(object),
+                'confidence': np.round(confidence, 1),
+                'bullish_score': bullish_score,
+                'bearish_score': bearish_score,
+                'net_score': net_score,
+                'bullish_count': bullish_count,
+                'bearish_count': bearish_count,
+                'bullish_mask': bullish @ bits,
+                'bearish_mask': bearish @ bits,
+                'macd': macd,
+                'rsi': rsi,
+                'ma7': ma5,
+                'ma25': ma10,
+                'bb_upper': bb_upper,
+                'bb_lower': bb_lower
+            }, index=frame.index)
+            if 'timestamp' in frame.columns:
+                history.insert(0, 'timestamp', frame['timestamp'])
+            return history.iloc[MIN_ANALYSIS_ROWS - 1:]
+        
+        except Exception as e:
+            self.logger.error(f"❌ 歷史綜合分析錯誤: {e}")
+            return None
+    
+    def analysis_from_history(self, history: pd.DataFrame, position: int = -1) -> Dict:
+        """將 comprehensive_analysis_history 的一列轉為 comprehensive_analysis 的字典格式"""
+        row = {name: history[name].iloc[position] for name in history.columns}
+        bullish_signals = [name for bit, (name, _) in enumerate(BULLISH_SIGNALS) if row['bullish_mask'] >> bit & 1]
+        bearish_signals = [name for bit, (name, _) in enumerate(BEARISH_SIGNALS) if row['bearish_mask'] >> bit & 1]
+        price = row['price']
+        return {
+            'signal': row['signal'],
+            'recommendation': row['recommendation'],
+            'confidence': float(row['confidence']),
+            'advice': self._reversal_advice(row['signal'], bullish_signals, bearish_signals),
+            'bullish_signals': bullish_signals,
+            'bearish_signals': bearish_signals,
+            'bullish_score': int(row['bullish_score']),
+            'bearish_score': int(row['bearish_score']),
+            'net_score': int(row['net_score']),
+            'technical_details': {
+                'macd': f"{row['macd']:.2f}",
+                'rsi': f"{row['rsi']:.1f}",
+                'ma_trend': "多頭" if row['ma7'] > row['ma25'] else "空頭",
+                'bb_position': "上軌" if price > row['bb_upper'] else "下軌" if price < row['bb_lower'] else "中軌"
+            }
+        }
+    
     def _detect_bullish_divergence(self, df: pd.DataFrame) -> bool:
         """檢測看漲背離"""
         try:
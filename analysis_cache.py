@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+指標與分析結果快取
+以 (市場, 週期, 最後一根已收盤K線時間, 參數雜湊) 為鍵的LRU快取，
+保存計算好的指標框架與綜合分析結果；新K線收盤時同一市場/週期的舊結果自動失效
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+def config_hash(*configs) -> str:
+    """參數設定的雜湊值（設定改變即視為不同結果）"""
+    text = json.dumps(configs, sort_keys=True, default=str)
+    return hashlib.md5(text.encode('utf-8')).hexdigest()[:12]
+
+def _epoch_seconds(value) -> int:
+    return int(pd.Timestamp(value).timestamp())
+
+def last_closed_timestamp(df: pd.DataFrame, period: int, now: float = None) -> Optional[int]:
+    """最後一根已收盤K線的時間戳（秒），最後一根仍在形成中時取前一根"""
+    if df is None or len(df) == 0 or 'timestamp' not in df.columns:
+        return None
+    now = time.time() if now is None else now
+    last = _epoch_seconds(df['timestamp'].iloc[-1])
+    if last + period * 60 <= now:
+        return last
+    return _epoch_seconds(df['timestamp'].iloc[-2]) if len(df) > 1 else None
+
+def _column_checksum(df: pd.DataFrame, column: str) -> Optional[int]:
+    if column not in df.columns:
+        return None
+    return zlib.crc32(np.ascontiguousarray(df[column].to_numpy()).tobytes())
+
+def frame_fingerprint(df: pd.DataFrame) -> tuple:
+    """K線資料的簡易指紋：筆數、首尾時間、最後一根（可能形成中）的OHLCV，
+    以及時間與收盤價欄位的CRC32（中段缺口修補後指紋也會改變）"""
+    last = df.iloc[-1]
+    values = tuple(float(last[col]) for col in ('open', 'high', 'low', 'close', 'volume') if col in df.columns)
+    first_ts = _epoch_seconds(df['timestamp'].iloc[0]) if 'timestamp' in df.columns else None
+    checksums = (_column_checksum(df, 'timestamp'), _column_checksum(df, 'close'))
+    return (len(df), first_ts) + values + checksums
+
+class IndicatorResultCache:
+    """有容量上限的LRU結果快取"""
+    
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (fingerprint, value)；key = (種類, 市場, 週期, 已收盤時間, 參數雜湊)
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,       # 超過容量被淘汰
+            'invalidations': 0    # 新K線收盤或手動清除而失效
+        }
+    
+    @staticmethod
+    def make_key(kind: str, market: str, period: int, closed_ts: Optional[int], config: str) -> tuple:
+        return (kind, market, period, closed_ts, config)
+    
+    def _invalidate_older(self, key: tuple):
+        """移除同一種類/市場/週期但已收盤時間較舊的結果（需持有鎖）"""
+        kind, market, period, closed_ts, _ = key
+        stale = [k for k in self._entries
+                 if k[:3] == (kind, market, period) and k[3] != closed_ts
+                 and (closed_ts is None or k[3] is None or k[3] < closed_ts)]
+        for k in stale:
+            del self._entries[k]
+        self.stats['invalidations'] += len(stale)
+    
+    def get_or_compute(self, key: tuple, fingerprint: Hashable, compute: Callable[[], Any]) -> Any:
+        """取得快取結果；不存在或指紋不同（形成中K線已變動）時重新計算"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._copy(entry[1])
+            self.stats['misses'] += 1
+        
+        value = compute()
+        if value is None:
+            return None
+        
+        with self._lock:
+            self._invalidate_older(key)
+            self._entries[key] = (fingerprint, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return self._copy(value)
+    
+    @staticmethod
+    def _copy(value):
+        # 分析結果為巢狀dict，回傳深複本避免呼叫者修改到快取內容
+        return copy.deepcopy(value) if isinstance(value, dict) else copy.copy(value)
+    
+    def invalidate(self, market: str = None, period: int = None):
+        """清除快取（可限定市場與週期）"""
+        with self._lock:
+            keys = [k for k in self._entries
+                    if (market is None or k[1] == market) and (period is None or k[2] == period)]
+            for k in keys:
+                del self._entries[k]
+            self.stats['invalidations'] += len(keys)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """取得命中統計"""
+        total = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(self.stats['hits'] / total * 100, 1) if total else 0.0,
+            'size': len(self._entries),
+            'max_entries': self.max_entries
+        }
+
+# 同一程序內所有分析器共用的結果快取
+default_result_cache = IndicatorResultCache()
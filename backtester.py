@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+警報規則回測
+以本地儲存（CandleStore）或錄製（MAX API錄製檔）的K線，重播 CloudMonitor.analyze_alerts /
+_analyze_basic_alerts 的警報規則與 should_send_alert 的冷卻期/每小時上限：
+全部K線的指標與綜合分析一次計算（AdvancedCryptoAnalyzer.comprehensive_analysis_history），
+再依警報模擬進出場（含手續費與滑價），回報損益、勝率、最大回撤與警報數量
+
+與線上監控的差異：每根K線於收盤時評估一次（以收盤價為目前價格），
+指標以整段歷史計算而非最近200根（只影響EMA起點，差異隨K線數量遞減）
+
+使用方式：
+    python backtester.py --candle-store candle_data --market btctwd --period 1 --days 365
+    python backtester.py --recording day.jsonl.gz --market btctwd --period 60 --config monitor_config.json
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from candle_store import CandleStore
+from config import CANDLE_STORE_DIR
+from indicator_graph import indicators_for, node_key
+from max_recorder import recorded_klines
+
+# 與 CloudMonitor.load_config 預設值相同的警報規則（alerts 與 advanced 兩段）
+DEFAULT_RULES = {
+    'macd_crossover': True,
+    'signal_strength_threshold': 70,
+    'rsi_overbought': 80,
+    'rsi_oversold': 20,
+    'cooldown_period': 300,
+    'max_alerts_per_hour': 10,
+    # analyze_alerts 的AI警報門檻與判斷欄位：線上程式讀取分析結果的 recommendation 欄位，
+    # 其內容為中文說明而非信號代碼，因此AI警報不會觸發；設為 'signal' 可評估以信號代碼觸發的效果
+    'ai_confidence_threshold': 65,
+    'ai_signal_field': 'recommendation'
+}
+
+DEFAULT_FEE_RATE = 0.0015   # 單邊手續費率
+DEFAULT_SLIPPAGE = 0.0005   # 成交價相對開盤價的滑價比例
+DEFAULT_CAPITAL = 100000.0
+
+# 警報類型（順序即同一根K線內的處理順序）：(類型, 動作)
+ALERT_TYPES = (
+    ('AI_MULTI_INDICATOR_BUY', 'BUY'),
+    ('AI_MULTI_INDICATOR_SELL', 'SELL'),
+    ('MACD_GOLDEN_CROSS', 'BUY'),
+    ('MACD_DEATH_CROSS', 'SELL'),
+    ('RSI_OVERBOUGHT', 'SELL'),
+    ('RSI_OVERSOLD', 'BUY')
+)
+
+# analyze_alerts 可用的AI信號判斷欄位（rules['ai_signal_field']）
+AI_SIGNAL_FIELDS = ('signal', 'recommendation')
+
+def close_times(df: pd.DataFrame, period: int) -> np.ndarray:
+    """各K線的收盤時間（epoch秒），警報於K線收盤時評估"""
+    return df['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64) + period * 60
+
+def load_monitor_rules(path: str) -> Dict:
+    """由監控設定檔（monitor_config.json）讀取警報規則"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    rules = dict(DEFAULT_RULES)
+    for section in ('alerts', 'advanced'):
+        rules.update({key: value for key, value in config.get(section, {}).items() if key in DEFAULT_RULES})
+    return rules
+
+class AlertBacktester:
+    """以整段K線重播警報規則並模擬交易（只做多）"""
+    
+    def __init__(self, rules: Dict = None, fee_rate: float = DEFAULT_FEE_RATE, slippage: float = DEFAULT_SLIPPAGE,
+                 initial_capital: float = DEFAULT_CAPITAL, analyzer: AdvancedCryptoAnalyzer = None):
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.initial_capital = initial_capital
+        self.analyzer = analyzer or AdvancedCryptoAnalyzer()
+        self.logger = logging.getLogger('AlertBacktester')
+    
+    def alert_inputs(self, df: pd.DataFrame) -> Optional[Dict[str, np.ndarray]]:
+        """警報判斷的逐列輸入（與警報規則無關，參數掃描時可重複使用）：
+        position（K線位置）、綜合分析的 confidence / net_score、各判斷欄位（AI_SIGNAL_FIELDS）的買進/賣出信號，
+        以及基本警報使用的標準MACD(12/26/9)與RSI(14)"""
+        history = self.analyzer.comprehensive_analysis_history(df)
+        if history is None:
+            return None
+        rows = history.index.to_numpy()
+        inputs = {
+            'position': rows,
+            'confidence': history['confidence'].to_numpy(dtype=np.float64),
+            'net_score': history['net_score'].to_numpy(dtype=np.float64)
+        }
+        for field in AI_SIGNAL_FIELDS:
+            values = history[field].to_numpy()
+            inputs[f"{field}_buy"] = np.isin(values, ['STRONG_BUY', 'BUY'])
+            inputs[f"{field}_sell"] = np.isin(values, ['STRONG_SELL', 'SELL'])
+        
+        ctx = indicators_for(df)
+        macd_key = node_key('macd', 12, 26, 9)
+        inputs['macd'] = ctx[f"{macd_key}.macd"][rows]
+        inputs['macd_signal'] = ctx[f"{macd_key}.signal"][rows]
+        inputs['prev_macd'] = ctx[f"{macd_key}.macd"][rows - 1]
+        inputs['prev_signal'] = ctx[f"{macd_key}.signal"][rows - 1]
+        inputs['rsi'] = ctx[node_key('rsi', 14)][rows]
+        return inputs
+    
+    def alert_candidates(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """全部K線的警報候選（未套用冷卻期），欄位：position（K線位置）、type、action、strength"""
+        inputs = self.alert_inputs(df)
+        if inputs is None:
+            return None
+        return self.candidates_from_inputs(inputs)
+    
+    def candidates_from_inputs(self, inputs: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """依警報規則由 alert_inputs 的陣列產生警報候選"""
+        rules = self.rules
+        rows = inputs['position']
+        
+        # AI多重指標警報（analyze_alerts）
+        confidence = inputs['confidence']
+        strength = np.minimum(95, confidence + np.abs(inputs['net_score']))
+        confident = confidence >= rules['ai_confidence_threshold']
+        ai_buy = inputs[f"{rules['ai_signal_field']}_buy"] & confident
+        ai_sell = ~ai_buy & inputs[f"{rules['ai_signal_field']}_sell"] & confident
+        
+        # 基本MACD+RSI警報（AI未產生警報時的後備）
+        macd, signal = inputs['macd'], inputs['macd_signal']
+        prev_macd, prev_signal = inputs['prev_macd'], inputs['prev_signal']
+        rsi = inputs['rsi']
+        basic = ~(ai_buy | ai_sell)
+        golden = basic & rules['macd_crossover'] & (prev_macd <= prev_signal) & (macd > signal)
+        death = basic & rules['macd_crossover'] & ~golden & (prev_macd >= prev_signal) & (macd < signal)
+        overbought = basic & (rsi >= rules['rsi_overbought'])
+        oversold = basic & ~overbought & (rsi <= rules['rsi_oversold'])
+        
+        masks = (ai_buy, ai_sell, golden, death, overbought, oversold)
+        strengths = (strength, strength, 85, 85, 60, 60)
+        parts = []
+        for code, (mask, value) in enumerate(zip(masks, strengths)):
+            hits = np.flatnonzero(mask)
+            parts.append(pd.DataFrame({
+                'position': rows[hits],
+                'code': code,
+                'strength': np.broadcast_to(np.asarray(value, dtype=np.float64), rows.shape)[hits]
+            }))
+        candidates = pd.concat(parts, ignore_index=True).sort_values(['position', 'code'], kind='stable')
+        candidates['type'] = [ALERT_TYPES[code][0] for code in candidates['code']]
+        candidates['action'] = [ALERT_TYPES[code][1] for code in candidates['code']]
+        return candidates.reset_index(drop=True)
+    
+    def filter_alerts(self, candidates: pd.DataFrame, close_times: np.ndarray) -> np.ndarray:
+        """套用 should_send_alert 的冷卻期與每小時上限，回傳實際發送的候選位置"""
+        cooldown = self.rules['cooldown_period']
+        max_per_hour = self.rules['max_alerts_per_hour']
+        last_sent: Dict[int, float] = {}
+        sent = []
+        for i, (position, code) in enumerate(zip(candidates['position'].to_numpy(), candidates['code'].to_numpy())):
+            now = close_times[position]
+            if code in last_sent and now - last_sent[code] < cooldown:
+                continue
+            # 與線上相同：以各類型最後發送時間計算一小時內的警報數
+            if sum(1 for t in last_sent.values() if t > now - 3600) >= max_per_hour:
+                continue
+            last_sent[code] = now
+            sent.append(i)
+        return np.array(sent, dtype=np.int64)
+    
+    def simulate(self, df: pd.DataFrame, alerts: pd.DataFrame) -> Dict:
+        """依警報模擬進出場：買進警報時空手則於下一根開盤買進，賣出警報時持有則於下一根開盤賣出"""
+        opens = df['open'].to_numpy(dtype=np.float64)
+        closes = df['close'].to_numpy(dtype=np.float64)
+        n = len(df)
+        threshold = self.rules['signal_strength_threshold']
+        cash, units = self.initial_capital, 0.0
+        entry = None
+        fees = 0.0
+        trades: List[Dict] = []
+        changes = []  # (K線位置, 現金, 持有數量)：自該根起的部位
+        last_fill = -1
+        
+        for position, action, strength in zip(alerts['position'].to_numpy(), alerts['action'].to_numpy(),
+                                               alerts['strength'].to_numpy()):
+            fill = position + 1
+            if strength < threshold or fill >= n or fill == last_fill:
+                continue
+            if action == 'BUY' and units == 0:
+                price = opens[fill] * (1 + self.slippage)
+                fee = cash * self.fee_rate / (1 + self.fee_rate)
+                units = (cash - fee) / price
+                entry = {'entry_position': int(fill), 'entry_price': float(price), 'cost': float(cash)}
+                fees += fee
+                cash = 0.0
+            elif action == 'SELL' and units > 0:
+                price = opens[fill] * (1 - self.slippage)
+                proceeds = units * price
+                fee = proceeds * self.fee_rate
+                cash = proceeds - fee
+                fees += fee
+                trades.append({**entry, 'exit_position': int(fill), 'exit_price': float(price),
+                               'pnl': float(cash - entry['cost']), 'open': False})
+                units, entry = 0.0, None
+            else:
+                continue
+            last_fill = fill
+            changes.append((fill, cash, units))
+        
+        # 每根K線收盤的權益（持有部位以收盤價計）
+        cash_curve = np.full(n, float(self.initial_capital))
+        units_curve = np.zeros(n)
+        for (start, c, u), (end, _, _) in zip(changes, changes[1:] + [(n, 0, 0)]):
+            cash_curve[start:end] = c
+            units_curve[start:end] = u
+        equity = cash_curve + units_curve * closes
+        
+        if units > 0:
+            # 期末仍持有：以最後收盤價扣除賣出成本估算
+            value = units * closes[-1] * (1 - self.slippage) * (1 - self.fee_rate)
+            trades.append({**entry, 'exit_position': n - 1, 'exit_price': float(closes[-1]),
+                           'pnl': float(value - entry['cost']), 'open': True})
+            final_equity = value
+        else:
+            final_equity = cash
+        
+        peak = np.maximum.accumulate(equity)
+        drawdown = float((equity / peak - 1).min()) if n else 0.0
+        wins = sum(1 for trade in trades if trade['pnl'] > 0)
+        return {
+            'trades': trades,
+            'summary': {
+                'trades': len(trades),
+                'wins': wins,
+                'hit_rate': wins / len(trades) if trades else 0.0,
+                'pnl': float(final_equity - self.initial_capital),
+                'return_pct': float(final_equity / self.initial_capital - 1) * 100,
+                'max_drawdown_pct': drawdown * 100,
+                'fees': float(fees),
+                'final_equity': float(final_equity),
+                'open_position': bool(units > 0),
+                'buy_and_hold_pct': float(closes[-1] / closes[0] - 1) * 100 if n else 0.0
+            }
+        }
+    
+    def run(self, df: pd.DataFrame, period: int) -> Optional[Dict]:
+        """執行回測，回傳報告（summary、alerts、trades）"""
+        try:
+            started = time.perf_counter()
+            df = df.reset_index(drop=True)
+            candidates = self.alert_candidates(df)
+            if candidates is None:
+                self.logger.warning("K線不足，無法回測")
+                return None
+            
+            sent = candidates.iloc[self.filter_alerts(candidates, close_times(df, period))]
+            result = self.simulate(df, sent)
+            
+            timestamps = df['timestamp']
+            for trade in result['trades']:
+                trade['entry_time'] = str(timestamps.iloc[trade['entry_position']])
+                trade['exit_time'] = str(timestamps.iloc[trade['exit_position']])
+            
+            report = {
+                'bars': len(df),
+                'period': period,
+                'start': str(timestamps.iloc[0]),
+                'end': str(timestamps.iloc[-1]),
+                'rules': self.rules,
+                'fee_rate': self.fee_rate,
+                'slippage': self.slippage,
+                'alerts': {
+                    'generated': candidates['type'].value_counts().to_dict(),
+                    'sent': sent['type'].value_counts().to_dict(),
+                    'suppressed': len(candidates) - len(sent)
+                },
+                **result,
+                'seconds': time.perf_counter() - started
+            }
+            summary = report['summary']
+            self.logger.info(f"📈 回測 {len(df)} 根K線：{summary['trades']} 筆交易，勝率 {summary['hit_rate']:.1%}，"
+                             f"報酬 {summary['return_pct']:.2f}%，最大回撤 {summary['max_drawdown_pct']:.2f}%")
+            return report
+        
+        except Exception as e:
+            self.logger.error(f"❌ 回測失敗: {e}")
+            return None
+
+def load_candles(market: str, period: int, candle_store: str = CANDLE_STORE_DIR, recording: str = None,
+                 days: float = None) -> Optional[pd.DataFrame]:
+    """由 CandleStore 或錄製檔取得K線（days 為只取最後幾天）"""
+    if recording:
+        klines = recorded_klines(recording).get((market, period))
+    else:
+        klines = CandleStore(candle_store).range(market, period)
+    if klines is None or klines.empty:
+        return None
+    if days:
+        klines = klines.tail(int(days * 1440 // period))
+    return klines.to_dataframe()
+
+def print_report(report: Dict):
+    summary = report['summary']
+    print(f"📊 回測期間: {report['start']} ~ {report['end']}（{report['bars']} 根 {report['period']} 分鐘K線）")
+    print(f"🔔 警報: 產生 {sum(report['alerts']['generated'].values())}，"
+          f"發送 {sum(report['alerts']['sent'].values())}，冷卻期/上限略過 {report['alerts']['suppressed']}")
+    for alert_type, count in sorted(report['alerts']['sent'].items()):
+        print(f"   {alert_type}: {count}")
+    print(f"💰 損益: {summary['pnl']:,.0f}（{summary['return_pct']:.2f}%），買進持有 {summary['buy_and_hold_pct']:.2f}%")
+    print(f"🎯 交易 {summary['trades']} 筆，勝率 {summary['hit_rate']:.1%}，手續費 {summary['fees']:,.0f}")
+    print(f"📉 最大回撤: {summary['max_drawdown_pct']:.2f}%")
+    print(f"⏱️ 耗時 {report['seconds']:.2f} 秒")
+
+def main():
+    parser = argparse.ArgumentParser(description='警報規則回測')
+    parser.add_argument('--market', default='btctwd')
+    parser.add_argument('--period', type=int, default=1, help='K線週期（分鐘）')
+    parser.add_argument('--candle-store', default=CANDLE_STORE_DIR, help='CandleStore 目錄')
+    parser.add_argument('--recording', help='MAX API錄製檔')
+    parser.add_argument('--days', type=float, help='只回測最後幾天')
+    parser.add_argument('--config', help='監控設定檔（讀取 alerts / advanced 的警報規則）')
+    parser.add_argument('--fee', type=float, default=DEFAULT_FEE_RATE, help='單邊手續費率')
+    parser.add_argument('--slippage', type=float, default=DEFAULT_SLIPPAGE, help='滑價比例')
+    parser.add_argument('--capital', type=float, default=DEFAULT_CAPITAL, help='初始資金')
+    parser.add_argument('--output', help='報告JSON檔')
+    args = parser.parse_args()
+    
+    df = load_candles(args.market, args.period, args.candle_store, args.recording, args.days)
+    if df is None:
+        print(f"❌ 找不到 {args.market} {args.period} 分鐘K線")
+        return
+    
+    rules = load_monitor_rules(args.config) if args.config else None
+    report = AlertBacktester(rules, args.fee, args.slippage, args.capital).run(df, args.period)
+    if report is None:
+        print("❌ 回測失敗")
+        return
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"💾 報告已寫入 {args.output}")
+
+if __name__ == "__main__":
+    main()
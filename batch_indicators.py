@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多市場批次指標計算
+將N個市場的收盤/最高/最低價按最後一根對齊、前段補NaN，堆疊成 (時間, 市場) 二維陣列，
+沿時間軸一次計算全部市場的 EMA / MACD / RSI / 布林帶 / ATR，
+再切回各市場的視圖；數值與 ta 套件（及 MACDAnalyzer.calculate_macd）一致
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicator_kernels import ewm_columns, rolling_columns
+
+# EnhancedMACDAnalyzer.calculate_macd 的指標欄位
+MACD_COLUMNS = ('ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_histogram', 'rsi')
+
+class BatchIndicatorResult:
+    """批次計算結果：arrays[欄位] 為 (時間, 市場) 陣列，各市場的有效資料在最後 lengths[i] 列"""
+    
+    def __init__(self, symbols: List[str], arrays: Dict[str, np.ndarray], lengths: np.ndarray,
+                 frames: Dict[str, pd.DataFrame]):
+        self.symbols = symbols
+        self.arrays = arrays
+        self.lengths = lengths
+        self._frames = frames
+        self._columns = {symbol: i for i, symbol in enumerate(symbols)}
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._columns
+    
+    def view(self, symbol: str) -> Dict[str, np.ndarray]:
+        """取得單一市場的各欄位（二維陣列的一維視圖，不複製）"""
+        i = self._columns[symbol]
+        start = len(next(iter(self.arrays.values()))) - self.lengths[i]
+        return {name: values[start:, i] for name, values in self.arrays.items()}
+    
+    def frame(self, symbol: str, columns=None, dropna: bool = False) -> pd.DataFrame:
+        """原始K線加上指標欄位的DataFrame
+        
+        columns=MACD_COLUMNS、dropna=True 時與 EnhancedMACDAnalyzer.calculate_macd 的輸出相同。
+        """
+        df = self._frames[symbol]
+        view = self.view(symbol)
+        names = list(columns or view)
+        values = np.column_stack([view[name] for name in names])
+        indicators = pd.DataFrame(values, index=df.index, columns=names)
+        overlap = [c for c in names if c in df.columns]
+        base = df.drop(columns=overlap) if overlap else df
+        result = pd.concat([base, indicators], axis=1)
+        if not dropna:
+            return result
+        
+        # 以陣列判斷缺值列，避免對合併後的 DataFrame 做 dropna
+        keep = ~np.isnan(values).any(axis=1) & base.notna().to_numpy().all(axis=1)
+        rows = np.flatnonzero(keep)
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            return result.iloc[rows[0]:rows[-1] + 1]
+        return result.iloc[rows]
+
+class BatchIndicatorEngine:
+    """多市場批次指標引擎"""
+    
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, rsi_window: int = 14,
+                 bb_window: int = 20, bb_dev: float = 2, atr_window: int = 14):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.rsi_window = rsi_window
+        self.bb_window = bb_window
+        self.bb_dev = bb_dev
+        self.atr_window = atr_window
+        self.logger = logging.getLogger('BatchIndicatorEngine')
+    
+    @property
+    def min_rows(self) -> int:
+        """與 MACDAnalyzer 相同的最少資料筆數"""
+        return self.slow + self.signal
+    
+    @staticmethod
+    def stack(frames: Dict[str, pd.DataFrame], column: str, length: int) -> np.ndarray:
+        """將各市場的欄位按最後一根對齊堆疊為 (length, N) 陣列，前段補NaN"""
+        out = np.full((length, len(frames)), np.nan)
+        for i, df in enumerate(frames.values()):
+            values = df[column].to_numpy(dtype=np.float64)
+            out[length - len(values):, i] = values
+        return out
+    
+    def compute(self, frames: Dict[str, pd.DataFrame]) -> Optional[BatchIndicatorResult]:
+        """計算全部市場的指標（資料不足的市場略過）"""
+        try:
+            usable = {symbol: df for symbol, df in frames.items()
+                      if df is not None and len(df) >= self.min_rows}
+            skipped = set(frames) - set(usable)
+            if skipped:
+                self.logger.warning(f"資料不足，略過: {', '.join(sorted(skipped))}")
+            if not usable:
+                return None
+            
+            lengths = np.array([len(df) for df in usable.values()])
+            length = int(lengths.max())
+            close = self.stack(usable, 'close', length)
+            high = self.stack(usable, 'high', length)
+            low = self.stack(usable, 'low', length)
+            starts = length - lengths  # 各市場第一個有效列
+            
+            arrays = {}
+            with np.errstate(divide='ignore', invalid='ignore'):
+                prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+                
+                # RSI的漲跌（第一根的漲跌視為0）
+                diff = close - prev_close
+                padding = np.isnan(close)
+                gains = np.where(padding, np.nan, np.where(diff > 0, diff, 0.0))
+                losses = np.where(padding, np.nan, np.where(diff < 0, -diff, 0.0))
+                
+                # ATR的真實波幅（Wilder平滑以前 window 根的平均為起點）
+                true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+                atr_input, atr_warmup = self._atr_input(true_range, starts, lengths)
+                
+                # 快慢EMA、RSI平均漲跌、ATR並排為一個區塊，一次遞迴完成
+                count = close.shape[1]
+                block = np.hstack([close, close, gains, losses, atr_input])
+                alphas = np.repeat([2.0 / (self.fast + 1), 2.0 / (self.slow + 1), 1.0 / self.rsi_window,
+                                    1.0 / self.rsi_window, 1.0 / self.atr_window], count)
+                min_periods = np.repeat([self.fast, self.slow, self.rsi_window, self.rsi_window, 1], count)
+                ema_fast, ema_slow, avg_gain, avg_loss, atr = np.hsplit(ewm_columns(block, alphas, min_periods), 5)
+                
+                # MACD
+                macd = ema_fast - ema_slow
+                macd_signal = ewm_columns(macd, 2.0 / (self.signal + 1), self.signal)
+                arrays.update({
+                    'macd': macd,
+                    'macd_signal': macd_signal,
+                    'macd_histogram': macd - macd_signal,
+                    'ema_12': ema_fast,
+                    'ema_26': ema_slow
+                })
+                
+                arrays['rsi'] = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+                # RSI的平滑平均漲跌（串流指標以此接續狀態）
+                arrays['avg_gain'] = avg_gain
+                arrays['avg_loss'] = avg_loss
+                
+                # 布林帶
+                middle = rolling_columns(close, self.bb_window, np.mean)
+                std = rolling_columns(close, self.bb_window, np.std)
+                arrays['bb_upper'] = middle + self.bb_dev * std
+                arrays['bb_middle'] = middle
+                arrays['bb_lower'] = middle - self.bb_dev * std
+                
+                # ta 的ATR在起點之前為0
+                atr[atr_warmup] = 0.0
+                arrays['atr'] = atr
+            
+            return BatchIndicatorResult(list(usable), arrays, lengths, usable)
+        
+        except Exception as e:
+            self.logger.error(f"批次指標計算失敗: {e}")
+            return None
+    
+    def _atr_input(self, true_range: np.ndarray, starts: np.ndarray, lengths: np.ndarray):
+        """ATR的遞迴輸入：起點前為NaN、起點為前 window 根真實波幅的平均；另回傳補0的暖機位置"""
+        window = self.atr_window
+        rows = np.arange(len(true_range))[:, None]
+        seed_rows = np.where(lengths >= window, starts + window - 1, len(true_range))
+        before_seed = rows < seed_rows[None, :]
+        values = np.where(before_seed, np.nan, true_range)
+        
+        cols = np.flatnonzero(lengths >= window)
+        if len(cols):
+            window_rows = starts[cols][None, :] + np.arange(window)[:, None]
+            values[seed_rows[cols], cols] = true_range[window_rows, cols[None, :]].mean(axis=0)
+        warmup = (rows >= starts[None, :]) & before_seed & (lengths >= window)[None, :]
+        return values, warmup
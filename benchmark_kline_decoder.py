@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+K線解碼效能比較
+比較 parse_klines（pandas）與 decode_klines（NumPy結構化陣列）解析 /k 回應的速度，
+不需連線，使用模擬資料
+"""
+
+import random
+import time
+import timeit
+
+from kline_decoder import decode_klines
+from max_api import parse_klines
+
+def make_kline_response(rows, period=1):
+    """產生與MAX /k 相同格式的模擬回應"""
+    step = period * 60
+    start = int(time.time()) // step * step - (rows - 1) * step
+    price = 3000000.0
+    data = []
+    for i in range(rows):
+        open_price = price
+        price = max(1.0, price + random.uniform(-3000, 3000))
+        data.append([
+            start + i * step,
+            round(open_price, 1),
+            round(max(open_price, price) + random.uniform(0, 1500), 1),
+            round(min(open_price, price) - random.uniform(0, 1500), 1),
+            round(price, 1),
+            round(random.uniform(0.01, 5), 6)
+        ])
+    return data
+
+def bench(fn, number):
+    """回傳每次呼叫的平均微秒數（取5輪最佳）"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+def run_benchmark(sizes=(200, 1000, 10000)):
+    print("📊 K線解碼效能比較")
+    print("=" * 72)
+    print(f"{'筆數':>8} {'pandas解析':>14} {'NumPy解碼':>14} {'解碼+DataFrame':>16} {'加速':>8}")
+    
+    results = []
+    for rows in sizes:
+        data = make_kline_response(rows)
+        number = max(10, 20000 // rows)
+        
+        # 結果必須一致
+        expected = parse_klines(data)
+        actual = decode_klines(data).to_dataframe()
+        assert (expected['timestamp'].values == actual['timestamp'].values).all()
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            assert (expected[col].values == actual[col].values).all()
+        
+        pandas_us = bench(lambda: parse_klines(data), number)
+        numpy_us = bench(lambda: decode_klines(data), number)
+        numpy_df_us = bench(lambda: decode_klines(data).to_dataframe(), number)
+        
+        results.append({
+            'rows': rows,
+            'pandas_us': pandas_us,
+            'numpy_us': numpy_us,
+            'numpy_dataframe_us': numpy_df_us
+        })
+        print(f"{rows:>8} {pandas_us:>12.1f}µs {numpy_us:>12.1f}µs {numpy_df_us:>14.1f}µs "
+              f"{pandas_us / numpy_us:>7.1f}x")
+    
+    return results
+
+def test_kline_decoder_benchmark():
+    results = run_benchmark(sizes=(200,))
+    assert results[0]['numpy_us'] > 0
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+指標一致性與效能基準測試
+以模擬K線與錄製資料（MAX API錄製檔 / CandleStore）的 200、1萬、100萬筆資料集，量測
+MACDAnalyzer.calculate_macd、EnhancedMACDAnalyzer.calculate_macd、
+AdvancedCryptoAnalyzer.calculate_all_indicators、comprehensive_analysis 與整段歷史分析的耗時，
+並檢查各個較快的實作（融合引擎、批次引擎、MACD變體、串流指標、按需指標框架）與 ta 參考實作的數值一致性，
+以及精簡模式（振盪指標float32）的記憶體節省與數值漂移；
+結果寫入JSON檔，可與上一次的結果比對找出效能退化，不需連線
+
+使用方式：
+    python benchmark_suite.py --output benchmark_results.json
+    python benchmark_suite.py --recording day.jsonl.gz --baseline benchmark_results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import timeit
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import ta
+
+from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from batch_indicators import BatchIndicatorEngine, MACD_COLUMNS
+from candle_store import CandleStore
+from enhanced_macd_analyzer import EnhancedMACDAnalyzer
+from indicator_engine import INDICATOR_COLUMNS, compact_report, warmup_rows
+from indicator_graph import get_indicator_graph
+from macd_analyzer import MACDAnalyzer
+from macd_variants import evaluate_variants
+from max_recorder import recorded_klines
+from streaming_indicators import StreamingMACDTracker
+from synthetic_data import random_ohlcv
+
+SIZES = (200, 10_000, 1_000_000)
+
+# 數值一致性的容許誤差（與 test_indicator_engine 相同）
+RTOL = 1e-9
+ATOL = 1e-6
+
+# ta 逐項計算全部指標在100萬筆約需1分鐘，超過此筆數的一致性檢查改用最後 PARITY_ROWS 筆
+PARITY_ROWS = 100_000
+
+# 耗時超過基準的 (1 + REGRESSION_TOLERANCE) 倍視為退化
+REGRESSION_TOLERANCE = 0.25
+
+def bench(fn, rows):
+    """回傳每次呼叫的平均毫秒數（取3輪最佳），每次呼叫前清除共用依賴圖以量測完整計算"""
+    number = max(1, 2000 // rows)
+    
+    def run():
+        get_indicator_graph().clear()
+        return fn()
+    
+    return min(timeit.repeat(run, number=number, repeat=3)) / number * 1e3
+
+# ---------- 資料集 ----------
+
+def synthetic_datasets(sizes=SIZES, seed: int = 3) -> Dict[str, pd.DataFrame]:
+    """模擬K線資料集"""
+    return {f"synthetic/{rows}": random_ohlcv(rows, seed=seed) for rows in sizes}
+
+def _sized(name: str, df: pd.DataFrame, sizes) -> Dict[str, pd.DataFrame]:
+    """錄製資料依各筆數取最後一段（資料不足該筆數時略過，全部不足時取全部）"""
+    datasets = {f"{name}/{rows}": df.iloc[-rows:].reset_index(drop=True) for rows in sizes if len(df) >= rows}
+    return datasets or {f"{name}/{len(df)}": df}
+
+def recorded_datasets(path: str, sizes=SIZES) -> Dict[str, pd.DataFrame]:
+    """由MAX API錄製檔取出各 (市場, 週期) 的K線"""
+    datasets = {}
+    for (market, period), klines in recorded_klines(path).items():
+        datasets.update(_sized(f"recording:{market}:{period}m", klines.to_dataframe(), sizes))
+    return datasets
+
+def store_datasets(root: str, sizes=SIZES) -> Dict[str, pd.DataFrame]:
+    """由 CandleStore 目錄取出全部 (市場, 週期) 的K線"""
+    store = CandleStore(root)
+    datasets = {}
+    for market in sorted(os.listdir(root)):
+        directory = os.path.join(root, market)
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('m.bin'):
+                continue
+            period = int(filename[:-len('m.bin')])
+            klines = store.range(market, period)
+            if len(klines):
+                df = klines.to_dataframe()
+                datasets.update(_sized(f"store:{market}:{period}m", df, sizes))
+    return datasets
+
+# ---------- 效能 ----------
+
+def timing_targets() -> Dict:
+    """名稱 -> 以K線DataFrame呼叫的函式"""
+    macd_analyzer = MACDAnalyzer()
+    enhanced = EnhancedMACDAnalyzer()
+    advanced = AdvancedCryptoAnalyzer()
+    return {
+        'MACDAnalyzer.calculate_macd': macd_analyzer.calculate_macd,
+        'EnhancedMACDAnalyzer.calculate_macd': enhanced.calculate_macd,
+        'AdvancedCryptoAnalyzer.calculate_all_indicators': advanced.calculate_all_indicators,
+        'AdvancedCryptoAnalyzer.comprehensive_analysis':
+            lambda df: advanced.comprehensive_analysis(df, float(df['close'].iloc[-1])),
+        'AdvancedCryptoAnalyzer.comprehensive_analysis_history': advanced.comprehensive_analysis_history
+    }
+
+# ---------- 數值一致性 ----------
+
+def ta_macd_reference(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
+    """以 ta 套件逐項計算的MACD/EMA/RSI（原本的計算方式）"""
+    close = df['close']
+    macd = ta.trend.MACD(close, window_slow=slow, window_fast=fast, window_sign=signal)
+    return pd.DataFrame({
+        'ema_12': ta.trend.EMAIndicator(close, window=fast).ema_indicator(),
+        'ema_26': ta.trend.EMAIndicator(close, window=slow).ema_indicator(),
+        'macd': macd.macd(),
+        'macd_signal': macd.macd_signal(),
+        'macd_histogram': macd.macd_diff(),
+        'rsi': ta.momentum.RSIIndicator(close, window=14).rsi()
+    }, index=df.index)
+
+def compare_columns(actual: pd.DataFrame, expected: pd.DataFrame, columns) -> Dict:
+    """比較兩個DataFrame的欄位（以 actual 的索引對齊），回傳各欄位的最大絕對/相對誤差"""
+    errors = {}
+    passed = len(actual) > 0
+    for column in columns:
+        a = actual[column].to_numpy(dtype=np.float64)
+        e = expected[column].reindex(actual.index).to_numpy(dtype=np.float64)
+        same_nan = np.array_equal(np.isnan(a), np.isnan(e))
+        diff = np.abs(a - e)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rel = np.where(e != 0, diff / np.abs(e), diff)
+        errors[column] = {
+            'max_abs_error': float(np.nanmax(diff)) if (~np.isnan(diff)).any() else 0.0,
+            'max_rel_error': float(np.nanmax(rel)) if (~np.isnan(rel)).any() else 0.0
+        }
+        passed = passed and same_nan and bool(np.allclose(a, e, rtol=RTOL, atol=ATOL, equal_nan=True))
+    return {'passed': passed, 'columns': errors}
+
+def check_macd_analyzer(df):
+    """MACDAnalyzer（共用依賴圖）與 ta"""
+    return compare_columns(MACDAnalyzer().calculate_macd(df), ta_macd_reference(df), MACD_COLUMNS)
+
+def check_enhanced_macd(df):
+    """EnhancedMACDAnalyzer（共用依賴圖）與 ta"""
+    return compare_columns(EnhancedMACDAnalyzer().calculate_macd(df), ta_macd_reference(df), MACD_COLUMNS)
+
+def check_fused_engine(df):
+    """融合引擎與 ta 逐項計算的全部指標"""
+    analyzer = AdvancedCryptoAnalyzer()
+    fused = analyzer.calculate_all_indicators(df)
+    analyzer.use_fused_engine = False
+    return compare_columns(fused, analyzer.calculate_all_indicators(df), INDICATOR_COLUMNS)
+
+def check_batch_engine(df):
+    """多市場批次引擎（單一市場）與 ta"""
+    result = BatchIndicatorEngine().compute({'benchmark': df})
+    frame = result.frame('benchmark', columns=MACD_COLUMNS, dropna=True)
+    return compare_columns(frame, ta_macd_reference(df), MACD_COLUMNS)
+
+def check_macd_variants(df):
+    """MACD變體登錄表的標準算法與 ta"""
+    values = evaluate_variants(df['close'], ['standard'])['standard']
+    actual = pd.DataFrame({
+        'ema_12': values['ema_fast'], 'ema_26': values['ema_slow'], 'macd': values['macd'],
+        'macd_signal': values['macd_signal'], 'macd_histogram': values['macd_histogram']
+    }, index=df.index)
+    return compare_columns(actual, ta_macd_reference(df), MACD_COLUMNS[:-1])
+
+def check_streaming(df):
+    """串流指標逐根更新後的最後一根與 ta"""
+    tracker = StreamingMACDTracker()
+    tracker.sync(df)
+    actual = pd.DataFrame([tracker.latest], index=df.index[-1:])
+    return compare_columns(actual, ta_macd_reference(df), MACD_COLUMNS)
+
+def check_lazy_analysis(df):
+    """按需指標框架的綜合分析與完整計算的結果相同"""
+    price = float(df['close'].iloc[-1])
+    analyzer = AdvancedCryptoAnalyzer()
+    lazy = analyzer.comprehensive_analysis(df, price)
+    analyzer.indicator_frame = lambda df, *args: analyzer.calculate_all_indicators(df)
+    eager = analyzer.comprehensive_analysis(df, price)
+    return {'passed': lazy == eager, 'columns': {}}
+
+def check_analysis_history(df):
+    """向量化的整段歷史綜合分析，最後一列與逐列路徑相同"""
+    price = float(df['close'].iloc[-1])
+    analyzer = AdvancedCryptoAnalyzer()
+    history = analyzer.comprehensive_analysis_history(df, price)
+    scalar = analyzer.comprehensive_analysis(df, price)
+    return {'passed': history is not None and analyzer.analysis_from_history(history) == scalar, 'columns': {}}
+
+PARITY_CHECKS = {
+    'macd_analyzer_vs_ta': check_macd_analyzer,
+    'enhanced_macd_vs_ta': check_enhanced_macd,
+    'fused_engine_vs_ta': check_fused_engine,
+    'batch_engine_vs_ta': check_batch_engine,
+    'macd_variants_vs_ta': check_macd_variants,
+    'streaming_vs_ta': check_streaming,
+    'lazy_analysis_vs_eager': check_lazy_analysis,
+    'analysis_history_vs_scalar': check_analysis_history
+}
+
+# ---------- 執行與輸出 ----------
+
+def run_suite(datasets: Dict[str, pd.DataFrame], parity_rows: int = PARITY_ROWS, verbose: bool = True) -> Dict:
+    """量測全部資料集，回傳可寫成JSON的結果"""
+    for name in ('MACDAnalyzer', 'EnhancedMACDAnalyzer', 'AdvancedCryptoAnalyzer', 'BatchIndicatorEngine'):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform()
+        },
+        'timings': [],
+        'parity': [],
+        'compact': []
+    }
+    targets = timing_targets()
+    
+    for dataset, df in datasets.items():
+        if verbose:
+            print(f"\n📊 {dataset}（{len(df)} 筆）")
+        for target, fn in targets.items():
+            ms = bench(lambda: fn(df), len(df))
+            results['timings'].append({'dataset': dataset, 'rows': len(df), 'target': target, 'ms': ms})
+            if verbose:
+                print(f"   ⏱️ {target:<54} {ms:>10.2f}ms")
+        
+        sample = df.iloc[-parity_rows:].reset_index(drop=True) if len(df) > parity_rows else df
+        for check, fn in PARITY_CHECKS.items():
+            started = time.perf_counter()
+            try:
+                outcome = fn(sample)
+            except Exception as e:
+                outcome = {'passed': False, 'columns': {}, 'error': str(e)}
+            results['parity'].append({
+                'dataset': dataset, 'rows': len(df), 'rows_checked': len(sample), 'check': check,
+                'seconds': time.perf_counter() - started, **outcome
+            })
+            if verbose:
+                print(f"   {'✅' if outcome['passed'] else '❌'} {check}")
+        
+        # 精簡模式（振盪指標float32）的記憶體節省與數值漂移
+        if len(df) > warmup_rows():
+            report = compact_report(df)
+            results['compact'].append({'dataset': dataset, **report})
+            if verbose:
+                drift = max(item['max_rel_error'] for item in report['drift'].values())
+                print(f"   🗜️ 精簡模式節省 {report['saved_ratio']:.1%}（{report['saved_bytes'] / 1e6:.1f}MB），"
+                      f"最大相對誤差 {drift:.1e}")
+    
+    return results
+
+def find_regressions(results: Dict, baseline: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[Dict]:
+    """與基準結果比對，列出耗時增加超過容許比例的項目"""
+    previous = {(t['dataset'], t['target']): t['ms'] for t in baseline.get('timings', [])}
+    regressions = []
+    for timing in results['timings']:
+        before = previous.get((timing['dataset'], timing['target']))
+        if before and timing['ms'] > before * (1 + tolerance):
+            regressions.append({**timing, 'baseline_ms': before, 'ratio': timing['ms'] / before})
+    return regressions
+
+def write_results(results: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description='指標一致性與效能基準測試')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in SIZES), help='資料筆數（逗號分隔）')
+    parser.add_argument('--recording', action='append', default=[], help='MAX API錄製檔（可重複指定）')
+    parser.add_argument('--candle-store', help='CandleStore 目錄')
+    parser.add_argument('--no-synthetic', action='store_true', help='不使用模擬資料')
+    parser.add_argument('--parity-rows', type=int, default=PARITY_ROWS, help='一致性檢查的最大筆數')
+    parser.add_argument('--output', default='benchmark_results.json', help='結果JSON檔')
+    parser.add_argument('--baseline', help='上一次的結果JSON檔，用於找出效能退化')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE, help='容許的耗時增加比例')
+    args = parser.parse_args()
+    
+    sizes = [int(s) for s in args.sizes.split(',')]
+    datasets = {} if args.no_synthetic else synthetic_datasets(sizes)
+    for path in args.recording:
+        datasets.update(recorded_datasets(path, sizes))
+    if args.candle_store:
+        datasets.update(store_datasets(args.candle_store, sizes))
+    
+    print("📊 指標一致性與效能基準測試")
+    print("=" * 70)
+    results = run_suite(datasets, args.parity_rows)
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            results['regressions'] = find_regressions(results, json.load(f), args.tolerance)
+        for item in results['regressions']:
+            print(f"⚠️ 效能退化: {item['dataset']} {item['target']} "
+                  f"{item['baseline_ms']:.2f}ms → {item['ms']:.2f}ms（{item['ratio']:.2f}x）")
+    
+    write_results(results, args.output)
+    print(f"\n💾 結果已寫入 {args.output}")
+    
+    failed = [p for p in results['parity'] if not p['passed']]
+    for item in failed:
+        print(f"❌ 數值不一致: {item['dataset']} {item['check']}")
+    sys.exit(1 if failed or results.get('regressions') else 0)
+
+if __name__ == "__main__":
+    main()
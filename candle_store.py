@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+K線持久化儲存
+每個 (market, period) 一個固定寬度的NumPy二進位檔（KLINE_DTYPE），只寫入已收盤的K線（缺口修補時插入或就地覆寫）；
+讀取時以記憶體映射取得零複製的視圖，時間範圍查詢以二分搜尋完成（O(log n)）
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from config import CANDLE_STORE_DIR
+from kline_decoder import KLINE_DTYPE, KlineArray
+from kline_gaps import insert_klines
+
+# MAX /k 單次請求的最大筆數
+MAX_KLINE_LIMIT = 10000
+
+class CandleStore:
+    """追加式K線儲存（記憶體映射讀取）"""
+    
+    def __init__(self, root: str = CANDLE_STORE_DIR):
+        self.root = root
+        self.logger = logging.getLogger('CandleStore')
+        self._lock = threading.Lock()
+        self._maps: Dict[tuple, np.ndarray] = {}
+    
+    def _path(self, market: str, period: int) -> str:
+        return os.path.join(self.root, market, f"{period}m.bin")
+    
+    def _records(self, market: str, period: int) -> np.ndarray:
+        """取得整個檔案的唯讀記憶體映射（需持有鎖）"""
+        key = (market, period)
+        if key in self._maps:
+            return self._maps[key]
+        
+        path = self._path(market, period)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        count = size // KLINE_DTYPE.itemsize  # 忽略中斷寫入造成的不完整記錄
+        if count == 0:
+            records = np.empty(0, dtype=KLINE_DTYPE)
+        else:
+            records = np.memmap(path, dtype=KLINE_DTYPE, mode='r', shape=(count,))
+        self._maps[key] = records
+        return records
+    
+    def count(self, market: str, period: int) -> int:
+        with self._lock:
+            return len(self._records(market, period))
+    
+    def last_timestamp(self, market: str, period: int) -> Optional[int]:
+        """最後一根已儲存K線的時間戳（秒），無資料時回傳None"""
+        with self._lock:
+            records = self._records(market, period)
+            return int(records['timestamp'][-1]) if len(records) else None
+    
+    def append(self, market: str, period: int, klines: KlineArray, now: float = None) -> int:
+        """追加比現有資料新且已收盤的K線，回傳寫入筆數"""
+        if klines is None or klines.empty:
+            return 0
+        
+        step = period * 60
+        now = time.time() if now is None else now
+        
+        with self._lock:
+            records = self._records(market, period)
+            ts = klines['timestamp']
+            mask = ts + step <= now  # 形成中的K線不寫入
+            if len(records):
+                mask &= ts > records['timestamp'][-1]
+            new = klines.records[mask]
+            if len(new) == 0:
+                return 0
+            
+            path = self._path(market, period)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'ab') as f:
+                # 截掉中斷寫入留下的不完整記錄
+                f.truncate(len(records) * KLINE_DTYPE.itemsize)
+                f.write(np.ascontiguousarray(new).tobytes())
+            self._maps.pop((market, period), None)
+            return len(new)
+    
+    def insert(self, market: str, period: int, klines: KlineArray, now: float = None) -> int:
+        """寫入缺口修補的已收盤K線，回傳寫入筆數
+        
+        已存在的時間戳以新資料就地覆寫（不重寫檔案）；缺少的時間戳全部比現有資料新時等同 append，
+        否則合併後寫入暫存檔再以 os.replace 原子取代，之後重新開啟記憶體映射。
+        """
+        if klines is None or klines.empty:
+            return 0
+        
+        step = period * 60
+        now = time.time() if now is None else now
+        
+        with self._lock:
+            records = self._records(market, period)
+            ts = klines['timestamp']
+            rows = KlineArray(klines.records[ts + step <= now])
+            if len(records) == 0 or rows.empty or rows['timestamp'][0] > records['timestamp'][-1]:
+                missing = rows
+                written = 0
+            else:
+                stored = records['timestamp']
+                pos = np.minimum(np.searchsorted(stored, rows['timestamp']), len(records) - 1)
+                exists = stored[pos] == rows['timestamp']
+                written = self._overwrite(market, period, records, pos[exists], rows.records[exists])
+                missing = KlineArray(rows.records[~exists])
+                if not missing.empty and missing['timestamp'][0] < stored[-1]:
+                    merged = insert_klines(KlineArray(records), missing)
+                    del records, stored  # 取代檔案前不再持有舊映射
+                    self._rewrite(market, period, merged)
+                    written += len(missing)
+                    missing = None
+        
+        if missing is not None and not missing.empty:
+            written += self.append(market, period, missing, now=now)
+        return written
+    
+    def _overwrite(self, market: str, period: int, records: np.ndarray, positions: np.ndarray,
+                   rows: np.ndarray) -> int:
+        """就地覆寫內容有變動的既有K線（需持有鎖），既有的記憶體映射視圖直接看到新資料"""
+        changed = records[positions] != rows
+        if not changed.any():
+            return 0
+        with open(self._path(market, period), 'r+b') as f:
+            for position, row in zip(positions[changed], rows[changed]):
+                f.seek(int(position) * KLINE_DTYPE.itemsize)
+                f.write(row.tobytes())
+        return int(changed.sum())
+    
+    def _rewrite(self, market: str, period: int, merged: KlineArray):
+        """以合併後的資料取代整個檔案（需持有鎖），下次讀取時重新開啟記憶體映射"""
+        path = self._path(market, period)
+        temp = f"{path}.tmp"
+        with open(temp, 'wb') as f:
+            f.write(np.ascontiguousarray(merged.records).tobytes())
+        # 先釋放自己持有的映射（Windows上開啟中的映射會使取代失敗）
+        self._maps.pop((market, period), None)
+        os.replace(temp, path)
+    
+    def range(self, market: str, period: int, start: int = None, end: int = None) -> KlineArray:
+        """取得 [start, end) 時間範圍內的K線（記憶體映射視圖，不複製）"""
+        with self._lock:
+            records = self._records(market, period)
+        ts = records['timestamp']
+        lo = 0 if start is None else np.searchsorted(ts, start, side='left')
+        hi = len(records) if end is None else np.searchsorted(ts, end, side='left')
+        return KlineArray(records[lo:hi])
+    
+    def window(self, market: str, period: int, limit: int, end: int = None) -> KlineArray:
+        """取得 end 之前最近 limit 根K線（記憶體映射視圖，不複製）"""
+        with self._lock:
+            records = self._records(market, period)
+        hi = len(records) if end is None else np.searchsorted(records['timestamp'], end, side='left')
+        return KlineArray(records[max(0, hi - limit):hi])
+    
+    def backfill(self, api, market: str, period: int, days: int = 30, now: float = None) -> int:
+        """由 /k 補齊最後一根已儲存K線之後（或最近 days 天）的已收盤K線，回傳寫入筆數"""
+        step = period * 60
+        now = time.time() if now is None else now
+        last_ts = self.last_timestamp(market, period)
+        start = last_ts + step if last_ts is not None else int(now - days * 86400) // step * step
+        current = int(now) // step * step  # 形成中K線的起點
+        
+        written = 0
+        while start < current:
+            klines = api.get_kline_range(market, period, start, limit=MAX_KLINE_LIMIT)
+            if klines is None or klines.empty:
+                break
+            written += self.append(market, period, klines, now=now)
+            next_start = klines.last_timestamp() + step
+            if next_start <= start or len(klines) < MAX_KLINE_LIMIT:
+                break
+            start = next_start
+        
+        if written:
+            self.logger.info(f"💾 {market} {period}分鐘K線補齊 {written} 筆，共 {self.count(market, period)} 筆")
+        return written
@@ -17,9 +17,13 @@ import schedule
 import pandas as pd
 import aiohttp  # 添加http客戶端
 
-from max_api import MaxAPI
+from max_api import MaxAPI, AsyncMaxAPI
+from candle_store import CandleStore
 from enhanced_macd_analyzer import EnhancedMACDAnalyzer
 from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from indicator_engine import get_indicator_usage
+from batch_indicators import BatchIndicatorEngine
+from indicator_checkpoint import IndicatorCheckpoint
 from telegram_notifier import TelegramNotifier
 
 # 添加交互式处理器导入
@@ -52,8 +56,13 @@ class CloudMonitor:
         self.apply_env_overrides()
         
         # 初始化組件
-        self.max_api = MaxAPI()
-        self.macd_analyzer = EnhancedMACDAnalyzer()
+        self.candle_store = CandleStore()
+        self.max_api = MaxAPI(candle_store=self.candle_store)
+        self.async_max_api = AsyncMaxAPI(kline_cache=self.max_api.kline_cache, candle_store=self.candle_store)
+        self.macd_analyzer = EnhancedMACDAnalyzer(checkpoint=IndicatorCheckpoint())
+        self.batch_engine = BatchIndicatorEngine(
+            self.macd_analyzer.fast_period, self.macd_analyzer.slow_period, self.macd_analyzer.signal_period
+        )
         self.advanced_analyzer = AdvancedCryptoAnalyzer()
         self.telegram_notifier = TelegramNotifier()
         
@@ -301,53 +310,95 @@ class CloudMonitor:
         try:
             self.logger.info(f"開始檢查 {symbol} 市場條件")
             
-            # 獲取價格數據
-            self.logger.info("正在獲取價格數據...")
-            ticker = self.max_api.get_ticker(symbol)
+            # 同時獲取價格數據與主要週期的K線數據（非阻塞）
+            primary_period = self.config['monitoring']['primary_period']
+            self.logger.info(f"正在獲取價格數據與 {primary_period} 分鐘K線數據...")
+            ticker, kline_data = await self.async_max_api.get_ticker_and_klines(
+                symbol, period=primary_period, limit=200
+            )
             if not ticker:
                 self.logger.error(f"無法獲取 {symbol} 價格數據")
                 return None
             
             self.logger.info(f"價格數據獲取成功: {ticker.get('price', 'N/A')}")
             
-            # 獲取主要週期的K線數據
-            primary_period = self.config['monitoring']['primary_period']
-            self.logger.info(f"正在獲取 {primary_period} 分鐘K線數據...")
-            kline_data = self.max_api.get_klines(symbol, period=primary_period, limit=200)
-            
             if kline_data is None or kline_data.empty:
                 self.logger.error(f"無法獲取 {symbol} K線數據")
                 return None
             
             self.logger.info(f"K線數據獲取成功，共 {len(kline_data)} 條記錄")
             
-            # 計算技術指標
+            # 計算技術指標（與批次檢查相同的來源；互動查詢不推進串流狀態也不寫入檢查點）
             self.logger.info("正在計算技術指標...")
-            df_with_macd = self.macd_analyzer.calculate_macd(kline_data)
-            if df_with_macd is None or df_with_macd.empty:
+            indicators = self.macd_analyzer.alert_indicators(
+                {symbol: kline_data}, primary_period, self.batch_engine, advance=False).get(symbol)
+            if indicators is None:
                 self.logger.error(f"MACD計算失敗")
                 return None
             
-            if len(df_with_macd) < 2:
-                self.logger.error(f"技術指標數據不足，只有 {len(df_with_macd)} 條記錄")
-                return None
+            return self._build_market_data(symbol, primary_period, ticker, kline_data, indicators)
+        
+        except Exception as e:
+            self.logger.error(f"檢查市場條件時出錯: {e}")
+            import traceback
+            self.logger.error(f"詳細錯誤: {traceback.format_exc()}")
+            self.stats['errors_count'] += 1
+            return None
+    
+    async def check_markets_batch(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """同時檢查多個市場：並行取得資料，再以二維陣列一次計算全部市場的技術指標"""
+        results = {}
+        try:
+            primary_period = self.config['monitoring']['primary_period']
+            responses = await asyncio.gather(*(
+                self.async_max_api.get_ticker_and_klines(symbol, period=primary_period, limit=200)
+                for symbol in symbols
+            ), return_exceptions=True)
             
-            self.logger.info("技術指標計算成功")
+            tickers, frames = {}, {}
+            for symbol, response in zip(symbols, responses):
+                if isinstance(response, Exception):
+                    self.logger.error(f"獲取 {symbol} 數據時出錯: {response}")
+                    self.stats['errors_count'] += 1
+                    continue
+                ticker, kline_data = response
+                if not ticker:
+                    self.logger.error(f"無法獲取 {symbol} 價格數據")
+                    continue
+                if kline_data is None or kline_data.empty:
+                    self.logger.error(f"無法獲取 {symbol} K線數據")
+                    continue
+                tickers[symbol] = ticker
+                frames[symbol] = kline_data
             
-            latest = df_with_macd.iloc[-1]
-            previous = df_with_macd.iloc[-2]
+            # 以二維陣列一次計算全部市場的MACD/RSI，並推進串流狀態（K線不足的市場由串流狀態接續）
+            indicators = self.macd_analyzer.alert_indicators(frames, primary_period, self.batch_engine)
             
-            # 安全獲取技術指標數據，使用默認值處理缺失項
-            def safe_get(series, key, default=0.0):
-                try:
-                    value = series.get(key, default)
-                    return float(value) if pd.notna(value) else default
-                except:
-                    return default
+            for symbol, kline_data in frames.items():
+                if symbol not in indicators:
+                    self.logger.error(f"{symbol} 技術指標數據不足")
+                    continue
+                market_data = self._build_market_data(symbol, primary_period, tickers[symbol], kline_data,
+                                                      indicators[symbol])
+                if market_data:
+                    results[symbol] = market_data
+        
+        except Exception as e:
+            self.logger.error(f"批次檢查市場條件時出錯: {e}")
+            self.stats['errors_count'] += 1
+        
+        return results
+    
+    def _build_market_data(self, symbol: str, period: int, ticker: Dict[str, Any], kline_data: pd.DataFrame,
+                           indicators: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """由價格、K線與 EnhancedMACDAnalyzer.alert_indicators 的結果組成市場條件數據"""
+        try:
+            self.logger.info(f"技術指標計算成功（來源: {indicators['source']}）")
             
             # 構建市場條件數據
             market_data = {
                 'symbol': symbol,
+                'period': period,
                 'timestamp': datetime.now(),
                 'price': {
                     'current': float(ticker['price']),
@@ -355,29 +406,16 @@ class CloudMonitor:
                     'low_24h': float(ticker['low']),
                     'volume_24h': float(ticker['volume'])
                 },
-                'technical': {
-                    'macd': safe_get(latest, 'macd'),
-                    'macd_signal': safe_get(latest, 'macd_signal'),
-                    'macd_histogram': safe_get(latest, 'macd_histogram'),
-                    'rsi': safe_get(latest, 'rsi', 50.0),  # RSI 默認值 50
-                    'ema_12': safe_get(latest, 'ema_12'),
-                    'ema_26': safe_get(latest, 'ema_26')
-                },
-                'previous': {
-                    'macd': safe_get(previous, 'macd'),
-                    'macd_signal': safe_get(previous, 'macd_signal'),
-                    'macd_histogram': safe_get(previous, 'macd_histogram')
-                },
-                'df': df_with_macd  # 添加完整的K線數據供高級分析使用
+                'technical': indicators['technical'],
+                'previous': indicators['previous'],
+                'df': kline_data  # 添加完整的K線數據供高級分析使用（指標由高級分析器自行計算）
             }
             
             self.logger.info(f"市場條件檢查完成: MACD={market_data['technical']['macd']:.2f}, RSI={market_data['technical']['rsi']:.1f}")
             return market_data
             
         except Exception as e:
-            self.logger.error(f"檢查市場條件時出錯: {e}")
-            import traceback
-            self.logger.error(f"詳細錯誤: {traceback.format_exc()}")
+            self.logger.error(f"整理市場條件數據時出錯: {e}")
             self.stats['errors_count'] += 1
             return None
     
@@ -397,7 +435,9 @@ class CloudMonitor:
                 return []
             
             # 執行AI綜合分析
-            analysis = self.advanced_analyzer.comprehensive_analysis(df, current_price)
+            analysis = self.advanced_analyzer.comprehensive_analysis(
+                df, current_price, market_data.get('symbol'), market_data.get('period')
+            )
             
             recommendation = analysis.get('recommendation', 'HOLD')
             confidence = analysis.get('confidence', 0)
@@ -654,10 +694,12 @@ class CloudMonitor:
         """監控循環"""
         self.logger.info("開始監控循環")
         
+        # 批次檢查全部市場條件
+        batch_market_data = await self.check_markets_batch(self.monitoring_symbols)
+        
         for symbol in self.monitoring_symbols:
             try:
-                # 檢查市場條件
-                market_data = await self.check_market_conditions(symbol)
+                market_data = batch_market_data.get(symbol)
                 if not market_data:
                     continue
                 
@@ -678,6 +720,23 @@ class CloudMonitor:
                 self.logger.error(f"監控 {symbol} 時出錯: {e}")
                 self.stats['errors_count'] += 1
     
+    async def warm_start_candles(self):
+        """啟動時由 /k 補齊持久化K線，並以儲存的K線預熱快取"""
+        days = self.config['advanced'].get('data_retention_days', 30)
+        periods = sorted(set(self.config['monitoring']['periods']) | {self.config['monitoring']['primary_period']})
+        cache = self.max_api.kline_cache
+        
+        for symbol in self.monitoring_symbols:
+            for period in periods:
+                try:
+                    await asyncio.to_thread(self.candle_store.backfill, self.max_api, symbol, period, days)
+                    if cache is not None:
+                        stored = self.candle_store.window(symbol, period, cache.max_rows)
+                        if not stored.empty:
+                            cache.seed(symbol, period, stored)
+                except Exception as e:
+                    self.logger.error(f"{symbol} {period}分鐘K線補齊失敗: {e}")
+    
     async def run_forever(self):
         """持續運行監控"""
         self.is_running = True
@@ -786,6 +845,9 @@ class CloudMonitor:
             except Exception as e:
                 self.logger.error(f"❌ 發送啟動通知失敗: {e}")
         
+        # 補齊K線儲存並預熱快取
+        await self.warm_start_candles()
+        
         # 主監控循環
         interval = self.config['monitoring']['check_interval']
         
@@ -861,6 +923,12 @@ class CloudMonitor:
             except Exception as e:
                 self.logger.error(f"發送停止通知失敗: {e}")
         
+        # 關閉非同步API連線池
+        try:
+            await self.async_max_api.close()
+        except Exception as e:
+            self.logger.error(f"關閉API連線失敗: {e}")
+        
         self.logger.info("雲端監控系統已停止")
     
     async def keep_alive_ping(self):
@@ -962,6 +1030,12 @@ class CloudMonitor:
                     'webhook_active': bool(self.webhook_handler),
                     'polling_active': bool(self.interactive_handler)
                 },
+                'api_coalescing': self.max_api.coalescer.get_stats(),
+                'api_scheduler': self.max_api.scheduler.get_metrics(),
+                'kline_gaps': dict(self.max_api.kline_cache.gap_stats) if self.max_api.kline_cache else {},
+                'indicator_usage': get_indicator_usage().report(),
+                'indicator_cache': self.advanced_analyzer.result_cache.get_stats(),
+                'indicator_checkpoint': self.macd_analyzer.checkpoint.get_stats(),
                 'timestamp': datetime.now().isoformat()
             }
         except Exception as e:
@@ -96,7 +96,7 @@ class CloudStreamingSystem:
             # 獲取K線數據並執行AI分析
             kline_data = self.max_api.get_klines('btctwd', period=60, limit=200)
             if kline_data is not None and not kline_data.empty:
-                analysis = self.analyzer.comprehensive_analysis(kline_data, current_price)
+                analysis = self.analyzer.comprehensive_analysis(kline_data, current_price, 'btctwd', 60)
                 
                 self.latest_analysis = {
                     'price': current_price,
@@ -7,11 +7,27 @@ TELEGRAM_CHAT_ID = '8164385222'
 
 # MAX交易所API設定
 MAX_API_BASE_URL = 'https://max-api.maicoin.com/api/v2'
+MAX_WS_URL = 'wss://max-stream.maicoin.com/ws'
+
+# MAX API錄製/回放（離線重現與效能分析用）
+MAX_API_RECORD_FILE = os.getenv('MAX_API_RECORD_FILE')  # 設定後將所有API回應寫入此檔案
+MAX_API_REPLAY_FILE = os.getenv('MAX_API_REPLAY_FILE')  # 設定後改由錄製檔回放，不連線
+MAX_API_REPLAY_SPEED = float(os.getenv('MAX_API_REPLAY_SPEED', '1'))  # 回放倍速，0為不等待逐筆推進
+
+# K線持久化儲存目錄
+CANDLE_STORE_DIR = os.getenv('CANDLE_STORE_DIR', 'candle_data')
+
+# 串流指標狀態檢查點（重啟後接續EMA/MACD/RSI狀態）
+INDICATOR_STATE_FILE = os.getenv('INDICATOR_STATE_FILE', os.path.join(CANDLE_STORE_DIR, 'indicator_state.json'))
+
+# 精簡指標模式：振盪指標（RSI、隨機指標、威廉指標、CCI等）以float32保存，可在記憶體中保留更長的歷史
+INDICATOR_COMPACT = os.getenv('INDICATOR_COMPACT', '').lower() in ('1', 'true', 'yes')
 
 # MACD參數設定
 MACD_FAST_PERIOD = 12
 MACD_SLOW_PERIOD = 26
 MACD_SIGNAL_PERIOD = 9
+MACD_VARIANT = os.getenv('MACD_VARIANT', 'standard')  # MACD算法變體（見 macd_variants.MACD_VARIANTS）
 
 # 交易信號參數
 BUY_THRESHOLD = 0.0001  # MACD買入閾值
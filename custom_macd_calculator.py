@@ -3,12 +3,12 @@
 
 """
 自訂MACD計算器
-嘗試不同算法來匹配MAX交易所的MACD值
+嘗試不同算法來匹配MAX交易所的MACD值（算法登錄於 macd_variants，一次計算並評分）
 """
 
 import pandas as pd
-import numpy as np
 from max_api import MaxAPI
+from macd_variants import MACD_VARIANTS, evaluate_variants, score_variants
 
 class CustomMACDCalculator:
     def __init__(self, fast=12, slow=26, signal=9):
@@ -16,47 +16,31 @@ class CustomMACDCalculator:
         self.slow = slow
         self.signal = signal
     
-    def calculate_ema(self, data, period):
-        """計算指數移動平均"""
-        return data.ewm(span=period, adjust=False).mean()
-    
-    def calculate_sma(self, data, period):
-        """計算簡單移動平均"""
-        return data.rolling(window=period).mean()
+    def calculate_variants(self, close_prices, names=None):
+        """一次計算多個MACD變體，回傳 {名稱: (macd, signal, histogram)}"""
+        results = evaluate_variants(close_prices, names, self.fast, self.slow, self.signal)
+        index = close_prices.index if isinstance(close_prices, pd.Series) else None
+        return {
+            name: tuple(pd.Series(values[key], index=index) for key in ('macd', 'macd_signal', 'macd_histogram'))
+            for name, values in results.items()
+        }
     
     def calculate_macd_standard(self, close_prices):
         """標準MACD計算（EMA方法）"""
-        ema_fast = self.calculate_ema(close_prices, self.fast)
-        ema_slow = self.calculate_ema(close_prices, self.slow)
-        
-        macd = ema_fast - ema_slow
-        signal = self.calculate_ema(macd, self.signal)
-        histogram = macd - signal
-        
-        return macd, signal, histogram
+        return self.calculate_variants(close_prices, ['standard'])['standard']
     
     def calculate_macd_sma_signal(self, close_prices):
         """MACD計算（信號線用SMA）"""
-        ema_fast = self.calculate_ema(close_prices, self.fast)
-        ema_slow = self.calculate_ema(close_prices, self.slow)
-        
-        macd = ema_fast - ema_slow
-        signal = self.calculate_sma(macd, self.signal)  # 用SMA代替EMA
-        histogram = macd - signal
-        
-        return macd, signal, histogram
+        return self.calculate_variants(close_prices, ['sma_signal'])['sma_signal']
     
     def calculate_macd_percentage(self, close_prices):
         """MACD百分比版本"""
-        ema_fast = self.calculate_ema(close_prices, self.fast)
-        ema_slow = self.calculate_ema(close_prices, self.slow)
+        return self.calculate_variants(close_prices, ['percentage'])['percentage']
         
-        # 計算百分比差異
-        macd = ((ema_fast - ema_slow) / ema_slow) * 100
-        signal = self.calculate_ema(macd, self.signal)
-        histogram = macd - signal
-        
-        return macd, signal, histogram
+    def rank_variants(self, close_prices, reference):
+        """計算全部變體並依與參考值的誤差排序"""
+        results = evaluate_variants(close_prices, None, self.fast, self.slow, self.signal)
+        return score_variants(results, reference), results
 
 def test_custom_macd():
     """測試自訂MACD計算"""
@@ -65,6 +49,9 @@ def test_custom_macd():
     max_api = MaxAPI()
     calculator = CustomMACDCalculator()
     
+    # MAX介面顯示的參考值
+    reference = {'macd': -4020.3, 'macd_signal': -14199.1, 'macd_histogram': -10178.8}
+    
     # 測試不同週期
     periods = [15, 30, 60]
     
@@ -81,26 +68,21 @@ def test_custom_macd():
                 continue
             
             print(f"✅ 獲取到 {len(kline_data)} 根K線")
-            close_prices = kline_data['close']
-            
-            # 測試不同計算方法
-            print("\n🔹 標準EMA方法:")
-            macd1, signal1, hist1 = calculator.calculate_macd_standard(close_prices)
-            print(f"   MACD: {macd1.iloc[-1]:.1f}, Signal: {signal1.iloc[-1]:.1f}, Hist: {hist1.iloc[-1]:.1f}")
-            
-            print("🔹 SMA信號線方法:")
-            macd2, signal2, hist2 = calculator.calculate_macd_sma_signal(close_prices)
-            print(f"   MACD: {macd2.iloc[-1]:.1f}, Signal: {signal2.iloc[-1]:.1f}, Hist: {hist2.iloc[-1]:.1f}")
             
-            print("🔹 百分比方法:")
-            macd3, signal3, hist3 = calculator.calculate_macd_percentage(close_prices)
-            print(f"   MACD: {macd3.iloc[-1]:.1f}, Signal: {signal3.iloc[-1]:.1f}, Hist: {hist3.iloc[-1]:.1f}")
+            # 一次計算全部變體並與參考值比對
+            ranking, results = calculator.rank_variants(kline_data['close'], reference)
+            for item in ranking:
+                values = results[item['name']]
+                print(f"🔹 {item['name']:<12} {MACD_VARIANTS[item['name']]['description']}")
+                print(f"   MACD: {values['macd'][-1]:.1f}, Signal: {values['macd_signal'][-1]:.1f}, "
+                      f"Hist: {values['macd_histogram'][-1]:.1f}, 誤差: {item['error'] * 100:.1f}%")
             
         except Exception as e:
             print(f"❌ 錯誤: {e}")
     
-    print(f"\n💡 MAX顯示的參考值: MACD=-4020.3, Signal=-14199.1, Histogram=-10178.8")
-    print("🔍 請檢查哪種方法最接近")
+    print(f"\n💡 MAX顯示的參考值: MACD={reference['macd']}, Signal={reference['macd_signal']}, "
+          f"Histogram={reference['macd_histogram']}")
+    print("🔍 誤差最小者排在最前，可設定 MACD_VARIANT 環境變數選用")
 
 if __name__ == "__main__":
     test_custom_macd() 
\ No newline at end of file
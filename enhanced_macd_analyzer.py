@@ -1,20 +1,27 @@
 import pandas as pd
 import numpy as np
-import ta
 from datetime import datetime, timedelta
 import logging
 import json
-from config import MACD_FAST_PERIOD, MACD_SLOW_PERIOD, MACD_SIGNAL_PERIOD
+from config import MACD_FAST_PERIOD, MACD_SLOW_PERIOD, MACD_SIGNAL_PERIOD, MACD_VARIANT
+from streaming_indicators import StreamingMACDTracker
+from indicator_graph import indicators_for, node_key
+from macd_variants import MACD_VARIANTS, evaluate_variants
 
 class EnhancedMACDAnalyzer:
-    def __init__(self):
+    def __init__(self, checkpoint=None, macd_variant=MACD_VARIANT):
         self.logger = logging.getLogger(__name__)
         self.fast_period = MACD_FAST_PERIOD
         self.slow_period = MACD_SLOW_PERIOD
         self.signal_period = MACD_SIGNAL_PERIOD
+        self.macd_variant = 'standard'
+        self.set_macd_variant(macd_variant)
         self.signal_history = []
         self.hourly_records = []
-        
+        # 各 (市場, 週期) 的串流MACD狀態；有檢查點（IndicatorCheckpoint）時接續停機前的狀態
+        self.checkpoint = checkpoint
+        self.streaming_trackers = self._restore_trackers()
+    
     def calculate_macd(self, df):
         """計算MACD指標 - 使用標準算法"""
         try:
@@ -22,34 +29,184 @@ class EnhancedMACDAnalyzer:
                 self.logger.warning("資料不足，無法計算MACD")
                 return None
             
-            df = df.copy()
-            
-            # 使用標準MACD計算方法
-            # 計算EMA
-            df['ema_12'] = ta.trend.EMAIndicator(close=df['close'], window=self.fast_period).ema_indicator()
-            df['ema_26'] = ta.trend.EMAIndicator(close=df['close'], window=self.slow_period).ema_indicator()
-            
-            # MACD = EMA12 - EMA26
-            df['macd'] = df['ema_12'] - df['ema_26']
-            
-            # Signal Line = EMA9 of MACD
-            df['macd_signal'] = ta.trend.EMAIndicator(close=df['macd'], window=self.signal_period).ema_indicator()
-            
-            # Histogram = MACD - Signal
-            df['macd_histogram'] = df['macd'] - df['macd_signal']
-            
-            # 計算 RSI 指標
-            df['rsi'] = ta.momentum.RSIIndicator(close=df['close'], window=14).rsi()
+            if self.macd_variant != 'standard':
+                df = self._calculate_macd_variant(df)
+            else:
+                # 使用標準MACD計算方法（共用指標依賴圖，同一份資料只計算一次）
+                # MACD = EMA12 - EMA26，Signal Line = EMA9 of MACD，Histogram = MACD - Signal
+                macd = node_key('macd', self.fast_period, self.slow_period, self.signal_period)
+                df = indicators_for(df).assign(df, {
+                    'ema_12': node_key('ema', self.fast_period),
+                    'ema_26': node_key('ema', self.slow_period),
+                    'macd': f"{macd}.macd",
+                    'macd_signal': f"{macd}.signal",
+                    'macd_histogram': f"{macd}.histogram",
+                    'rsi': node_key('rsi', 14)
+                })
             
             # 清理NaN值
             df = df.dropna()
             
             return df
-            
+        
         except Exception as e:
             self.logger.error(f"計算MACD失敗: {e}")
             return None
     
+    def set_macd_variant(self, name):
+        """選擇MACD算法變體（macd_variants.MACD_VARIANTS 的名稱）"""
+        if name not in MACD_VARIANTS:
+            self.logger.error(f"未知的MACD算法: {name}，可用: {', '.join(MACD_VARIANTS)}")
+            return False
+        self.macd_variant = name
+        return True
+    
+    def _calculate_macd_variant(self, df):
+        """以選定的MACD變體計算（RSI仍使用共用依賴圖）"""
+        values = evaluate_variants(df['close'], [self.macd_variant], self.fast_period,
+                                   self.slow_period, self.signal_period)[self.macd_variant]
+        return df.assign(
+            ema_12=values['ema_fast'],
+            ema_26=values['ema_slow'],
+            macd=values['macd'],
+            macd_signal=values['macd_signal'],
+            macd_histogram=values['macd_histogram'],
+            rsi=indicators_for(df)[node_key('rsi', 14)]
+        )
+    
+    def _restore_trackers(self):
+        """由檢查點還原串流狀態（參數不同的狀態捨棄）"""
+        if self.checkpoint is None:
+            return {}
+        params = (self.fast_period, self.slow_period, self.signal_period, 14)
+        return {key: tracker for key, tracker in self.checkpoint.load().items() if tracker.params == params}
+    
+    def get_streaming_macd(self, df, key='default', advance=True):
+        """以串流指標取得最新與前一根的MACD/RSI，只計算上次之後的新K線
+        
+        advance=False 時以狀態的複本計算（不改變追蹤器、不寫入檢查點），供互動查詢使用。
+        """
+        try:
+            if self.macd_variant != 'standard':
+                return None  # 串流指標只實作標準算法
+            tracker = self.streaming_trackers.get(key)
+            if not advance:
+                tracker = StreamingMACDTracker.restore(tracker.snapshot()) if tracker is not None else None
+            if tracker is None:
+                tracker = StreamingMACDTracker(self.fast_period, self.slow_period, self.signal_period)
+                if advance:
+                    self.streaming_trackers[key] = tracker
+            last_timestamp = tracker.last_timestamp
+            latest = tracker.sync(df)
+            
+            # 出現新K線（上一根已收盤）時寫入檢查點
+            if advance and self.checkpoint is not None and tracker.last_timestamp != last_timestamp:
+                self.checkpoint.save(self.streaming_trackers)
+            return {'latest': latest, 'previous': tracker.previous, 'ready': tracker.ready}
+        
+        except Exception as e:
+            self.logger.error(f"串流MACD更新失敗: {e}")
+            return None
+    
+    def _can_resume(self, key, df):
+        """是否有可直接接續的串流狀態（已預熱，且最後一根K線仍在本次資料範圍內）"""
+        tracker = self.streaming_trackers.get(key)
+        if tracker is None or tracker.last_timestamp is None or not tracker.ready or df is None or df.empty:
+            return False
+        return df['timestamp'].iloc[0] <= tracker.last_timestamp <= df['timestamp'].iloc[-1]
+    
+    def alert_indicators(self, frames, period, batch_engine=None, advance=True):
+        """警報使用的MACD/RSI，每個市場只由一個來源計算
+        
+        標準算法時，已有可接續串流狀態（含重啟後由檢查點還原）的市場只以上次之後的K線推進狀態；
+        其餘市場以 batch_engine 一次計算，並以結果設定串流狀態（之後改為逐根推進）；
+        批次也無法計算的市場（如K線不足）以串流狀態計算，非標準算法逐一以 calculate_macd 計算。
+        advance=False 時不改變串流狀態也不寫入檢查點（互動查詢用）。
+        回傳 {symbol: {'technical', 'previous', 'source'}}，資料不足的市場不列入。
+        """
+        standard = self.macd_variant == 'standard'
+        results = {}
+        pending = {}
+        for symbol, df in frames.items():
+            key = f"{symbol}:{period}"
+            if not standard:
+                df_with_macd = self.calculate_macd(df)
+                if df_with_macd is not None and len(df_with_macd) >= 2:
+                    results[symbol] = self._alert_values(df_with_macd.iloc[-1], df_with_macd.iloc[-2],
+                                                         'calculate_macd')
+            elif self._can_resume(key, df):
+                streaming = self.get_streaming_macd(df, key, advance)
+                if streaming and streaming['ready']:
+                    results[symbol] = self._alert_values(streaming['latest'], streaming['previous'], 'streaming')
+            else:
+                pending[symbol] = df
+        
+        batch = batch_engine.compute(pending) if pending and batch_engine is not None else None
+        for symbol, df in pending.items():
+            key = f"{symbol}:{period}"
+            if batch is not None and symbol in batch:
+                view = batch.view(symbol)
+                latest, previous = ({name: float(values[i]) for name, values in view.items()} for i in (-1, -2))
+                if advance:
+                    self._advance_streaming(key, df, view)
+                results[symbol] = self._alert_values(latest, previous, 'batch')
+            else:
+                streaming = self.get_streaming_macd(df, key, advance)
+                if streaming and streaming['ready']:
+                    results[symbol] = self._alert_values(streaming['latest'], streaming['previous'], 'streaming')
+        return results
+    
+    def _advance_streaming(self, key, df, view):
+        """以批次計算結果設定串流狀態（出現新K線時寫入檢查點）
+        
+        只以已收盤的K線（倒數第二、三列）設定狀態，最後一根形成中的K線另外以 update 加入，
+        與 sync 相同，檢查點不會保存未收盤的K線。
+        """
+        try:
+            tracker = self.streaming_trackers.get(key)
+            if tracker is None:
+                tracker = StreamingMACDTracker(self.fast_period, self.slow_period, self.signal_period)
+                self.streaming_trackers[key] = tracker
+            last_timestamp = tracker.last_timestamp
+            timestamps = df['timestamp']
+            close = df['close'].to_numpy(dtype=float)
+            closed, before = ({**{name: float(values[i]) for name, values in view.items()}, 'close': close[i]}
+                              for i in (-2, -3))
+            tracker.seed(timestamps.iloc[-2], len(df) - 1, closed, before)
+            tracker.update(timestamps.iloc[-1], close[-1])
+            if self.checkpoint is not None and tracker.last_timestamp != last_timestamp:
+                self.checkpoint.save(self.streaming_trackers)
+        
+        except Exception as e:
+            self.logger.error(f"串流MACD狀態更新失敗: {e}")
+    
+    @staticmethod
+    def _alert_values(latest, previous, source):
+        """整理為警報數據的 technical / previous 欄位（缺值以預設值代替）"""
+        def safe_get(row, key, default=0.0):
+            try:
+                value = row.get(key, default)
+                return float(value) if pd.notna(value) else default
+            except Exception:
+                return default
+        
+        return {
+            'technical': {
+                'macd': safe_get(latest, 'macd'),
+                'macd_signal': safe_get(latest, 'macd_signal'),
+                'macd_histogram': safe_get(latest, 'macd_histogram'),
+                'rsi': safe_get(latest, 'rsi', 50.0),  # RSI 默認值 50
+                'ema_12': safe_get(latest, 'ema_12'),
+                'ema_26': safe_get(latest, 'ema_26')
+            },
+            'previous': {
+                'macd': safe_get(previous, 'macd'),
+                'macd_signal': safe_get(previous, 'macd_signal'),
+                'macd_histogram': safe_get(previous, 'macd_histogram')
+            },
+            'source': source
+        }
+    
     def is_bottom_rebound(self, df, lookback=5):
         """判斷是否為底部反彈"""
         try:
@@ -73,7 +230,7 @@ class EnhancedMACDAnalyzer:
                     return True
             
             return False
-            
+        
         except Exception as e:
             self.logger.error(f"判斷底部反彈失敗: {e}")
             return False
@@ -101,7 +258,7 @@ class EnhancedMACDAnalyzer:
                     return True
             
             return False
-            
+        
         except Exception as e:
             self.logger.error(f"判斷高點下跌失敗: {e}")
             return False
@@ -182,7 +339,7 @@ class EnhancedMACDAnalyzer:
                 'trigger_data': trigger_data,
                 'timestamp': datetime.now()
             }
-            
+        
         except Exception as e:
             self.logger.error(f"增強信號分析失敗: {e}")
             return {
@@ -212,7 +369,7 @@ class EnhancedMACDAnalyzer:
                 })
             
             return trigger_records
-            
+        
         except Exception as e:
             self.logger.error(f"獲取觸發資料失敗: {e}")
             return []
@@ -250,7 +407,7 @@ class EnhancedMACDAnalyzer:
             
             self.logger.info(f"已記錄 {current_hour} 的MACD資料")
             return True
-            
+        
         except Exception as e:
             self.logger.error(f"整點記錄失敗: {e}")
             return False
@@ -269,7 +426,7 @@ class EnhancedMACDAnalyzer:
             
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(records_to_save, f, ensure_ascii=False, indent=2)
-                
+        
         except Exception as e:
             self.logger.error(f"保存整點記錄失敗: {e}")
     
@@ -277,7 +434,7 @@ class EnhancedMACDAnalyzer:
         """獲取MACD摘要資訊"""
         if df is None or len(df) == 0:
             return None
-            
+        
         latest = df.iloc[-1]
         return {
             'macd': latest['macd'] if not pd.isna(latest['macd']) else 0,
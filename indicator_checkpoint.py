@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+串流指標狀態檢查點
+將各 (市場, 週期) 的 EMA / MACD信號線 / RSI Wilder平均等累加狀態寫入JSON檔（暫存檔後原子替換），
+每根K線收盤時更新；重啟後還原，第一輪只需處理停機期間缺少的K線，不需重新預熱
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from config import INDICATOR_STATE_FILE
+from streaming_indicators import StreamingMACDTracker
+
+# 檢查點格式版本，格式改變時舊檔案直接忽略
+STATE_VERSION = 1
+
+class IndicatorCheckpoint:
+    """串流指標狀態的檔案檢查點"""
+    
+    def __init__(self, path: str = INDICATOR_STATE_FILE):
+        self.path = path
+        self.logger = logging.getLogger('IndicatorCheckpoint')
+        self._lock = threading.Lock()
+        self.stats = {
+            'saves': 0,
+            'restored': 0,
+            'last_saved': None
+        }
+    
+    def load(self) -> Dict[str, StreamingMACDTracker]:
+        """讀取檢查點，檔案不存在或損壞時回傳空dict（改為重新預熱）"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != STATE_VERSION:
+                self.logger.warning(f"指標狀態格式不符，忽略: {self.path}")
+                return {}
+            
+            trackers = {key: StreamingMACDTracker.restore(state) for key, state in data['trackers'].items()}
+            self.stats['restored'] = len(trackers)
+            self.logger.info(f"♻️ 已還原 {len(trackers)} 組指標狀態（{self.path}）")
+            return trackers
+        
+        except Exception as e:
+            self.logger.error(f"讀取指標狀態失敗，改為重新預熱: {e}")
+            return {}
+    
+    def save(self, trackers: Dict[str, StreamingMACDTracker]) -> bool:
+        """寫入全部追蹤器的狀態"""
+        try:
+            data = {
+                'version': STATE_VERSION,
+                'saved_at': time.time(),
+                # 只保存已收盤K線的狀態，形成中的K線重啟後由交易所資料重算
+                'trackers': {key: tracker.closed_snapshot() for key, tracker in trackers.items()}
+            }
+            with self._lock:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # 先寫暫存檔再替換，寫到一半被中斷也不會留下損壞的檢查點
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+                self.stats['saves'] += 1
+                self.stats['last_saved'] = data['saved_at']
+            return True
+        
+        except Exception as e:
+            self.logger.error(f"寫入指標狀態失敗: {e}")
+            return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """取得檢查點統計"""
+        return {**self.stats, 'path': self.path}
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+融合式技術指標引擎
+以NumPy一次計算 AdvancedCryptoAnalyzer 需要的全部指標，共用中間結果
+（真實波幅供ATR/ADX、滾動高低點供隨機指標/威廉指標、典型價格供CCI/MFI），
+結果為依賴圖記憶化的唯讀陣列；數值與 ta 套件一致。
+各指標的計算定義在 indicator_graph 的節點中，與其他分析器共用
+"""
+
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicator_graph import NODES, IndicatorContext, indicators_for, node_key, parse_key
+
+# 輸出欄位（順序與 calculate_all_indicators 相同）
+INDICATOR_COLUMNS = (
+    'ma7', 'ma25', 'ma99', 'ema12', 'ema26',
+    'macd', 'macd_signal', 'macd_histogram', 'rsi',
+    'bb_upper', 'bb_middle', 'bb_lower', 'bb_width', 'bb_position',
+    'stoch_k', 'stoch_d', 'williams_r', 'cci', 'atr', 'momentum',
+    'volume_sma', 'vpt', 'mfi', 'obv', 'adx'
+)
+
+DEFAULT_CONFIG = {
+    'ma_short': 7, 'ma_medium': 25, 'ma_long': 99,
+    'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'rsi_period': 14, 'bb_period': 20, 'bb_std': 2,
+    'stoch_k': 14, 'stoch_d': 3, 'williams_period': 14,
+    'cci_period': 20, 'atr_period': 14, 'momentum_period': 10,
+    'volume_sma': 20
+}
+
+MFI_WINDOW = 14
+ADX_WINDOW = 14
+
+# 精簡模式以float32儲存的衍生振盪指標（有界或相對數值，float32約7位有效數字已足夠）；
+# OHLCV、價格尺度的均線/MACD/布林帶/ATR與累計量（VPT/OBV）仍為float64
+COMPACT_COLUMNS = ('rsi', 'stoch_k', 'stoch_d', 'williams_r', 'cci', 'bb_position', 'bb_width',
+                   'momentum', 'mfi', 'adx')
+COMPACT_DTYPE = np.float32
+
+def indicator_keys(config: Dict = None) -> Dict[str, str]:
+    """輸出欄位對應的指標節點名稱（見 indicator_graph）"""
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    macd = node_key('macd', cfg['macd_fast'], cfg['macd_slow'], cfg['macd_signal'])
+    bb = node_key('bb', cfg['bb_period'], cfg['bb_std'])
+    stoch = node_key('stoch', cfg['stoch_k'], cfg['stoch_d'])
+    return {
+        'ma7': node_key('sma', cfg['ma_short']),
+        'ma25': node_key('sma', cfg['ma_medium']),
+        'ma99': node_key('sma', cfg['ma_long']),
+        'ema12': node_key('ema', 12),
+        'ema26': node_key('ema', 26),
+        'macd': f"{macd}.macd",
+        'macd_signal': f"{macd}.signal",
+        'macd_histogram': f"{macd}.histogram",
+        'rsi': node_key('rsi', cfg['rsi_period']),
+        'bb_upper': f"{bb}.upper",
+        'bb_middle': f"{bb}.middle",
+        'bb_lower': f"{bb}.lower",
+        'bb_width': f"{bb}.width",
+        'bb_position': f"{bb}.position",
+        'stoch_k': f"{stoch}.k",
+        'stoch_d': f"{stoch}.d",
+        'williams_r': node_key('williams', cfg['williams_period']),
+        'cci': node_key('cci', cfg['cci_period']),
+        'atr': node_key('atr', cfg['atr_period']),
+        'momentum': node_key('roc', cfg['momentum_period']),
+        'volume_sma': node_key('volume_sma', cfg['volume_sma']),
+        'vpt': 'vpt',
+        'mfi': node_key('mfi', MFI_WINDOW),
+        'obv': 'obv',
+        'adx': node_key('adx', ADX_WINDOW)
+    }
+
+def indicator_arrays(context: IndicatorContext, config: Dict = None) -> Dict[str, np.ndarray]:
+    """由指標求值環境取出全部欄位，回傳 {欄位: 一維陣列}
+    
+    陣列即為依賴圖記憶化的節點結果（唯讀、不複製），與共用同一求值環境的其他分析器共用。
+    """
+    keys = indicator_keys(config)
+    return {name: context[keys[name]] for name in INDICATOR_COLUMNS}
+
+def compute_indicators(high, low, close, volume, config: Dict = None) -> Dict[str, np.ndarray]:
+    """計算全部指標，回傳 {欄位: 一維唯讀陣列}（依賴圖的計算結果）"""
+    context = IndicatorContext({'high': high, 'low': low, 'close': close, 'volume': volume})
+    return indicator_arrays(context, config)
+
+def compact_dtype(name: str, compact: bool = True):
+    """欄位在精簡模式下的儲存型別"""
+    return COMPACT_DTYPE if compact and name in COMPACT_COLUMNS else np.float64
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """將指標DataFrame的振盪指標欄位轉為float32（其餘欄位不變）"""
+    return df.astype({name: COMPACT_DTYPE for name in COMPACT_COLUMNS if name in df.columns})
+
+def add_indicators(df: pd.DataFrame, config: Dict = None, compact: bool = False) -> pd.DataFrame:
+    """回傳加上全部指標欄位的DataFrame副本（compact=True 時振盪指標為float32）"""
+    # 透過共用依賴圖計算，其他分析器可沿用相同資料的結果
+    cols = indicator_arrays(indicators_for(df), config)
+    if compact:
+        # 依型別分為float64與float32兩個區塊
+        indicators = pd.DataFrame({name: cols[name].astype(compact_dtype(name))
+                                   for name in INDICATOR_COLUMNS}, index=df.index)
+    else:
+        # 複製到單一二維區塊後一次加入，避免逐欄插入
+        block = np.empty((len(INDICATOR_COLUMNS), len(df)))
+        for i, name in enumerate(INDICATOR_COLUMNS):
+            block[i] = cols[name]
+        indicators = pd.DataFrame(block.T, index=df.index, columns=list(INDICATOR_COLUMNS), copy=False)
+    base = df.drop(columns=[c for c in INDICATOR_COLUMNS if c in df.columns])
+    return pd.concat([base, indicators], axis=1)
+
+def warmup_rows(config: Dict = None) -> int:
+    """全部指標都有值之前的暖機根數（等同 calculate_all_indicators 的 dropna 前段）"""
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    return max(
+        cfg['ma_short'] - 1, cfg['ma_medium'] - 1, cfg['ma_long'] - 1, 26 - 1,
+        cfg['macd_slow'] + cfg['macd_signal'] - 2, cfg['rsi_period'] - 1, cfg['bb_period'] - 1,
+        cfg['stoch_k'] + cfg['stoch_d'] - 2, cfg['williams_period'] - 1, cfg['cci_period'] - 1,
+        cfg['momentum_period'], cfg['volume_sma'] - 1, MFI_WINDOW - 1, 1
+    )
+
+def compact_report(df: pd.DataFrame, config: Dict = None) -> Dict:
+    """比較完整與精簡模式的指標DataFrame：記憶體用量與各float32欄位的數值漂移"""
+    full = add_indicators(df, config).iloc[warmup_rows(config):]
+    compact = add_indicators(df, config, compact=True).iloc[warmup_rows(config):]
+    full_bytes = int(full.memory_usage(deep=True).sum())
+    compact_bytes = int(compact.memory_usage(deep=True).sum())
+    
+    drift = {}
+    for name in COMPACT_COLUMNS:
+        expected = full[name].to_numpy()
+        diff = np.abs(compact[name].to_numpy(dtype=np.float64) - expected)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rel = np.where(expected != 0, diff / np.abs(expected), 0.0)
+        drift[name] = {
+            'max_abs_error': float(np.nanmax(diff)) if len(diff) else 0.0,
+            'max_rel_error': float(np.nanmax(rel)) if len(rel) else 0.0
+        }
+    
+    return {
+        'rows': len(full),
+        'bytes_full': full_bytes,
+        'bytes_compact': compact_bytes,
+        'saved_bytes': full_bytes - compact_bytes,
+        'saved_ratio': 1 - compact_bytes / full_bytes if full_bytes else 0.0,
+        'drift': drift
+    }
+
+class IndicatorUsage:
+    """統計各指標欄位實際被讀取的次數（frames 為讀取過任一指標的框架數）"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.columns = {name: 0 for name in INDICATOR_COLUMNS}
+    
+    def record_frame(self):
+        with self._lock:
+            self.frames += 1
+    
+    def record(self, name: str):
+        with self._lock:
+            self.columns[name] = self.columns.get(name, 0) + 1
+    
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                'frames': self.frames,
+                'columns': dict(self.columns),
+                'unused': [name for name in INDICATOR_COLUMNS if self.columns.get(name, 0) == 0]
+            }
+
+_usage = IndicatorUsage()
+
+def get_indicator_usage() -> IndicatorUsage:
+    """取得全域的指標使用統計"""
+    return _usage
+
+class _LazyRow:
+    """框架中的一列，欄位在讀取時才計算"""
+    
+    def __init__(self, frame: 'LazyIndicatorFrame', position: int):
+        self._frame = frame
+        self._position = position
+    
+    def __getitem__(self, name: str):
+        return self._frame[name].iloc[self._position]
+    
+    def get(self, name: str, default=None):
+        return self[name] if name in self._frame.columns else default
+
+class _LazyILoc:
+    def __init__(self, frame: 'LazyIndicatorFrame'):
+        self._frame = frame
+    
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return _LazyRow(self._frame, int(item))
+        # 切片等其他用法需要完整資料
+        return self._frame.materialize().iloc[item]
+
+class LazyIndicatorFrame:
+    """按需計算的指標框架
+    
+    行為接近 calculate_all_indicators 的結果：欄位名稱相同、去掉暖機前段；
+    指標欄位第一次讀取時才由共用依賴圖計算，並記錄實際用到的欄位（self.used）。
+    也可以直接以節點名稱讀取，例如 frame['highest:20']。
+    compact=True 時振盪指標欄位（COMPACT_COLUMNS）以float32保存。
+    """
+    
+    def __init__(self, df: pd.DataFrame, config: Dict = None, warmup: int = 0,
+                 context: IndicatorContext = None, usage: Optional[IndicatorUsage] = None,
+                 compact: bool = False):
+        self.context = context if context is not None else indicators_for(df)
+        self.keys = indicator_keys(config)
+        self.base = df.iloc[warmup:]
+        self.compact = compact
+        self.used = []
+        self._start = warmup
+        self._series: Dict[str, pd.Series] = {}
+        self._usage = usage if usage is not None else _usage
+        self._counted = False
+    
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(list(self.base.columns) + [name for name in INDICATOR_COLUMNS if name not in self.base.columns])
+    
+    @property
+    def index(self) -> pd.Index:
+        return self.base.index
+    
+    @property
+    def iloc(self) -> _LazyILoc:
+        return _LazyILoc(self)
+    
+    def __len__(self) -> int:
+        return len(self.base)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+    
+    def __getitem__(self, name: str) -> pd.Series:
+        if name in self.base.columns:
+            return self.base[name]
+        if name not in self._series:
+            if name in self.keys:
+                key = self.keys[name]
+            elif parse_key(name)[0] in NODES:
+                key = name
+            else:
+                raise KeyError(name)
+            values = self.context[key][self._start:]
+            if self.compact and name in COMPACT_COLUMNS:
+                values = values.astype(COMPACT_DTYPE)
+            self._series[name] = pd.Series(values, index=self.base.index, name=name)
+        if name not in self.used:
+            # 每個框架（含快取取出的複本）各自記錄讀取過的欄位
+            self.used.append(name)
+            if name in self.keys:
+                if not self._counted:
+                    self._usage.record_frame()
+                    self._counted = True
+                self._usage.record(name)
+        return self._series[name]
+    
+    def __copy__(self):
+        """快取命中時的複本：共用唯讀的依賴圖與已計算的欄位，使用紀錄重新開始"""
+        clone = object.__new__(LazyIndicatorFrame)
+        clone.__dict__.update(self.__dict__)
+        clone.used = []
+        clone._series = dict(self._series)
+        clone._counted = False
+        return clone
+    
+    def get(self, name: str, default=None):
+        return self[name] if name in self.columns else default
+    
+    def tail(self, n: int = 5) -> pd.DataFrame:
+        return self.materialize().tail(n)
+    
+    def materialize(self, columns=None) -> pd.DataFrame:
+        """轉為一般DataFrame（預設包含全部指標欄位）"""
+        names = [name for name in (columns or INDICATOR_COLUMNS) if name not in self.base.columns]
+        indicators = pd.DataFrame({name: self[name] for name in names}, index=self.base.index)
+        return pd.concat([self.base, indicators], axis=1)
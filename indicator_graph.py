@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+技術指標依賴圖
+每個指標節點（ema:12、macd:12/26/9、rsi:14、bb:20/2 ...）只宣告一次，
+同一份K線資料（以OHLCV內容判斷版本）下每個節點最多計算一次；
+各分析器以名稱取用欄位，共用記憶化的結果。數值與 ta 套件一致
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+INPUT_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+CHUNK_ROWS = 1 << 16  # 滑動視窗運算的分塊大小，限制暫存記憶體
+
+# 節點種類 -> 計算函數 func(ctx, *params)，回傳一維陣列或 {欄位: 陣列}
+NODES: Dict[str, Callable] = {}
+
+def register_node(kind: str):
+    """註冊指標節點的裝飾器"""
+    def decorator(func):
+        NODES[kind] = func
+        return func
+    return decorator
+
+def _format_param(value) -> str:
+    return f"{value:g}" if isinstance(value, (int, float, np.number)) else str(value)
+
+def node_key(kind: str, *params) -> str:
+    """產生標準節點名稱，例如 node_key('macd', 12, 26, 9) -> 'macd:12/26/9'"""
+    if not params:
+        return kind
+    return f"{kind}:{'/'.join(_format_param(p) for p in params)}"
+
+def _parse_param(text: str):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+def parse_key(key: str):
+    """'bb:20/2.upper' -> ('bb', (20, 2), 'upper')；參數可含小數點（'bb:20/1.5.upper'）"""
+    kind, _, rest = key.partition(':')
+    params, field = rest, None
+    head, _, tail = rest.rpartition('.')
+    if head and tail.isidentifier():
+        params, field = head, tail
+    if not rest:
+        kind, _, field = kind.partition('.')
+    params = tuple(_parse_param(p) for p in params.split('/')) if params else ()
+    return kind, params, field or None
+
+# ---- 基礎運算 ----
+
+def ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """y[i] = (1-alpha)*y[i-1] + alpha*x[i]，y[0] = x[0]（使用pandas編譯過的遞迴實作）
+    
+    二維陣列沿時間軸（axis 0）逐欄遞迴，各欄從第一個有效值起算；
+    全部EMA類指標（依賴圖、批次引擎、MACD變體）都經由此函數，數值不會分歧
+    """
+    frame = pd.DataFrame(values) if values.ndim == 2 else pd.Series(values)
+    return frame.ewm(alpha=alpha, adjust=False).mean().to_numpy(dtype=np.float64, copy=True)
+
+def _shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    shifted = np.full(len(values), np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+def _ema(values: np.ndarray, window: int) -> np.ndarray:
+    """EMA（ta：adjust=False，從第一個有效值起算，前 window-1 根為NaN）"""
+    out = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid):
+        start = valid[0]
+        out[start:] = ewm(values[start:], 2.0 / (window + 1))
+        out[start:start + window - 1] = np.nan
+    return out
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        csum = np.cumsum(values)
+        out[window - 1] = csum[window - 1]
+        out[window:] = csum[window:] - csum[:-window]
+    return out
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """滾動平均（以前綴和計算，先減去基準值降低誤差）"""
+    if len(values) < window:
+        return np.full(len(values), np.nan)
+    base = values[0]
+    return _rolling_sum(values - base, window) / window + base
+
+def _rolling_reduce(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    """以滑動視窗（不複製）分塊套用歸約函數"""
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    windows = sliding_window_view(values, window)
+    for start in range(0, len(windows), CHUNK_ROWS):
+        end = min(start + CHUNK_ROWS, len(windows))
+        out[window - 1 + start:window - 1 + end] = reducer(windows[start:end])
+    return out
+
+def _wilder_sum(seed: float, values: np.ndarray, window: int) -> np.ndarray:
+    """ta ADX使用的平滑：s[i] = s[i-1] - s[i-1]/window + values[i-1]，s[0] = seed"""
+    return ewm(np.concatenate(([seed], values * window)), 1.0 / window)
+
+# ---- 指標節點 ----
+
+@register_node('prev_close')
+def _prev_close(ctx):
+    return _shift(ctx['close'])
+
+@register_node('tr')
+def _true_range(ctx):
+    high, low, prev_close = ctx['high'], ctx['low'], ctx['prev_close']
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+@register_node('tp')
+def _typical_price(ctx):
+    return (ctx['high'] + ctx['low'] + ctx['close']) / 3.0
+
+@register_node('sma')
+def _sma(ctx, window):
+    return _rolling_mean(ctx['close'], window)
+
+@register_node('ema')
+def _ema_node(ctx, window):
+    return _ema(ctx['close'], window)
+
+@register_node('std')
+def _std(ctx, window):
+    return _rolling_reduce(ctx['close'], window, lambda block: block.std(axis=1))
+
+@register_node('highest')
+def _highest(ctx, window):
+    return _rolling_reduce(ctx['high'], window, lambda block: block.max(axis=1))
+
+@register_node('lowest')
+def _lowest(ctx, window):
+    return _rolling_reduce(ctx['low'], window, lambda block: block.min(axis=1))
+
+@register_node('macd')
+def _macd(ctx, fast, slow, signal):
+    macd = ctx[node_key('ema', fast)] - ctx[node_key('ema', slow)]
+    macd_signal = _ema(macd, signal)
+    return {'macd': macd, 'signal': macd_signal, 'histogram': macd - macd_signal}
+
+@register_node('rsi')
+def _rsi(ctx, window):
+    # 第一根的漲跌視為0
+    diff = ctx['close'] - ctx['prev_close']
+    avg_gain = ewm(np.where(diff > 0, diff, 0.0), 1.0 / window)
+    avg_loss = ewm(np.where(diff < 0, -diff, 0.0), 1.0 / window)
+    avg_gain[:window - 1] = np.nan
+    avg_loss[:window - 1] = np.nan
+    return np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+
+@register_node('bb')
+def _bollinger(ctx, window, deviations):
+    middle = ctx[node_key('sma', window)]
+    std = ctx[node_key('std', window)]
+    upper = middle + deviations * std
+    lower = middle - deviations * std
+    band = upper - lower
+    return {
+        'upper': upper,
+        'middle': middle,
+        'lower': lower,
+        'width': band / middle,
+        'position': (ctx['close'] - lower) / band
+    }
+
+@register_node('stoch')
+def _stochastic(ctx, window, smooth_window):
+    lowest = ctx[node_key('lowest', window)]
+    k = 100 * (ctx['close'] - lowest) / (ctx[node_key('highest', window)] - lowest)
+    return {'k': k, 'd': _rolling_reduce(k, smooth_window, lambda block: block.mean(axis=1))}
+
+@register_node('williams')
+def _williams_r(ctx, window):
+    highest = ctx[node_key('highest', window)]
+    return -100 * (highest - ctx['close']) / (highest - ctx[node_key('lowest', window)])
+
+@register_node('cci')
+def _cci(ctx, window):
+    tp = ctx['tp']
+    mad = _rolling_reduce(tp, window, lambda block: np.abs(block - block.mean(axis=1, keepdims=True)).mean(axis=1))
+    return (tp - _rolling_mean(tp, window)) / (0.015 * mad)
+
+@register_node('atr')
+def _atr(ctx, window):
+    # ta 的ATR前段為0而非NaN
+    tr = ctx['tr']
+    atr = np.zeros(len(tr))
+    if len(tr) >= window:
+        atr[window - 1:] = ewm(np.concatenate(([tr[:window].mean()], tr[window:])), 1.0 / window)
+    return atr
+
+@register_node('roc')
+def _roc(ctx, window):
+    close = ctx['close']
+    lagged = _shift(close, window)
+    return (close - lagged) / lagged * 100
+
+@register_node('volume_sma')
+def _volume_sma(ctx, window):
+    return _rolling_mean(ctx['volume'], window)
+
+@register_node('vpt')
+def _vpt(ctx):
+    close, prev_close, volume = ctx['close'], ctx['prev_close'], ctx['volume']
+    vpt = np.full(len(close), np.nan)
+    vpt[1:] = np.cumsum((close[1:] - prev_close[1:]) / prev_close[1:] * volume[1:])
+    return vpt
+
+@register_node('mfi')
+def _mfi(ctx, window):
+    tp, volume = ctx['tp'], ctx['volume']
+    direction = np.sign(tp - _shift(tp))
+    direction[0] = 0.0
+    money_flow = tp * volume * direction
+    positive = _rolling_sum(np.where(money_flow >= 0, money_flow, 0.0), window)
+    negative = np.abs(_rolling_sum(np.where(money_flow < 0, money_flow, 0.0), window))
+    return 100 - 100 / (1 + positive / negative)
+
+@register_node('obv')
+def _obv(ctx):
+    volume = ctx['volume']
+    return np.cumsum(np.where(ctx['close'] < ctx['prev_close'], -volume, volume))
+
+@register_node('adx')
+def _adx(ctx, window):
+    """ADX（逐步對應 ta.trend.ADXIndicator 的計算方式，前段為0）"""
+    true_range, high, low = ctx['tr'], ctx['high'], ctx['low']
+    n = len(true_range)
+    out = np.zeros(n)
+    length = n - (window - 1)
+    if length < window + 2:
+        return out
+    
+    diff_up = high[1:] - high[:-1]
+    diff_down = low[:-1] - low[1:]
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+    tr = true_range[1:]  # 第一根沒有前收盤價
+    
+    smoothed = []
+    for series in (tr, pos, neg):
+        values = np.zeros(length)
+        values[:-1] = _wilder_sum(series[:window].sum(), series[window:n - 1], window)
+        smoothed.append(values)
+    trs, dip, din = smoothed
+    
+    nonzero = trs != 0
+    dip_ratio = np.where(nonzero, 100 * dip / np.where(nonzero, trs, 1), 0.0)
+    din_ratio = np.where(nonzero, 100 * din / np.where(nonzero, trs, 1), 0.0)
+    total = dip_ratio + din_ratio
+    dx = np.where(total != 0, 100 * np.abs(dip_ratio - din_ratio) / np.where(total != 0, total, 1), 0.0)
+    
+    out[2 * window - 1:] = ewm(np.concatenate(([dx[:window].mean()], dx[window:length - 1])), 1.0 / window)
+    return out
+
+# ---- 求值 ----
+
+def _readonly(value):
+    if isinstance(value, dict):
+        for array in value.values():
+            array.setflags(write=False)
+    else:
+        value.setflags(write=False)
+    return value
+
+class IndicatorContext:
+    """一份K線資料的指標求值結果（記憶化，結果陣列為唯讀）"""
+    
+    def __init__(self, inputs: Dict[str, np.ndarray], graph: 'IndicatorGraph' = None):
+        self.inputs = {name: _readonly(np.ascontiguousarray(values, dtype=np.float64))
+                       for name, values in inputs.items()}
+        self.length = len(next(iter(self.inputs.values()))) if self.inputs else 0
+        self.graph = graph
+        self.evaluated = []  # 依計算順序記錄已求值的節點
+        self._values: Dict[str, Union[np.ndarray, Dict[str, np.ndarray]]] = {}
+        self._lock = threading.RLock()
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, graph: 'IndicatorGraph' = None) -> 'IndicatorContext':
+        inputs = {col: df[col].to_numpy(dtype=np.float64) for col in INPUT_COLUMNS if col in df.columns}
+        return cls(inputs, graph)
+    
+    def node(self, key: str):
+        """取得節點結果（第一次取用時計算）"""
+        if key in self.inputs:
+            return self.inputs[key]
+        
+        kind, params, _ = parse_key(key)
+        canonical = node_key(kind, *params)
+        with self._lock:
+            if canonical not in self._values:
+                if kind not in NODES:
+                    raise KeyError(f"未知的指標節點: {key}")
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    value = NODES[kind](self, *params)
+                self._values[canonical] = _readonly(value)
+                self.evaluated.append(canonical)
+                if self.graph is not None:
+                    self.graph._count_evaluation(kind)
+            return self._values[canonical]
+    
+    def __getitem__(self, key: str) -> np.ndarray:
+        """取得欄位，例如 ctx['rsi:14']、ctx['macd:12/26/9.signal']"""
+        value = self.node(key)
+        field = parse_key(key)[2]
+        if isinstance(value, dict):
+            if field is None:
+                raise KeyError(f"{key} 有多個欄位，請指定其中之一: {', '.join(value)}")
+            return value[field]
+        return value
+    
+    def __contains__(self, key: str) -> bool:
+        kind, params, _ = parse_key(key)
+        return key in self.inputs or node_key(kind, *params) in self._values
+    
+    def columns(self, mapping: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """依 {欄位名稱: 節點名稱} 取得多個欄位"""
+        return {name: self[key] for name, key in mapping.items()}
+    
+    def assign(self, df: pd.DataFrame, mapping: Dict[str, str]) -> pd.DataFrame:
+        """回傳加上指定指標欄位的DataFrame副本"""
+        columns = self.columns(mapping)
+        if any(name in df.columns for name in columns):
+            df = df.copy()
+            for name, values in columns.items():
+                df[name] = values
+            return df
+        return pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
+
+def frame_version(df: pd.DataFrame) -> str:
+    """以OHLCV內容產生版本識別（內容相同即視為同一版本）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for col in INPUT_COLUMNS:
+        if col in df.columns:
+            digest.update(col.encode())
+            digest.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    digest.update(str(len(df)).encode())
+    return digest.hexdigest()
+
+class IndicatorGraph:
+    """指標依賴圖：保留最近幾個資料版本的求值結果，供各分析器共用"""
+    
+    def __init__(self, max_versions: int = 8):
+        self.max_versions = max_versions
+        self._contexts: 'OrderedDict[str, IndicatorContext]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evaluations': 0, 'by_kind': {}}
+    
+    def _count_evaluation(self, kind: str):
+        with self._lock:
+            self.stats['evaluations'] += 1
+            self.stats['by_kind'][kind] = self.stats['by_kind'].get(kind, 0) + 1
+    
+    def context(self, df: pd.DataFrame) -> IndicatorContext:
+        """取得此K線資料版本的求值環境（相同版本回傳同一個環境）"""
+        version = frame_version(df)
+        with self._lock:
+            ctx = self._contexts.get(version)
+            if ctx is not None:
+                self._contexts.move_to_end(version)
+                self.stats['hits'] += 1
+                return ctx
+            self.stats['misses'] += 1
+        
+        ctx = IndicatorContext.from_frame(df, self)
+        with self._lock:
+            # 其他執行緒可能已建立同一版本
+            ctx = self._contexts.setdefault(version, ctx)
+            self._contexts.move_to_end(version)
+            while len(self._contexts) > self.max_versions:
+                self._contexts.popitem(last=False)
+        return ctx
+    
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+
+_default_graph = None
+_default_lock = threading.Lock()
+
+def get_indicator_graph() -> IndicatorGraph:
+    """取得全域共用的指標依賴圖"""
+    global _default_graph
+    with _default_lock:
+        if _default_graph is None:
+            _default_graph = IndicatorGraph()
+        return _default_graph
+
+def indicators_for(df: pd.DataFrame) -> IndicatorContext:
+    """取得此K線資料在共用依賴圖中的求值環境"""
+    return get_indicator_graph().context(df)
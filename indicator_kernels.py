@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+二維指標欄位運算
+沿時間軸（第0軸）一次處理多個欄位的遞迴平滑與滾動歸約，
+供多市場批次計算（batch_indicators）與MACD算法變體（macd_variants）共用
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicator_graph import CHUNK_ROWS, ewm
+
+def ewm_columns(values: np.ndarray, alpha, min_periods) -> np.ndarray:
+    """沿時間軸遞迴的EMA（adjust=False，各欄從第一個有效值起算）
+    
+    alpha 與 min_periods 可為每欄各自的值；相同 alpha 的欄位一起交給 indicator_graph.ewm
+    （pandas編譯過的遞迴），Python 層的呼叫次數只與不同 alpha 的數量有關。
+    """
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), values.shape[1:])
+    out = np.empty_like(values, dtype=np.float64)
+    for value in np.unique(alpha):
+        cols = np.flatnonzero(alpha == value)
+        out[:, cols] = ewm(values[:, cols], value)
+    counts = np.cumsum(~np.isnan(values), axis=0)
+    out[counts < np.asarray(min_periods)] = np.nan
+    return out
+
+def rolling_columns(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    """沿時間軸的滾動歸約（滑動視窗不複製、分塊計算），視窗內有NaN即為NaN"""
+    out = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return out
+    windows = sliding_window_view(values, window, axis=0)
+    chunk = max(1, CHUNK_ROWS // max(1, values.shape[1]))
+    for start in range(0, len(windows), chunk):
+        end = min(start + chunk, len(windows))
+        out[window - 1 + start:window - 1 + end] = reducer(windows[start:end], axis=-1)
+    return out
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+K線快速解碼器
+將 /k 回應直接轉為連續記憶體的NumPy結構化陣列（時間戳int64、價量float64），
+不經過pandas；需要DataFrame時才延遲建立
+"""
+
+import numpy as np
+import pandas as pd
+
+KLINE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+KLINE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),   # K線開始時間（秒）
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8')
+])
+
+class KlineArray:
+    """唯讀的K線結構化陣列，DataFrame在第一次需要時才建立"""
+    
+    def __init__(self, records: np.ndarray):
+        if records.flags.writeable:
+            records.flags.writeable = False  # 唯讀，可安全地在快取與呼叫者之間共用
+        self.records = records
+        self._df = None
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __getitem__(self, field):
+        """取得欄位（timestamp為epoch秒，其餘為float64）"""
+        return self.records[field]
+    
+    def __copy__(self):
+        # 共用唯讀資料，各自建立自己的DataFrame
+        return KlineArray(self.records)
+    
+    @property
+    def empty(self):
+        return len(self.records) == 0
+    
+    def last_timestamp(self):
+        return int(self.records['timestamp'][-1])
+    
+    def tail(self, limit: int) -> 'KlineArray':
+        return KlineArray(self.records[-limit:] if limit else self.records[:0])
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """轉換為與 MaxAPI.get_klines 相同欄位的DataFrame（延遲建立並快取）"""
+        if self._df is None:
+            data = {'timestamp': pd.to_datetime(self.records['timestamp'], unit='s')}
+            for field in KLINE_FIELDS[1:]:
+                data[field] = self.records[field]
+            self._df = pd.DataFrame(data)
+        return self._df
+    
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'KlineArray':
+        """由DataFrame建立（用於重採樣或外部資料）"""
+        records = np.empty(len(df), dtype=KLINE_DTYPE)
+        records['timestamp'] = df['timestamp'].values.astype('datetime64[s]').astype(np.int64)
+        for field in KLINE_FIELDS[1:]:
+            records[field] = df[field].values
+        return cls(records)
+
+def decode_klines(data) -> KlineArray:
+    """將 /k 回應（[[ts, o, h, l, c, v], ...]）解碼為KlineArray"""
+    if not data:
+        return KlineArray(np.empty(0, dtype=KLINE_DTYPE))
+    
+    raw = np.asarray(data, dtype=np.float64)
+    if raw.ndim != 2 or raw.shape[1] != len(KLINE_FIELDS):
+        raise ValueError(f"K線資料格式錯誤: shape={raw.shape}")
+    
+    # 已排序時（MAX回應皆為時間遞增）略過排序
+    ts = raw[:, 0]
+    if len(ts) > 1 and not (ts[1:] >= ts[:-1]).all():
+        raw = raw[np.argsort(ts, kind='stable')]
+    
+    records = np.empty(len(raw), dtype=KLINE_DTYPE)
+    records['timestamp'] = raw[:, 0].astype(np.int64)
+    for i, field in enumerate(KLINE_FIELDS[1:], start=1):
+        records[field] = raw[:, i]
+    return KlineArray(records)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+K線缺口偵測
+以時間戳差分向量化找出缺少的K線區間，並將補抓到的K線插入原序列
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from kline_decoder import KlineArray
+
+def find_gaps(timestamps, period: int) -> List[Tuple[int, int, int]]:
+    """找出缺少K線的區間，回傳 [(缺口起點, 缺口終點(不含), 缺少根數), ...]"""
+    ts = np.asarray(timestamps, dtype=np.int64)
+    if len(ts) < 2:
+        return []
+    
+    step = period * 60
+    idx = np.flatnonzero(np.diff(ts) > step)
+    if len(idx) == 0:
+        return []
+    
+    starts = ts[idx] + step
+    ends = ts[idx + 1]
+    missing = (ends - starts + step - 1) // step
+    return list(zip(starts.tolist(), ends.tolist(), missing.tolist()))
+
+def insert_klines(base: KlineArray, rows: KlineArray) -> KlineArray:
+    """將補抓的K線插入序列（已存在的時間戳保留原資料）"""
+    if rows is None or rows.empty:
+        return base
+    
+    new = rows.records[~np.isin(rows['timestamp'], base['timestamp'])]
+    if len(new) == 0:
+        return base
+    
+    merged = np.concatenate([base.records, new])
+    return KlineArray(merged[np.argsort(merged['timestamp'], kind='stable')])
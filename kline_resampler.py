@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多週期K線重採樣
+由快取的1分鐘K線向量化合成 5/15/30/60/240 分鐘等週期K線，
+K線區間與MAX一致（以UTC epoch為基準對齊）
+"""
+
+import numpy as np
+import pandas as pd
+
+from kline_decoder import KLINE_DTYPE, KLINE_FIELDS, KlineArray
+
+# 支援由1分鐘K線合成的週期（分鐘）
+RESAMPLE_PERIODS = (5, 15, 30, 60, 120, 240, 360, 720, 1440)
+
+def resample_records(records: np.ndarray, period: int, base_period: int = 1) -> np.ndarray:
+    """將 base_period 分鐘K線結構化陣列（KLINE_DTYPE）合成為 period 分鐘K線
+    
+    第一個區間若不完整（資料不是從區間起點開始）會被捨棄，
+    最後一個區間為仍在形成中的K線，與MAX回傳的最後一根一致。
+    """
+    if period % base_period != 0:
+        raise ValueError(f"{period}分鐘無法由{base_period}分鐘K線合成")
+    
+    if len(records) == 0:
+        return np.empty(0, dtype=KLINE_DTYPE)
+    
+    ts = records['timestamp']
+    step = period * 60
+    buckets = ts // step * step
+    
+    # 每個區間的起始索引
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:] - 1, len(ts) - 1]
+    
+    result = np.empty(len(starts), dtype=KLINE_DTYPE)
+    result['timestamp'] = buckets[starts]
+    result['open'] = records['open'][starts]
+    result['high'] = np.maximum.reduceat(records['high'], starts)
+    result['low'] = np.minimum.reduceat(records['low'], starts)
+    result['close'] = records['close'][ends]
+    result['volume'] = np.add.reduceat(records['volume'], starts)
+    
+    # 捨棄不完整的第一個區間
+    if ts[0] != buckets[0]:
+        result = result[1:]
+    
+    return result
+
+def resample_klines(df: pd.DataFrame, period: int, base_period: int = 1) -> pd.DataFrame:
+    """DataFrame版本的 resample_records"""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=list(KLINE_FIELDS))
+    
+    records = KlineArray.from_dataframe(df).records
+    return KlineArray(resample_records(records, period, base_period)).to_dataframe()
+
+def required_base_rows(period: int, limit: int, base_period: int = 1) -> int:
+    """合成 limit 根 period 分鐘K線所需的基礎K線數量（含不完整區間的緩衝）"""
+    return (limit + 1) * (period // base_period)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+形成中K線的即時更新
+由 ticker / trade 逐筆資料直接更新最後一根（形成中）K線的最高/最低/收盤/成交量，
+並以串流指標（StreamingMACDTracker.revise）逐筆修正該K線的MACD/RSI，不需重新抓取整段K線；
+每筆更新為O(1)，可讓GUI與直播疊加以逐筆頻率顯示盤中MACD
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+from max_websocket import KLINE_RESOLUTIONS
+from streaming_indicators import StreamingMACDTracker
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+def _tick_epoch(value) -> float:
+    """逐筆資料的時間（秒）：ticker/trade 事件的時間為本地時間的 datetime，或直接傳入epoch秒"""
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+class LiveCandle:
+    """單一市場/週期的形成中K線與其指標"""
+    
+    def __init__(self, market: str, period: int, tracker: StreamingMACDTracker = None):
+        self.market = market
+        self.period = period
+        self.tracker = tracker or StreamingMACDTracker()
+        self.logger = logging.getLogger('LiveCandle')
+        # 形成中K線：timestamp 為K線起點（UTC，與 /k 的時間欄位相同）
+        self.bar: Optional[Dict] = None
+        self._bar_epoch: Optional[int] = None
+        
+        self.stats = {
+            'ticks': 0,
+            'bars_opened': 0,
+            'late_ticks': 0   # 屬於已收盤K線的逐筆資料（忽略）
+        }
+    
+    def load(self, df: pd.DataFrame) -> Optional[Dict]:
+        """由 /k 回應（最後一根為形成中K線）同步K線與指標
+        
+        逐筆資料收盤的上一根K線以 /k 的收盤價為準（tracker.sync 會回到該K線之前重新計算）。
+        """
+        if df is None or df.empty:
+            return None
+        self.tracker.sync(df)
+        last = df.iloc[-1]
+        if self.bar is None or pd.Timestamp(last['timestamp']) >= self.bar['timestamp']:
+            self._set_bar(pd.Timestamp(last['timestamp']), last)
+        return self.snapshot()
+    
+    def _set_bar(self, start: pd.Timestamp, values):
+        self.bar = {'timestamp': start}
+        self.bar.update({field: float(values[field]) for field in BAR_FIELDS})
+        self._bar_epoch = int(start.timestamp())
+    
+    def on_tick(self, price: float, timestamp=None, volume: float = 0.0) -> Optional[Dict]:
+        """處理一筆成交或最新價：更新形成中K線並修正其指標，跨入下一根時開新K線"""
+        epoch = _tick_epoch(timestamp) if timestamp is not None else datetime.now().timestamp()
+        step = self.period * 60
+        start = int(epoch) // step * step
+        self.stats['ticks'] += 1
+        
+        if self.bar is None or start > self._bar_epoch:
+            # 上一根已收盤，以這筆價格開新K線
+            self.bar = {'timestamp': pd.Timestamp(start, unit='s'), 'open': price, 'high': price,
+                        'low': price, 'close': price, 'volume': volume}
+            self._bar_epoch = start
+            self.stats['bars_opened'] += 1
+            self.tracker.update(self.bar['timestamp'], price)
+        elif start < self._bar_epoch:
+            self.stats['late_ticks'] += 1
+            return None
+        else:
+            bar = self.bar
+            bar['high'] = max(bar['high'], price)
+            bar['low'] = min(bar['low'], price)
+            bar['close'] = price
+            bar['volume'] += volume
+            self.tracker.revise(price)
+        return self.snapshot()
+    
+    def on_kline(self, data: Dict) -> Optional[Dict]:
+        """處理 kline 頻道事件（交易所的K線數值為準，覆蓋逐筆累計的結果）"""
+        start = pd.Timestamp(data['timestamp'])
+        if self.bar is not None and start < self.bar['timestamp']:
+            return None
+        self._set_bar(start, data)
+        self.tracker.update(start, self.bar['close'])
+        return self.snapshot()
+    
+    def on_event(self, event: Dict) -> Optional[Dict]:
+        """MaxWebSocketFeed 事件回呼"""
+        if event.get('market') != self.market:
+            return None
+        channel, data = event['channel'], event['data']
+        try:
+            if channel == 'trade':
+                return self.on_tick(data['price'], data['timestamp'], data.get('volume', 0.0))
+            if channel == 'ticker':
+                # ticker 的成交量為24小時累計，不計入K線
+                return self.on_tick(data['price'], data['timestamp'])
+            if channel == 'kline' and data.get('resolution') in (None, KLINE_RESOLUTIONS.get(self.period)):
+                return self.on_kline(data)
+        except Exception as e:
+            self.logger.error(f"形成中K線更新失敗: {e}")
+        return None
+    
+    def snapshot(self) -> Optional[Dict]:
+        """形成中K線與其指標（欄位名稱與 EnhancedMACDAnalyzer.calculate_macd 相同）"""
+        if self.bar is None:
+            return None
+        return {**self.bar, **self.tracker.latest}
+    
+    def apply_to(self, df: pd.DataFrame) -> pd.DataFrame:
+        """將形成中K線寫入K線DataFrame：同一根時原地更新最後一列，新的一根則附加於後"""
+        if self.bar is None or df is None or df.empty:
+            return df
+        last_ts = pd.Timestamp(df['timestamp'].iloc[-1])
+        if self.bar['timestamp'] == last_ts:
+            df.loc[df.index[-1], list(BAR_FIELDS)] = [self.bar[field] for field in BAR_FIELDS]
+            return df
+        if self.bar['timestamp'] > last_ts:
+            row = pd.DataFrame([{'timestamp': self.bar['timestamp'], **{f: self.bar[f] for f in BAR_FIELDS}}])
+            return pd.concat([df, row], ignore_index=True)
+        return df
@@ -1,9 +1,9 @@
 import pandas as pd
 import numpy as np
-import ta
 from datetime import datetime, timedelta
 import logging
 from config import MACD_FAST_PERIOD, MACD_SLOW_PERIOD, MACD_SIGNAL_PERIOD
+from indicator_graph import indicators_for, node_key
 
 class MACDAnalyzer:
     def __init__(self):
@@ -19,32 +19,17 @@ class MACDAnalyzer:
                 self.logger.warning("資料不足，無法計算MACD")
                 return None
             
-            # 計算MACD
-            df = df.copy()
-            df['macd'] = ta.trend.MACD(
-                close=df['close'],
-                window_fast=self.fast_period,
-                window_slow=self.slow_period
-            ).macd()
-            
-            df['macd_signal'] = ta.trend.MACD(
-                close=df['close'],
-                window_fast=self.fast_period,
-                window_slow=self.slow_period
-            ).macd_signal()
-            
-            df['macd_histogram'] = ta.trend.MACD(
-                close=df['close'],
-                window_fast=self.fast_period,
-                window_slow=self.slow_period
-            ).macd_diff()
-            
-            # 計算EMA
-            df['ema_12'] = ta.trend.EMAIndicator(close=df['close'], window=12).ema_indicator()
-            df['ema_26'] = ta.trend.EMAIndicator(close=df['close'], window=26).ema_indicator()
-            
-            # 計算RSI
-            df['rsi'] = ta.momentum.RSIIndicator(close=df['close'], window=14).rsi()
+            # 計算MACD、EMA與RSI（共用指標依賴圖，同一份資料只計算一次）
+            # 信號線沿用 ta.trend.MACD 的預設週期9
+            macd = node_key('macd', self.fast_period, self.slow_period, 9)
+            df = indicators_for(df).assign(df, {
+                'macd': f"{macd}.macd",
+                'macd_signal': f"{macd}.signal",
+                'macd_histogram': f"{macd}.histogram",
+                'ema_12': node_key('ema', 12),
+                'ema_26': node_key('ema', 26),
+                'rsi': node_key('rsi', 14)
+            })
             
             return df
             
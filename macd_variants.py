@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MACD算法變體
+登錄不同的MACD算法（EMA起算方式、信號線平滑、百分比、Wilder平滑），
+以一次呼叫計算一段K線上的全部變體（所有平滑線並排為二維陣列，經 indicator_graph.ewm 的編譯遞迴沿時間軸計算），
+並與參考值（如MAX介面顯示的數值）比對評分，找出最接近的算法
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from indicator_kernels import ewm_columns, rolling_columns
+
+# 平滑方式：
+#   ema        EMA（adjust=False，以第一個有效值起算，前 window-1 根為NaN；與 ta 相同）
+#   ema_adjust EMA（pandas adjust=True，權重正規化）
+#   sma_seed   EMA，以前 window 根的SMA為起點（TA-Lib / TradingView）
+#   wilder     Wilder平滑（alpha = 1/window），以第一個有效值起算
+#   sma        簡單移動平均
+SMOOTHINGS = ('ema', 'ema_adjust', 'sma_seed', 'wilder', 'sma')
+
+# 名稱 -> {'line': 快慢線平滑, 'signal': 信號線平滑, 'percentage': 是否以慢線的百分比表示, 'description'}
+MACD_VARIANTS: Dict[str, Dict] = {}
+
+def register_variant(name: str, line: str, signal: str, percentage: bool = False, description: str = ''):
+    """登錄MACD算法變體"""
+    if line not in SMOOTHINGS or signal not in SMOOTHINGS:
+        raise ValueError(f"未知的平滑方式: {line} / {signal}")
+    MACD_VARIANTS[name] = {
+        'line': line,
+        'signal': signal,
+        'percentage': percentage,
+        'description': description
+    }
+
+register_variant('standard', 'ema', 'ema', description='標準EMA（與 ta / MACDAnalyzer 相同）')
+register_variant('adjusted', 'ema_adjust', 'ema_adjust', description='pandas adjust=True 的EMA')
+register_variant('sma_seed', 'sma_seed', 'sma_seed', description='以SMA為起點的EMA（TA-Lib / TradingView）')
+register_variant('sma_signal', 'ema', 'sma', description='EMA快慢線，信號線為SMA')
+register_variant('percentage', 'ema', 'ema', percentage=True, description='百分比MACD（快慢線差 / 慢線 × 100）')
+register_variant('wilder', 'wilder', 'wilder', description='Wilder平滑')
+
+def _alpha(kind: str, window: int) -> float:
+    return 1.0 / window if kind == 'wilder' else 2.0 / (window + 1)
+
+def smooth_columns(values: np.ndarray, specs: List[tuple]) -> np.ndarray:
+    """依 specs[i] = (平滑方式, 視窗) 平滑 values 的第 i 欄；遞迴型平滑以 ewm_columns 按 alpha 分組一起計算"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    counts = np.cumsum(valid, axis=0)
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), len(values))
+    
+    recursive = [i for i, (kind, _) in enumerate(specs) if kind != 'sma']
+    if recursive:
+        inputs = values[:, recursive].copy()
+        alphas = np.empty(len(recursive))
+        min_periods = np.empty(len(recursive))
+        for j, i in enumerate(recursive):
+            kind, window = specs[i]
+            alphas[j] = _alpha(kind, window)
+            min_periods[j] = window
+            if kind == 'sma_seed':
+                # 起點之前不遞迴，起點為前 window 根的平均
+                seed = first[i] + window - 1
+                inputs[:min(seed, len(values)), j] = np.nan
+                if seed < len(values):
+                    inputs[seed, j] = values[first[i]:seed + 1, i].mean()
+                min_periods[j] = 1
+            elif kind == 'ema_adjust' and first[i] < len(values):
+                # adjust=True 的EMA = 首值乘以alpha的 adjust=False 遞迴 / (1 - (1-alpha)^(k+1))
+                inputs[first[i], j] *= alphas[j]
+        smoothed = ewm_columns(inputs, alphas, min_periods)
+        for j, i in enumerate(recursive):
+            kind, _ = specs[i]
+            if kind == 'ema_adjust':
+                smoothed[:, j] /= 1.0 - (1.0 - alphas[j]) ** counts[:, i]
+        out[:, recursive] = smoothed
+    
+    for i, (kind, window) in enumerate(specs):
+        if kind == 'sma':
+            out[:, i] = rolling_columns(values[:, i:i + 1], window, np.mean)[:, 0]
+    return out
+
+def evaluate_variants(close, names: Iterable[str] = None, fast: int = 12, slow: int = 26,
+                      signal: int = 9) -> Dict[str, Dict[str, np.ndarray]]:
+    """一次計算多個MACD變體
+    
+    回傳 {名稱: {'ema_fast', 'ema_slow', 'macd', 'macd_signal', 'macd_histogram'}}，皆為與 close 等長的陣列。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    names = list(names or MACD_VARIANTS)
+    unknown = [name for name in names if name not in MACD_VARIANTS]
+    if unknown:
+        raise KeyError(f"未知的MACD算法: {', '.join(unknown)}")
+    
+    # 第一段：各變體用到的快慢線（相同的平滑只算一次）
+    line_specs = sorted({(MACD_VARIANTS[name]['line'], window) for name in names for window in (fast, slow)})
+    lines = smooth_columns(np.repeat(close[:, None], len(line_specs), axis=1), line_specs)
+    line_of = {spec: lines[:, i] for i, spec in enumerate(line_specs)}
+    
+    macds = np.empty((len(close), len(names)))
+    for i, name in enumerate(names):
+        variant = MACD_VARIANTS[name]
+        ema_fast, ema_slow = line_of[(variant['line'], fast)], line_of[(variant['line'], slow)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            macds[:, i] = (ema_fast - ema_slow) / ema_slow * 100 if variant['percentage'] else ema_fast - ema_slow
+    
+    # 第二段：全部變體的信號線
+    signals = smooth_columns(macds, [(MACD_VARIANTS[name]['signal'], signal) for name in names])
+    
+    results = {}
+    for i, name in enumerate(names):
+        line = MACD_VARIANTS[name]['line']
+        results[name] = {
+            'ema_fast': line_of[(line, fast)],
+            'ema_slow': line_of[(line, slow)],
+            'macd': macds[:, i],
+            'macd_signal': signals[:, i],
+            'macd_histogram': macds[:, i] - signals[:, i]
+        }
+    return results
+
+def score_variants(results: Dict[str, Dict[str, np.ndarray]], reference: Dict) -> List[Dict]:
+    """與參考值比對，依誤差由小到大排序
+    
+    reference 為 {'macd': 值或陣列, 'macd_signal': ..., 'macd_histogram': ...}（可只給部分欄位），
+    陣列與計算結果的最後幾根對齊；誤差為各欄位的平均絕對誤差除以參考值的平均絕對值。
+    """
+    scores = []
+    for name, values in results.items():
+        fields = {}
+        for field, expected in reference.items():
+            expected = np.atleast_1d(np.asarray(expected, dtype=np.float64))
+            actual = values[field][-len(expected):]
+            scale = np.mean(np.abs(expected)) or 1.0
+            fields[field] = float(np.mean(np.abs(actual - expected)) / scale)
+        error = float(np.mean(list(fields.values()))) if fields else float('nan')
+        scores.append({'name': name, 'error': error, 'fields': fields})
+    return sorted(scores, key=lambda item: (np.isnan(item['error']), item['error']))
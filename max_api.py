@@ -1,38 +1,329 @@
+import asyncio
 import requests
+import numpy as np
 import pandas as pd
+import threading
 import time
 from datetime import datetime
 import logging
-from config import MAX_API_BASE_URL
+from config import (MAX_API_BASE_URL, MAX_API_RECORD_FILE, MAX_API_REPLAY_FILE,
+                    MAX_API_REPLAY_SPEED)
+from kline_decoder import KlineArray, decode_klines
+from kline_gaps import find_gaps, insert_klines
+from kline_resampler import RESAMPLE_PERIODS, resample_records, required_base_rows
+from request_coalescer import RequestCoalescer, default_coalescer
+from max_recorder import get_recorder, get_replay
+from candle_store import MAX_KLINE_LIMIT
+from rate_limit_scheduler import (default_scheduler, PRIORITY_URGENT, PRIORITY_NORMAL,
+                                  PRIORITY_BACKGROUND)
+
+# 非同步客戶端需要aiohttp，未安裝時仍可使用同步的MaxAPI
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+def parse_ticker(market, data):
+    """將 /tickers/{market} 回應轉換為價格資訊"""
+    return {
+        'symbol': market.upper(),
+        'price': float(data['last']),
+        'volume': float(data['vol']),
+        'high': float(data['high']),
+        'low': float(data['low']),
+        'timestamp': datetime.now()
+    }
+
+def parse_klines(data):
+    """將 /k 回應轉換為DataFrame（pandas解析路徑，快速路徑見 kline_decoder.decode_klines）"""
+    df = pd.DataFrame(data, columns=[
+        'timestamp', 'open', 'high', 'low', 'close', 'volume'
+    ])
+    
+    # 轉換資料類型
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col])
+    
+    df = df.sort_values('timestamp').reset_index(drop=True)
+    return df
+
+def _log_gap(logger, market, period, start, missing, filled):
+    """記錄缺口修補結果"""
+    gap_time = pd.to_datetime(start, unit='s').strftime('%Y-%m-%d %H:%M')
+    if filled:
+        logger.info(f"🩹 {market} {period}分鐘K線缺口已補齊: {gap_time} UTC 起 {filled}/{missing} 根")
+    else:
+        logger.warning(f"{market} {period}分鐘K線缺口無法補齊（交易所無資料）: {gap_time} UTC 起 {missing} 根")
+
+class CandleCache:
+    """K線快取 - 以 (market, period) 為鍵保存唯讀的KlineArray，只增量抓取新K線"""
+    
+    def __init__(self, max_rows=10000, max_base_rows=50000):
+        self.max_rows = max_rows  # 每個 (market, period) 預設最多保留的K線數
+        # 為合成長週期最多保留的1分鐘K線數（50000根足以合成200根240分鐘K線）
+        self.max_base_rows = max_base_rows
+        self._capacity = {}       # 呼叫端要求保留更多K線的 (market, period)
+        self._frames = {}
+        self._updated = {}
+        self._lock = threading.Lock()
+        
+        # 缺口修補狀態（交易所本身缺少的K線不再重複補抓）
+        self._unfillable = set()
+        self.gap_stats = {
+            'checks': 0,
+            'gaps_detected': 0,   # 嘗試修補的缺口數
+            'gaps_repaired': 0,
+            'candles_filled': 0,
+            'unfillable': 0       # 交易所也沒有資料的缺口
+        }
+    
+    def get(self, market, period):
+        """取得快取的完整K線資料（KlineArray）"""
+        with self._lock:
+            return self._frames.get((market, period))
+    
+    def incremental_params(self, market, period, limit):
+        """計算增量請求參數，快取不足以增量更新時回傳None"""
+        klines = self.get(market, period)
+        if klines is None or len(klines) < limit:
+            return None
+        
+        last_ts = klines.last_timestamp()
+        # 從最後一根（可能仍在形成中）K線開始抓，多抓兩根作為時鐘誤差緩衝
+        missing = int((time.time() - last_ts) // (period * 60)) + 2
+        if missing >= limit:
+            return None  # 斷線太久，直接全量重抓
+        
+        return {'timestamp': last_ts, 'limit': missing}
+    
+    def age(self, market, period):
+        """距離上次更新的秒數（未快取時為無限大）"""
+        updated = self._updated.get((market, period))
+        return time.time() - updated if updated else float('inf')
+    
+    def capacity(self, market, period):
+        """(market, period) 最多保留的K線數"""
+        return self._capacity.get((market, period), self.max_rows)
+    
+    def reserve(self, market, period, rows):
+        """將 (market, period) 的保留上限提高到至少 rows 根（如合成長週期所需的1分鐘K線）"""
+        with self._lock:
+            key = (market, period)
+            self._capacity[key] = max(self._capacity.get(key, self.max_rows), rows)
+    
+    def seed(self, market, period, klines):
+        """以既有資料（如持久化儲存）預熱快取，下次請求時會增量補上最新K線
+        
+        複製資料而非保留記憶體映射視圖：儲存檔案被取代後快取不會指向舊檔案。
+        """
+        with self._lock:
+            self._frames[(market, period)] = KlineArray(np.array(klines.tail(self.capacity(market, period)).records))
+            self._updated.pop((market, period), None)
+    
+    def replace(self, market, period, klines):
+        """以全量資料取代快取"""
+        with self._lock:
+            self._frames[(market, period)] = klines.tail(self.capacity(market, period))
+            self._updated[(market, period)] = time.time()
+            self._prune_unfillable(market, period)
+    
+    def merge(self, market, period, new_klines):
+        """合併增量K線：覆蓋重疊的K線並附加新K線"""
+        with self._lock:
+            cached = self._frames.get((market, period))
+            if cached is None:
+                merged = new_klines.records
+            elif new_klines.empty:
+                return
+            else:
+                # 快取已依時間排序，以二分搜尋找出重疊起點
+                first_new = new_klines['timestamp'][0]
+                kept = np.searchsorted(cached['timestamp'], first_new, side='left')
+                merged = np.concatenate([cached.records[:kept], new_klines.records])
+            self._frames[(market, period)] = KlineArray(merged[-self.capacity(market, period):])
+            self._updated[(market, period)] = time.time()
+            self._prune_unfillable(market, period)
+    
+    def _prune_unfillable(self, market, period):
+        """移除已滑出快取範圍的無法補齊缺口紀錄（需持有鎖），避免集合無限增長"""
+        cached = self._frames.get((market, period))
+        if cached is None or cached.empty:
+            return
+        first_ts = cached['timestamp'][0]
+        self._unfillable = {gap for gap in self._unfillable
+                            if gap[:2] != (market, period) or gap[2] >= first_ts}
+    
+    def pending_gaps(self, market, period, max_gaps=5):
+        """找出快取中需要補抓的缺口（最多 max_gaps 個，由新到舊）"""
+        klines = self.get(market, period)
+        with self._lock:
+            self.gap_stats['checks'] += 1
+            if klines is None:
+                return []
+            gaps = [gap for gap in find_gaps(klines['timestamp'], period)
+                    if (market, period, gap[0]) not in self._unfillable]
+            gaps = gaps[-max_gaps:]
+            self.gap_stats['gaps_detected'] += len(gaps)
+            return gaps
+    
+    def fill_gap(self, market, period, start, end, klines):
+        """將補抓的K線插入快取，回傳補上的根數"""
+        with self._lock:
+            rows = None
+            if klines is not None and not klines.empty:
+                ts = klines['timestamp']
+                rows = KlineArray(klines.records[(ts >= start) & (ts < end)])
+            
+            if rows is None or rows.empty:
+                self._unfillable.add((market, period, start))
+                self.gap_stats['unfillable'] += 1
+                return 0
+            
+            cached = self._frames.get((market, period))
+            if cached is not None:
+                self._frames[(market, period)] = insert_klines(cached, rows).tail(self.capacity(market, period))
+            self.gap_stats['gaps_repaired'] += 1
+            self.gap_stats['candles_filled'] += len(rows)
+            return len(rows)
+    
+    def prepend(self, market, period, klines):
+        """將較舊的K線接到快取前面（已存在的時間戳保留原資料），回傳新增的根數"""
+        with self._lock:
+            cached = self._frames.get((market, period))
+            if cached is None or klines is None or klines.empty:
+                return 0
+            merged = insert_klines(cached, klines).tail(self.capacity(market, period))
+            self._frames[(market, period)] = merged
+            return max(0, len(merged) - len(cached))
+    
+    def can_resample(self, market, period, limit, stored_rows=0):
+        """limit 根 period 分鐘K線是否由1分鐘快取合成
+        
+        快取（加上持久化儲存中更早的 stored_rows 根）已涵蓋所需區間，或往前補足只需一次 /k
+        請求（不多於直接抓取該週期）時才合成；否則直接呼叫 /k，避免首次查詢就補抓數萬根1分鐘K線。
+        """
+        if period not in RESAMPLE_PERIODS or required_base_rows(period, limit) > self.max_base_rows:
+            return False
+        base = self.get(market, 1)
+        if base is None:
+            return False
+        return required_base_rows(period, limit) - len(base) - stored_rows <= MAX_KLINE_LIMIT
+    
+    def resample(self, market, period, limit):
+        """由1分鐘快取合成K線，資料不足時回傳None"""
+        base = self.get(market, 1)
+        if base is None:
+            return None
+        records = resample_records(base.records[-required_base_rows(period, limit):], period)
+        if len(records) < limit:
+            return None
+        return KlineArray(records[-limit:])
+    
+    def window(self, market, period, limit):
+        """取得最近 limit 根K線（與快取共用記憶體，不複製）"""
+        klines = self.get(market, period)
+        if klines is None:
+            return None
+        return klines.tail(limit)
+    
+    def clear(self, market=None, period=None):
+        """清除快取（不指定則全部清除）"""
+        with self._lock:
+            if market is None:
+                self._frames.clear()
+                self._updated.clear()
+                self._unfillable.clear()
+            else:
+                self._frames.pop((market, period), None)
+                self._updated.pop((market, period), None)
+                self._unfillable = {gap for gap in self._unfillable if gap[:2] != (market, period)}
+
+def _default_recorder():
+    return get_recorder(MAX_API_RECORD_FILE) if MAX_API_RECORD_FILE else None
+
+def _default_replay():
+    return get_replay(MAX_API_REPLAY_FILE, MAX_API_REPLAY_SPEED) if MAX_API_REPLAY_FILE else None
 
 class MaxAPI:
-    def __init__(self):
+    def __init__(self, use_kline_cache=True, resample_max_age=5, coalescer=None, scheduler=None,
+                 max_retries=3, recorder=None, replay=None, candle_store=None):
         self.base_url = MAX_API_BASE_URL
         self.session = requests.Session()
         self.logger = logging.getLogger(__name__)
+        self.kline_cache = CandleCache() if use_kline_cache else None
+        # 1分鐘快取在此秒數內視為最新，多週期查詢直接由快取合成
+        self.resample_max_age = resample_max_age
+        # 程序內共用的請求合併器，避免同時發出重複請求
+        self.coalescer = coalescer or default_coalescer
+        # 程序內共用的限流排程器
+        self.scheduler = scheduler or default_scheduler
+        self.max_retries = max_retries
+        # 可選的K線持久化儲存，抓到的已收盤K線會追加寫入
+        self.candle_store = candle_store
+        
+        # 錄製/回放（預設由 MAX_API_RECORD_FILE / MAX_API_REPLAY_FILE 環境變數啟用）
+        self.recorder = recorder or _default_recorder()
+        self.replay = replay or _default_replay()
+        if self.replay is not None:
+            self.session = self.replay.session()
+            # 回放時不限流、不使用TTL快取，確保結果可重現
+            self.scheduler = scheduler or self.replay.scheduler
+            self.coalescer = coalescer or RequestCoalescer(ttl=0)
     
-    def get_ticker(self, market='btcusdt'):
-        """獲取即時價格資訊"""
-        try:
-            url = f"{self.base_url}/tickers/{market}"
-            response = self.session.get(url, timeout=10)
+    def _get_json(self, endpoint, url, params=None, priority=PRIORITY_NORMAL):
+        """經限流排程發送GET請求，429時依Retry-After或指數退避重試"""
+        for attempt in range(self.max_retries + 1):
+            self.scheduler.acquire(endpoint, priority)
+            response = self.session.get(url, params=params, timeout=10)
+            if response.status_code == 429 and attempt < self.max_retries:
+                delay = self.scheduler.on_throttled(endpoint, attempt, response.headers.get('Retry-After'))
+                self.logger.warning(f"MAX API限流(429)，{delay:.1f}秒後重試")
+                continue
             response.raise_for_status()
             data = response.json()
-            
-            return {
-                'symbol': market.upper(),
-                'price': float(data['last']),
-                'volume': float(data['vol']),
-                'high': float(data['high']),
-                'low': float(data['low']),
-                'timestamp': datetime.now()
-            }
+            if self.recorder is not None:
+                self.recorder.record(endpoint, url[len(self.base_url):], params, data)
+            return data
+    
+    def get_ticker(self, market='btcusdt', priority=PRIORITY_URGENT):
+        """獲取即時價格資訊（並行的相同請求共用一次API呼叫）"""
+        return self.coalescer.call(('ticker', market), lambda: self._fetch_ticker(market, priority))
+    
+    def _fetch_ticker(self, market, priority=PRIORITY_URGENT):
+        """呼叫 /tickers/{market}"""
+        try:
+            url = f"{self.base_url}/tickers/{market}"
+            return parse_ticker(market, self._get_json('ticker', url, priority=priority))
         except Exception as e:
             self.logger.error(f"獲取價格失敗: {e}")
             return None
     
-    def get_klines(self, market='btcusdt', period=1, limit=200):
-        """獲取K線資料"""
+    def get_klines(self, market='btcusdt', period=1, limit=200, priority=PRIORITY_BACKGROUND):
+        """獲取K線資料（有快取時只抓取最後一根之後的新K線）"""
+        klines = self.get_kline_array(market, period, limit, priority)
+        return klines.to_dataframe() if klines is not None else None
+    
+    def get_kline_array(self, market='btcusdt', period=1, limit=200, priority=PRIORITY_BACKGROUND):
+        """獲取K線結構化陣列（KlineArray），不建立DataFrame"""
+        return self.coalescer.call(('klines', market, period, limit),
+                                   lambda: self._fetch_klines(market, period, limit, priority))
+    
+    def _fetch_klines(self, market, period, limit, priority=PRIORITY_BACKGROUND):
+        """由快取合成或呼叫 /k 取得K線"""
+        if self.kline_cache is not None and self.kline_cache.can_resample(market, period, limit,
+                                                                          self._stored_base_rows(market)):
+            # 由1分鐘快取合成：必要時先增量更新1分鐘K線，再往前補足所需的根數
+            if self.kline_cache.age(market, 1) > self.resample_max_age:
+                self.get_kline_array(market, period=1, priority=priority,
+                                     limit=min(len(self.kline_cache.get(market, 1)), MAX_KLINE_LIMIT))
+            self._extend_base(market, required_base_rows(period, limit), priority)
+            klines = self.kline_cache.resample(market, period, limit)
+            if klines is not None:
+                return klines
+        
         try:
             url = f"{self.base_url}/k"
             params = {
@@ -41,38 +332,335 @@ class MaxAPI:
                 'limit': limit
             }
             
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            incremental = None
+            if self.kline_cache is not None:
+                incremental = self.kline_cache.incremental_params(market, period, limit)
+                if incremental:
+                    params.update(incremental)
             
-            # 轉換為DataFrame
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume'
-            ])
+            klines = decode_klines(self._get_json('kline', url, params=params, priority=priority))
             
-            # 轉換資料類型
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col])
-            
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            return df
+            self._persist(market, period, klines)
+            if self.kline_cache is None:
+                return klines
             
+            if incremental:
+                self.kline_cache.merge(market, period, klines)
+            else:
+                self.kline_cache.replace(market, period, klines)
+            self._repair_gaps(market, period, priority)
+            return self.kline_cache.window(market, period, limit)
+        
         except Exception as e:
             self.logger.error(f"獲取K線資料失敗: {e}")
             return None
     
+    def get_kline_range(self, market='btcusdt', period=1, start=None, limit=10000,
+                        priority=PRIORITY_BACKGROUND):
+        """由 start（epoch秒）起抓取K線，不經過快取（用於補資料）"""
+        try:
+            params = {'market': market, 'period': period, 'limit': limit}
+            if start is not None:
+                params['timestamp'] = int(start)
+            return decode_klines(self._get_json('kline', f"{self.base_url}/k", params=params,
+                                                priority=priority))
+        except Exception as e:
+            self.logger.error(f"獲取K線區間失敗: {e}")
+            return None
+    
+    def _extend_base(self, market, rows, priority=PRIORITY_BACKGROUND):
+        """將1分鐘快取往前補到 rows 根：先讀持久化儲存，不足時由 /k 分段抓取"""
+        self.kline_cache.reserve(market, 1, rows)
+        while True:
+            base = self.kline_cache.get(market, 1)
+            missing = rows - len(base)
+            if missing <= 0:
+                return
+            first_ts = int(base['timestamp'][0])
+            older = self._stored_before(market, first_ts, missing)
+            if older is None or older.empty:
+                count = min(missing, MAX_KLINE_LIMIT)
+                older = self.get_kline_range(market, 1, first_ts - count * 60, limit=count, priority=priority)
+            if not self.kline_cache.prepend(market, 1, older):
+                return  # 沒有更早的資料
+    
+    def _stored_before(self, market, end, limit):
+        """持久化儲存中 end 之前最近 limit 根1分鐘K線"""
+        if self.candle_store is None:
+            return None
+        try:
+            return self.candle_store.window(market, 1, limit, end=end)
+        except Exception as e:
+            self.logger.error(f"讀取儲存K線失敗: {e}")
+            return None
+    
+    def _stored_base_rows(self, market):
+        """持久化儲存中早於1分鐘快取的K線根數（往前補足時不需呼叫 /k）"""
+        base = self.kline_cache.get(market, 1)
+        if base is None or base.empty:
+            return 0
+        older = self._stored_before(market, int(base['timestamp'][0]), self.kline_cache.max_base_rows)
+        return 0 if older is None else len(older)
+    
+    def _repair_gaps(self, market, period, priority=PRIORITY_BACKGROUND):
+        """只針對快取中缺少的區間補抓K線"""
+        for start, end, missing in self.kline_cache.pending_gaps(market, period):
+            klines = self.get_kline_range(market, period, start, limit=min(missing, MAX_KLINE_LIMIT),
+                                          priority=priority)
+            filled = self.kline_cache.fill_gap(market, period, start, end, klines)
+            _log_gap(self.logger, market, period, start, missing, filled)
+            if filled:
+                self._persist(market, period, klines, insert=True)
+    
+    def _persist(self, market, period, klines, insert=False):
+        """將已收盤K線寫入持久化儲存（insert=True 時插入缺口中的K線，否則只追加新K線）"""
+        if self.candle_store is None:
+            return
+        try:
+            if insert:
+                self.candle_store.insert(market, period, klines)
+            else:
+                self.candle_store.append(market, period, klines)
+        except Exception as e:
+            self.logger.error(f"K線寫入儲存失敗: {e}")
+    
     def get_market_status(self):
         """獲取市場狀態"""
         try:
             url = f"{self.base_url}/markets"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            markets = response.json()
+            markets = self._get_json('markets', url)
             
             btc_market = next((m for m in markets if m['id'] == 'btcusdt'), None)
             return btc_market is not None
+        
+        except Exception as e:
+            self.logger.error(f"獲取市場狀態失敗: {e}")
+            return False
+
+class AsyncMaxAPI:
+    """非同步MAX API客戶端 - 共用單一連線池，await時不阻塞事件迴圈"""
+    
+    def __init__(self, use_kline_cache=True, timeout=10, max_connections=10, kline_cache=None,
+                 resample_max_age=5, coalescer=None, scheduler=None, max_retries=3, recorder=None,
+                 replay=None, candle_store=None):
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("AsyncMaxAPI 需要安裝 aiohttp")
+        
+        self.base_url = MAX_API_BASE_URL
+        self.logger = logging.getLogger(__name__)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_connections = max_connections
+        self.resample_max_age = resample_max_age
+        self.coalescer = coalescer or default_coalescer
+        self.scheduler = scheduler or default_scheduler
+        self.max_retries = max_retries
+        self.candle_store = candle_store
+        self._session = None
+        
+        self.recorder = recorder or _default_recorder()
+        self.replay = replay or _default_replay()
+        if self.replay is not None:
+            self.scheduler = scheduler or self.replay.scheduler
+            self.coalescer = coalescer or RequestCoalescer(ttl=0)
+        
+        # 可傳入既有的CandleCache與同步客戶端共用K線快取
+        if kline_cache is not None:
+            self.kline_cache = kline_cache
+        else:
+            self.kline_cache = CandleCache() if use_kline_cache else None
+    
+    async def _get_session(self):
+        """延遲建立ClientSession（必須在事件迴圈內建立）"""
+        if self.replay is not None:
+            return self.replay.async_session()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+    
+    async def _get_json(self, endpoint, path, params=None, timeout=None, priority=PRIORITY_NORMAL):
+        """經限流排程發送GET請求並解析JSON，429時依Retry-After或指數退避重試"""
+        session = await self._get_session()
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire_async(endpoint, priority)
+            async with session.get(f"{self.base_url}{path}", params=params, timeout=request_timeout) as response:
+                if response.status == 429 and attempt < self.max_retries:
+                    delay = self.scheduler.on_throttled(endpoint, attempt, response.headers.get('Retry-After'))
+                    self.logger.warning(f"MAX API限流(429)，{delay:.1f}秒後重試")
+                    continue
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+                if self.recorder is not None:
+                    self.recorder.record(endpoint, path, params, data)
+                return data
+    
+    async def get_ticker(self, market='btcusdt', timeout=None, priority=PRIORITY_URGENT):
+        """獲取即時價格資訊（並行的相同請求共用一次API呼叫）"""
+        return await self.coalescer.call_async(('ticker', market),
+                                               lambda: self._fetch_ticker(market, timeout, priority))
+    
+    async def _fetch_ticker(self, market, timeout=None, priority=PRIORITY_URGENT):
+        """呼叫 /tickers/{market}"""
+        try:
+            data = await self._get_json('ticker', f"/tickers/{market}", timeout=timeout, priority=priority)
+            return parse_ticker(market, data)
+        except Exception as e:
+            self.logger.error(f"獲取價格失敗: {e}")
+            return None
+    
+    async def get_klines(self, market='btcusdt', period=1, limit=200, timeout=None,
+                         priority=PRIORITY_BACKGROUND):
+        """獲取K線資料（有快取時只抓取最後一根之後的新K線）"""
+        klines = await self.get_kline_array(market, period, limit, timeout, priority)
+        return klines.to_dataframe() if klines is not None else None
+    
+    async def get_kline_array(self, market='btcusdt', period=1, limit=200, timeout=None,
+                              priority=PRIORITY_BACKGROUND):
+        """獲取K線結構化陣列（KlineArray），不建立DataFrame"""
+        return await self.coalescer.call_async(('klines', market, period, limit),
+                                               lambda: self._fetch_klines(market, period, limit, timeout, priority))
+    
+    async def _fetch_klines(self, market, period, limit, timeout=None, priority=PRIORITY_BACKGROUND):
+        """由快取合成或呼叫 /k 取得K線"""
+        if self.kline_cache is not None and self.kline_cache.can_resample(market, period, limit,
+                                                                          self._stored_base_rows(market)):
+            # 由1分鐘快取合成：必要時先增量更新1分鐘K線，再往前補足所需的根數
+            if self.kline_cache.age(market, 1) > self.resample_max_age:
+                await self.get_kline_array(market, period=1, timeout=timeout, priority=priority,
+                                           limit=min(len(self.kline_cache.get(market, 1)), MAX_KLINE_LIMIT))
+            await self._extend_base(market, required_base_rows(period, limit), timeout, priority)
+            klines = self.kline_cache.resample(market, period, limit)
+            if klines is not None:
+                return klines
+        
+        try:
+            params = {
+                'market': market,
+                'period': period,
+                'limit': limit
+            }
+            
+            incremental = None
+            if self.kline_cache is not None:
+                incremental = self.kline_cache.incremental_params(market, period, limit)
+                if incremental:
+                    params.update(incremental)
+            
+            data = await self._get_json('kline', "/k", params=params, timeout=timeout, priority=priority)
+            klines = decode_klines(data)
             
+            self._persist(market, period, klines)
+            if self.kline_cache is None:
+                return klines
+            
+            if incremental:
+                self.kline_cache.merge(market, period, klines)
+            else:
+                self.kline_cache.replace(market, period, klines)
+            await self._repair_gaps(market, period, timeout, priority)
+            return self.kline_cache.window(market, period, limit)
+        
+        except Exception as e:
+            self.logger.error(f"獲取K線資料失敗: {e}")
+            return None
+    
+    async def get_kline_range(self, market='btcusdt', period=1, start=None, limit=10000, timeout=None,
+                              priority=PRIORITY_BACKGROUND):
+        """由 start（epoch秒）起抓取K線，不經過快取（用於補資料）"""
+        try:
+            params = {'market': market, 'period': period, 'limit': limit}
+            if start is not None:
+                params['timestamp'] = int(start)
+            return decode_klines(await self._get_json('kline', "/k", params=params, timeout=timeout,
+                                                      priority=priority))
+        except Exception as e:
+            self.logger.error(f"獲取K線區間失敗: {e}")
+            return None
+    
+    async def _extend_base(self, market, rows, timeout=None, priority=PRIORITY_BACKGROUND):
+        """將1分鐘快取往前補到 rows 根：先讀持久化儲存，不足時由 /k 分段抓取"""
+        self.kline_cache.reserve(market, 1, rows)
+        while True:
+            base = self.kline_cache.get(market, 1)
+            missing = rows - len(base)
+            if missing <= 0:
+                return
+            first_ts = int(base['timestamp'][0])
+            older = self._stored_before(market, first_ts, missing)
+            if older is None or older.empty:
+                count = min(missing, MAX_KLINE_LIMIT)
+                older = await self.get_kline_range(market, 1, first_ts - count * 60, limit=count,
+                                                   timeout=timeout, priority=priority)
+            if not self.kline_cache.prepend(market, 1, older):
+                return  # 沒有更早的資料
+    
+    def _stored_before(self, market, end, limit):
+        """持久化儲存中 end 之前最近 limit 根1分鐘K線"""
+        if self.candle_store is None:
+            return None
+        try:
+            return self.candle_store.window(market, 1, limit, end=end)
+        except Exception as e:
+            self.logger.error(f"讀取儲存K線失敗: {e}")
+            return None
+    
+    def _stored_base_rows(self, market):
+        """持久化儲存中早於1分鐘快取的K線根數（往前補足時不需呼叫 /k）"""
+        base = self.kline_cache.get(market, 1)
+        if base is None or base.empty:
+            return 0
+        older = self._stored_before(market, int(base['timestamp'][0]), self.kline_cache.max_base_rows)
+        return 0 if older is None else len(older)
+    
+    async def _repair_gaps(self, market, period, timeout=None, priority=PRIORITY_BACKGROUND):
+        """只針對快取中缺少的區間補抓K線"""
+        for start, end, missing in self.kline_cache.pending_gaps(market, period):
+            klines = await self.get_kline_range(market, period, start, limit=min(missing, MAX_KLINE_LIMIT),
+                                                timeout=timeout, priority=priority)
+            filled = self.kline_cache.fill_gap(market, period, start, end, klines)
+            _log_gap(self.logger, market, period, start, missing, filled)
+            if filled:
+                self._persist(market, period, klines, insert=True)
+    
+    def _persist(self, market, period, klines, insert=False):
+        """將已收盤K線寫入持久化儲存（insert=True 時插入缺口中的K線，否則只追加新K線）"""
+        if self.candle_store is None:
+            return
+        try:
+            if insert:
+                self.candle_store.insert(market, period, klines)
+            else:
+                self.candle_store.append(market, period, klines)
+        except Exception as e:
+            self.logger.error(f"K線寫入儲存失敗: {e}")
+    
+    async def get_market_status(self, timeout=None):
+        """獲取市場狀態"""
+        try:
+            markets = await self._get_json('markets', "/markets", timeout=timeout)
+            btc_market = next((m for m in markets if m['id'] == 'btcusdt'), None)
+            return btc_market is not None
+        
         except Exception as e:
             self.logger.error(f"獲取市場狀態失敗: {e}")
-            return False 
\ No newline at end of file
+            return False
+    
+    async def get_ticker_and_klines(self, market='btcusdt', period=1, limit=200):
+        """同時獲取價格與K線"""
+        return await asyncio.gather(
+            self.get_ticker(market),
+            self.get_klines(market, period=period, limit=limit)
+        )
+    
+    async def close(self):
+        """關閉連線池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
\ No newline at end of file
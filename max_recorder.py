@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MAX API錄製與回放
+錄製：將 ticker / kline / markets 回應連同時間寫入gzip壓縮的追加式JSON Lines檔案
+回放：以實際速度或N倍速由錄製檔提供回應，讓監控程式可離線重現與效能分析
+
+使用方式（不需修改程式）：
+    MAX_API_RECORD_FILE=day.jsonl.gz python quick_price_alert.py
+    MAX_API_REPLAY_FILE=day.jsonl.gz MAX_API_REPLAY_SPEED=60 python quick_price_alert.py
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+from kline_decoder import KlineArray, decode_klines
+from rate_limit_scheduler import DEFAULT_RATE_LIMITS, RateLimitScheduler
+
+logger = logging.getLogger(__name__)
+
+class MaxRecorder:
+    """追加式回應錄製器（gzip壓縮，每筆記錄一行JSON）"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        # 以追加模式開啟，每次啟動會新增一個gzip成員，讀取時自動串接
+        self._file = gzip.open(path, 'ab')
+    
+    def record(self, endpoint: str, path: str, params: Optional[Dict], data):
+        """寫入一筆回應"""
+        line = json.dumps({
+            't': time.time(),
+            'endpoint': endpoint,
+            'path': path,
+            'params': params or {},
+            'data': data
+        }, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line.encode('utf-8') + b'\n')
+            # 同步刷新，程式中斷時已寫入的記錄仍可讀取
+            self._file.flush(zlib.Z_SYNC_FLUSH)
+            self.count += 1
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def load_recording(path: str) -> List[Dict]:
+    """讀取錄製檔（依時間排序），容許程式中斷造成的不完整結尾"""
+    records = []
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # 最後一行寫入不完整
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        logger.warning(f"錄製檔結尾不完整，已讀取 {len(records)} 筆: {e}")
+    records.sort(key=lambda r: r['t'])
+    return records
+
+def _series_key(path: str, params: Dict) -> tuple:
+    """同一資料序列的識別鍵（K線以市場與週期區分，不含增量參數）"""
+    if path == '/k':
+        return (path, params.get('market'), int(params.get('period', 1)))
+    return (path,)
+
+class ReplayResponse:
+    """回放回應（requests.Response用法）"""
+    
+    def __init__(self, status: int, data):
+        self.status_code = status
+        self.status = status
+        self.headers = {}
+        self._data = data
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} 錄製檔中沒有此資料")
+    
+    def json(self):
+        return self._data
+
+class AsyncReplayResponse(ReplayResponse):
+    """回放回應（aiohttp用法：async with session.get(...) as response）"""
+    
+    async def json(self, content_type=None):
+        return self._data
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+class ReplaySession:
+    """取代 requests.Session 的回放傳輸層"""
+    
+    def __init__(self, replay: 'MaxReplay'):
+        self.replay = replay
+    
+    def get(self, url, params=None, timeout=None):
+        return self.replay.respond(url, params)
+    
+    def close(self):
+        pass
+
+class AsyncReplaySession:
+    """取代 aiohttp.ClientSession 的回放傳輸層"""
+    
+    closed = False
+    
+    def __init__(self, replay: 'MaxReplay'):
+        self.replay = replay
+    
+    def get(self, url, params=None, timeout=None):
+        response = self.replay.respond(url, params)
+        return AsyncReplayResponse(response.status, response._data)
+    
+    async def close(self):
+        pass
+
+class MaxReplay:
+    """錄製檔回放器
+    
+    speed > 0 時虛擬時鐘以 speed 倍速前進，請求取得當下時間點以前最新的回應；
+    speed = 0 時不等待，每次請求直接推進到該序列的下一筆錄製資料（最快、完全可重現）。
+    每個序列的第一筆資料在開始時即可取得。
+    """
+    
+    def __init__(self, path: str = None, speed: float = 1.0, records: List[Dict] = None):
+        self.records = sorted(records, key=lambda r: r['t']) if records is not None else load_recording(path)
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._position = 0
+        self._started = None
+        self.start_time = self.records[0]['t'] if self.records else time.time()
+        self.end_time = self.records[-1]['t'] if self.records else self.start_time
+        self._clock = self.start_time
+        
+        self._latest: Dict[tuple, object] = {}
+        self._klines: Dict[tuple, Dict[int, list]] = {}
+        # 每個序列的記錄索引與逐筆模式下已回放的數量
+        self._series: Dict[tuple, List[int]] = {}
+        self._served: Dict[tuple, int] = {}
+        for i, record in enumerate(self.records):
+            self._series.setdefault(_series_key(record['path'], record['params']), []).append(i)
+        for indexes in self._series.values():
+            self._apply(self.records[indexes[0]])
+        
+        # 回放不受交易所限流影響
+        unlimited = {name: (1e9, 1e9) for name in DEFAULT_RATE_LIMITS}
+        self.scheduler = RateLimitScheduler(rate_limits=unlimited)
+        
+        self.stats = {'requests': 0, 'misses': 0}
+    
+    def now(self) -> float:
+        """目前的虛擬時間（錄製時的epoch秒）"""
+        if self.speed and self.speed > 0:
+            if self._started is None:
+                self._started = time.monotonic()
+            return min(self.end_time, self.start_time + (time.monotonic() - self._started) * self.speed)
+        return self._clock
+    
+    @property
+    def exhausted(self) -> bool:
+        """是否已回放到錄製檔結尾"""
+        if self.speed and self.speed > 0:
+            return self._position >= len(self.records)
+        return all(self._served.get(key, 0) >= len(indexes) for key, indexes in self._series.items())
+    
+    def session(self) -> ReplaySession:
+        return ReplaySession(self)
+    
+    def async_session(self) -> AsyncReplaySession:
+        return AsyncReplaySession(self)
+    
+    def _apply(self, record: Dict):
+        key = _series_key(record['path'], record['params'])
+        if record['path'] == '/k':
+            rows = self._klines.setdefault(key, {})
+            for row in record['data']:
+                rows[int(row[0])] = row  # 同一根K線以較新的資料覆蓋
+        else:
+            self._latest[key] = record['data']
+    
+    def _advance(self, until: float):
+        while self._position < len(self.records) and self.records[self._position]['t'] <= until:
+            self._apply(self.records[self._position])
+            self._position += 1
+    
+    def _step(self, key: tuple):
+        """逐筆模式：推進到此序列的下一筆錄製資料（序列已回放完畢時維持最後狀態）"""
+        indexes = self._series.get(key, [])
+        served = self._served.get(key, 0)
+        if served >= len(indexes):
+            return
+        self._served[key] = served + 1
+        index = indexes[served]
+        record = self.records[index]
+        already_applied = index < self._position
+        self._clock = max(self._clock, record['t'])
+        self._advance(self._clock)
+        if already_applied and record['path'] != '/k':
+            # 時鐘已被其他序列推進超過此筆，仍依序回放此序列的值（K線只會前進不回退）
+            self._apply(record)
+    
+    def respond(self, url: str, params: Optional[Dict] = None) -> ReplayResponse:
+        """依請求路徑與參數回傳錄製的回應"""
+        params = dict(params or {})
+        path = url.split('/api/v2', 1)[-1]
+        key = _series_key(path, params)
+        
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.speed and self.speed > 0:
+                self._advance(self.now())
+            else:
+                self._step(key)
+            
+            if path == '/k':
+                rows = self._klines.get(key)
+                if rows is None:
+                    self.stats['misses'] += 1
+                    return ReplayResponse(404, None)
+                timestamps = sorted(rows)
+                limit = int(params.get('limit', 30))
+                if 'timestamp' in params:
+                    since = int(params['timestamp'])
+                    selected = [t for t in timestamps if t >= since][:limit]
+                else:
+                    selected = timestamps[-limit:]
+                return ReplayResponse(200, [rows[t] for t in selected])
+            
+            if key not in self._latest:
+                self.stats['misses'] += 1
+                return ReplayResponse(404, None)
+            return ReplayResponse(200, self._latest[key])
+
+# 同一檔案共用同一個錄製器/回放器（例如同步與非同步客戶端共用同一個虛擬時鐘）
+_recorders: Dict[str, MaxRecorder] = {}
+_replays: Dict[str, MaxReplay] = {}
+_registry_lock = threading.Lock()
+
+def get_recorder(path: str) -> MaxRecorder:
+    with _registry_lock:
+        if path not in _recorders:
+            _recorders[path] = MaxRecorder(path)
+            logger.info(f"🎙️ MAX API回應錄製至 {path}")
+        return _recorders[path]
+
+def get_replay(path: str, speed: float = 1.0) -> MaxReplay:
+    with _registry_lock:
+        if path not in _replays:
+            _replays[path] = MaxReplay(path, speed=speed)
+            logger.info(f"▶️ 由 {path} 回放MAX API回應 ({len(_replays[path].records)} 筆, {speed}x)")
+        return _replays[path]
+
+def summarize(path: str) -> Dict:
+    """錄製檔摘要"""
+    records = load_recording(path)
+    counts = {}
+    for record in records:
+        counts[record['endpoint']] = counts.get(record['endpoint'], 0) + 1
+    return {
+        'records': len(records),
+        'endpoints': counts,
+        'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(records[0]['t'])) if records else None,
+        'end': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(records[-1]['t'])) if records else None,
+        'duration_hours': round((records[-1]['t'] - records[0]['t']) / 3600, 2) if records else 0
+    }
+
+def recorded_klines(path: str) -> Dict[tuple, KlineArray]:
+    """由錄製檔取出各 (市場, 週期) 的K線：多次 /k 回應依時間合併，同一根K線以最後一次回應為準"""
+    series: Dict[tuple, List] = {}
+    for record in load_recording(path):
+        if record.get('path') != '/k' or not record.get('data'):
+            continue
+        series.setdefault(_series_key('/k', record.get('params', {}))[1:], []).extend(record['data'])
+    
+    klines = {}
+    for key, data in series.items():
+        records = decode_klines(data).records
+        _, last = np.unique(records['timestamp'][::-1], return_index=True)
+        klines[key] = KlineArray(records[len(records) - 1 - last])
+    return klines
+
+def record_market(path: str, markets: List[str], periods: List[int], duration: float, interval: float):
+    """持續輪詢並錄製市場資料"""
+    from max_api import MaxAPI
+    
+    api = MaxAPI(recorder=get_recorder(path))
+    deadline = time.time() + duration
+    try:
+        while time.time() < deadline:
+            for market in markets:
+                api.get_ticker(market)
+                for period in periods:
+                    api.get_kline_array(market, period=period, limit=200)
+            print(f"🎙️ 已錄製 {api.recorder.count} 筆")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.recorder.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='MAX API錄製與回放工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    record_parser = subparsers.add_parser('record', help='錄製市場資料')
+    record_parser.add_argument('path')
+    record_parser.add_argument('--markets', default='btcusdt,btctwd')
+    record_parser.add_argument('--periods', default='1,60')
+    record_parser.add_argument('--duration', type=float, default=86400, help='錄製秒數')
+    record_parser.add_argument('--interval', type=float, default=30, help='輪詢間隔秒數')
+    
+    info_parser = subparsers.add_parser('info', help='顯示錄製檔摘要')
+    info_parser.add_argument('path')
+    
+    args = parser.parse_args()
+    if args.command == 'record':
+        record_market(args.path, args.markets.split(','), [int(p) for p in args.periods.split(',')],
+                      args.duration, args.interval)
+    else:
+        print(json.dumps(summarize(args.path), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MAX WebSocket即時行情訂閱
+訂閱 ticker / trade / kline 公開頻道，斷線自動重連並重新訂閱，
+斷線期間自動改用REST輪詢，確保資料不中斷
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from config import MAX_WS_URL
+from max_api import AsyncMaxAPI
+
+# K線週期（分鐘）與WebSocket resolution的對照
+KLINE_RESOLUTIONS = {
+    1: '1m', 5: '5m', 15: '15m', 30: '30m', 60: '1h',
+    120: '2h', 240: '4h', 360: '6h', 720: '12h', 1440: '1d'
+}
+
+def parse_ws_message(message: Dict) -> List[Dict]:
+    """將MAX WebSocket訊息轉換為統一格式的事件列表"""
+    channel = message.get('c')
+    market = message.get('M')
+    events = []
+    
+    if channel == 'ticker' and 'tk' in message:
+        tk = message['tk']
+        events.append({
+            'channel': 'ticker',
+            'market': market,
+            'data': {
+                'symbol': market.upper(),
+                'price': float(tk['C']),
+                'volume': float(tk['v']),
+                'high': float(tk['H']),
+                'low': float(tk['L']),
+                'timestamp': datetime.now()
+            }
+        })
+    elif channel == 'trade':
+        for trade in message.get('t', []):
+            events.append({
+                'channel': 'trade',
+                'market': market,
+                'data': {
+                    'price': float(trade['p']),
+                    'volume': float(trade['v']),
+                    'side': trade.get('tr'),
+                    'timestamp': datetime.fromtimestamp(trade['T'] / 1000, tz=timezone.utc).replace(tzinfo=None)
+                }
+            })
+    elif channel == 'kline' and 'k' in message:
+        k = message['k']
+        events.append({
+            'channel': 'kline',
+            'market': market,
+            'data': {
+                'timestamp': datetime.fromtimestamp(k['ST'] / 1000, tz=timezone.utc).replace(tzinfo=None),
+                'resolution': k.get('R'),
+                'open': float(k['O']),
+                'high': float(k['H']),
+                'low': float(k['L']),
+                'close': float(k['C']),
+                'volume': float(k['v']),
+                'closed': bool(k.get('x', False))
+            }
+        })
+    
+    return events
+
+class MaxWebSocketFeed:
+    """MAX公開行情WebSocket訂閱器（含REST備援）"""
+    
+    def __init__(self, markets: List[str], channels: List[str] = None, kline_period: int = 1,
+                 ws_url: str = MAX_WS_URL, rest_api: Optional[AsyncMaxAPI] = None,
+                 fallback_interval: int = 30, max_backoff: float = 60.0, ticker_max_age: float = 15.0):
+        self.markets = markets
+        self.channels = channels or ['ticker', 'trade', 'kline']
+        self.kline_period = kline_period
+        self.ws_url = ws_url
+        self.rest_api = rest_api
+        self.fallback_interval = fallback_interval
+        self.max_backoff = max_backoff
+        self.ticker_max_age = ticker_max_age  # 最新價格超過此秒數未更新即視為過期
+        self.logger = logging.getLogger('MaxWebSocketFeed')
+        
+        self.connected = False
+        self.is_running = False
+        self._callbacks: List[Callable] = []
+        self._queues: List[asyncio.Queue] = []
+        self._latest_ticker: Dict[str, Tuple[float, Dict]] = {}  # 市場 -> (接收時間, 價格)
+        self._task = None
+        self._fallback_task = None
+        self._session = None
+        
+        self.stats = {
+            'messages': 0,
+            'reconnects': 0,
+            'fallback_polls': 0,
+            'last_message': None
+        }
+    
+    def add_callback(self, callback: Callable):
+        """註冊事件回呼（可為一般函數或協程函數）"""
+        self._callbacks.append(callback)
+    
+    async def events(self, maxsize: int = 1000):
+        """以非同步迭代器方式接收事件"""
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._queues.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.remove(queue)
+    
+    def latest_ticker(self, market: str) -> Optional[Dict]:
+        """取得最新價格（格式與 MaxAPI.get_ticker 相同）；超過 ticker_max_age 秒未更新時回傳None，
+        由呼叫端改用REST查詢"""
+        entry = self._latest_ticker.get(market)
+        if entry is None:
+            return None
+        received_at, ticker = entry
+        if time.monotonic() - received_at > self.ticker_max_age:
+            return None
+        return ticker
+    
+    def subscription_message(self) -> Dict:
+        """組合訂閱請求"""
+        subscriptions = []
+        for market in self.markets:
+            for channel in self.channels:
+                sub = {'channel': channel, 'market': market}
+                if channel == 'kline':
+                    sub['resolution'] = KLINE_RESOLUTIONS.get(self.kline_period, '1m')
+                subscriptions.append(sub)
+        return {'action': 'sub', 'subscriptions': subscriptions, 'id': 'btc-macd-monitor'}
+    
+    async def start(self):
+        """啟動訂閱（背景任務）"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """停止訂閱與REST備援"""
+        self.is_running = False
+        for task in (self._task, self._fallback_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._fallback_task = None
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self.connected = False
+    
+    async def _run(self):
+        """連線主迴圈 - 斷線後以指數退避重連"""
+        attempt = 0
+        self._session = aiohttp.ClientSession()
+        
+        while self.is_running:
+            try:
+                async with self._session.ws_connect(self.ws_url, heartbeat=30) as ws:
+                    await ws.send_json(self.subscription_message())
+                    self.connected = True
+                    attempt = 0
+                    self._stop_fallback()
+                    self.logger.info(f"✅ WebSocket已連線並訂閱: {', '.join(self.markets)}")
+                    
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            await self._handle_message(json.loads(msg.data))
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"WebSocket連線錯誤: {e}")
+            
+            self.connected = False
+            if not self.is_running:
+                break
+            
+            # 斷線期間改用REST輪詢
+            self._start_fallback()
+            attempt += 1
+            self.stats['reconnects'] += 1
+            delay = min(self.max_backoff, 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            self.logger.info(f"🔄 {delay:.1f}秒後重新連線 (第{attempt}次)")
+            await asyncio.sleep(delay)
+    
+    async def _handle_message(self, message: Dict):
+        """處理單則WebSocket訊息"""
+        if message.get('e') == 'error':
+            self.logger.error(f"WebSocket錯誤訊息: {message.get('E')}")
+            return
+        
+        for event in parse_ws_message(message):
+            event['source'] = 'ws'
+            await self._emit(event)
+    
+    async def _emit(self, event: Dict):
+        """分派事件給回呼與迭代器"""
+        self.stats['messages'] += 1
+        self.stats['last_message'] = datetime.now()
+        if event['channel'] == 'ticker':
+            self._latest_ticker[event['market']] = (time.monotonic(), event['data'])
+        
+        for queue in self._queues:
+            if queue.full():
+                queue.get_nowait()  # 丟棄最舊事件，避免慢速消費者拖累
+            queue.put_nowait(event)
+        
+        for callback in self._callbacks:
+            try:
+                result = callback(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.logger.error(f"事件回呼失敗: {e}")
+    
+    def _start_fallback(self):
+        if self.rest_api is None:
+            return
+        if self._fallback_task is None or self._fallback_task.done():
+            self.logger.info("⚠️ WebSocket中斷，改用REST輪詢")
+            self._fallback_task = asyncio.create_task(self._rest_fallback())
+    
+    def _stop_fallback(self):
+        if self._fallback_task and not self._fallback_task.done():
+            self._fallback_task.cancel()
+            self.logger.info("✅ WebSocket恢復，停止REST輪詢")
+        self._fallback_task = None
+    
+    async def _rest_fallback(self):
+        """REST備援輪詢"""
+        while self.is_running and not self.connected:
+            for market in self.markets:
+                if 'ticker' in self.channels or 'trade' in self.channels:
+                    ticker = await self.rest_api.get_ticker(market)
+                    if ticker:
+                        await self._emit({'channel': 'ticker', 'market': market, 'data': ticker, 'source': 'rest'})
+                
+                if 'kline' in self.channels:
+                    klines = await self.rest_api.get_klines(market, period=self.kline_period, limit=2)
+                    if klines is not None and not klines.empty:
+                        for i, row in klines.iterrows():
+                            await self._emit({
+                                'channel': 'kline',
+                                'market': market,
+                                'data': {
+                                    'timestamp': row['timestamp'].to_pydatetime(),
+                                    'resolution': KLINE_RESOLUTIONS.get(self.kline_period),
+                                    'open': float(row['open']),
+                                    'high': float(row['high']),
+                                    'low': float(row['low']),
+                                    'close': float(row['close']),
+                                    'volume': float(row['volume']),
+                                    'closed': i < len(klines) - 1
+                                },
+                                'source': 'rest'
+                            })
+            
+            self.stats['fallback_polls'] += 1
+            await asyncio.sleep(self.fallback_interval)
+
+class MaxWebSocketStandIn:
+    """本地MAX WebSocket替身服務器 - 供離線測試使用"""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.subscriptions: List[Dict] = []
+        self._clients: List[web.WebSocketResponse] = []
+        self._runner = None
+        
+        self.app = web.Application()
+        self.app.router.add_get('/ws', self.handle_ws)
+    
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+    
+    async def start(self):
+        """啟動替身服務器（port=0時自動選擇可用端口）"""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        await self.drop_connections()
+        if self._runner:
+            await self._runner.cleanup()
+    
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._clients.append(ws)
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                if data.get('action') == 'sub':
+                    self.subscriptions.append(data)
+                    await ws.send_json({'e': 'subscribed', 's': data['subscriptions'], 'i': data.get('id')})
+        finally:
+            if ws in self._clients:
+                self._clients.remove(ws)
+        return ws
+    
+    async def broadcast(self, message: Dict):
+        """推送訊息給所有連線中的客戶端"""
+        for ws in list(self._clients):
+            await ws.send_json(message)
+    
+    async def drop_connections(self):
+        """關閉所有連線（模擬斷線）"""
+        for ws in list(self._clients):
+            await ws.close()
+        self._clients.clear()
+    
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
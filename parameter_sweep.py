@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+警報參數掃描
+以 backtester.AlertBacktester 的規則重播整段K線，對多組參數（網格或隨機抽樣）以多程序平行回測並排名
+
+可掃描的參數：
+- 警報規則：DEFAULT_RULES 的鍵（signal_strength_threshold、rsi_overbought、cooldown_period ...）
+- 綜合分析設定：AdvancedCryptoAnalyzer.config 的鍵加上 'analyzer.' 前綴
+  （analyzer.rsi_oversold / analyzer.rsi_overbought 為計分的RSI門檻，analyzer.bb_period / analyzer.bb_std 為布林帶）
+indicator_weights 未參與綜合分析的計分，因此不是可掃描的參數
+
+K線與基本警報的標準MACD/RSI放在共享記憶體；每組 analyzer 設定的綜合分析只計算一次，
+結果寫入共享記憶體，之後各組警報規則直接讀取，工作程序之間不需逐筆pickle陣列。
+完成的結果逐筆附加至檢查點（JSONL），中斷後以相同參數重跑時只計算未完成的組合
+
+使用方式：
+    python parameter_sweep.py --market btctwd --period 1 --days 90 --checkpoint sweep.jsonl \\
+        --grid "analyzer.rsi_oversold=25,30,35" --grid "cooldown_period=300,900"
+    python parameter_sweep.py --recording day.jsonl.gz --period 1 --samples 200 --seed 1 \\
+        --range "analyzer.bb_std=1.5:3" --grid "signal_strength_threshold=60,70,85"
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from backtester import (AI_SIGNAL_FIELDS, DEFAULT_CAPITAL, DEFAULT_FEE_RATE, DEFAULT_RULES, DEFAULT_SLIPPAGE,
+                        AlertBacktester, close_times, load_candles, load_monitor_rules)
+from config import CANDLE_STORE_DIR
+from indicator_graph import indicators_for, node_key
+
+ANALYZER_PREFIX = 'analyzer.'
+
+# 共享記憶體中的K線欄位（含基本警報使用的標準MACD(12/26/9)與RSI(14)）
+CANDLE_COLUMNS = (
+    ('timestamp', 'datetime64[ns]'), ('open', np.float64), ('high', np.float64), ('low', np.float64),
+    ('close', np.float64), ('volume', np.float64), ('close_time', np.int64),
+    ('macd', np.float64), ('macd_signal', np.float64), ('rsi', np.float64)
+)
+
+# alert_inputs 中隨 analyzer 設定改變、每組設定各存一份的欄位
+ANALYSIS_COLUMNS = ('confidence', 'net_score') + tuple(
+    f"{field}_{side}" for field in AI_SIGNAL_FIELDS for side in ('buy', 'sell'))
+
+# 可用的排名指標（皆為越大越好，max_drawdown_pct 為負值）
+RANK_METRICS = ('return_pct', 'return_to_drawdown', 'hit_rate', 'max_drawdown_pct', 'pnl')
+
+class SharedArrays:
+    """以單一共享記憶體區塊存放多個具名NumPy陣列，子程序以 handle 附加後直接讀取"""
+    
+    def __init__(self, shm: shared_memory.SharedMemory, layout: Dict[str, Tuple[tuple, str, int]], owner: bool):
+        self.shm = shm
+        self.layout = layout
+        self.owner = owner
+        self.arrays = {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+                       for name, (shape, dtype, offset) in layout.items()}
+    
+    @classmethod
+    def create(cls, specs: Dict[str, Tuple[tuple, object]]) -> 'SharedArrays':
+        """配置新的區塊，specs 為 {名稱: (shape, dtype)}"""
+        layout, size = {}, 0
+        for name, (shape, dtype) in specs.items():
+            dtype = np.dtype(dtype)
+            size = -(-size // 8) * 8  # 每個陣列以8位元組對齊
+            layout[name] = (tuple(shape), dtype.str, size)
+            size += int(np.prod(shape)) * dtype.itemsize
+        return cls(shared_memory.SharedMemory(create=True, size=max(size, 1)), layout, owner=True)
+    
+    @classmethod
+    def attach(cls, handle: Tuple[str, Dict]) -> 'SharedArrays':
+        name, layout = handle
+        return cls(shared_memory.SharedMemory(name=name), layout, owner=False)
+    
+    @property
+    def handle(self) -> Tuple[str, Dict]:
+        """傳給子程序的區塊名稱與陣列配置"""
+        return self.shm.name, self.layout
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+    
+    def close(self):
+        """釋放陣列並關閉區塊（建立者同時刪除區塊）"""
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def config_key(params: Dict) -> str:
+    """一組參數的鍵（檢查點與去除重複使用）"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+def split_params(params: Dict) -> Tuple[Dict, Dict]:
+    """將一組參數分為 AdvancedCryptoAnalyzer.config 與警報規則，無法掃描的鍵引發 ValueError"""
+    analyzer_defaults = AdvancedCryptoAnalyzer().config
+    analyzer_config, rules = {}, {}
+    for key, value in params.items():
+        name = key[len(ANALYZER_PREFIX):] if key.startswith(ANALYZER_PREFIX) else None
+        if name in analyzer_defaults:
+            analyzer_config[name] = value
+        elif key in DEFAULT_RULES:
+            rules[key] = value
+        else:
+            raise ValueError(f"無法掃描的參數: {key}（可用警報規則 {', '.join(DEFAULT_RULES)}，"
+                             f"或 {ANALYZER_PREFIX}<AdvancedCryptoAnalyzer.config 的鍵>）")
+    return analyzer_config, rules
+
+def grid_configs(space: Dict[str, List]) -> List[Dict]:
+    """網格搜尋：space 為 {參數: 候選值列表}，回傳全部組合"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+def random_configs(space: Dict, samples: int, seed: int = None) -> List[Dict]:
+    """隨機抽樣：space 的值為候選值列表，或 {'low': 下限, 'high': 上限} 的區間
+    （上下限皆為整數時抽整數）；重複的組合只保留一次"""
+    rng = random.Random(seed)
+    
+    def draw(spec):
+        if isinstance(spec, dict):
+            low, high = spec['low'], spec['high']
+            if isinstance(low, int) and isinstance(high, int):
+                return rng.randint(low, high)
+            return rng.uniform(low, high)
+        return rng.choice(list(spec))
+    
+    configs, seen = [], set()
+    for _ in range(samples * 20):
+        if len(configs) >= samples:
+            break
+        params = {key: draw(spec) for key, spec in space.items()}
+        key = config_key(params)
+        if key not in seen:
+            seen.add(key)
+            configs.append(params)
+    return configs
+
+def load_checkpoint(path: str, run: Dict) -> Dict[str, Dict]:
+    """讀取檢查點中同一份K線與交易成本（run）的已完成結果，回傳 {參數鍵: 結果}"""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 中斷時寫到一半的最後一行
+            if record.get('run') == run:
+                done[record['key']] = record
+    return done
+
+def open_checkpoint(path: str):
+    """以附加模式開啟檢查點；上次中斷留下未換行的最後一行時先補上換行"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            partial = f.read(1) != b'\n'
+    else:
+        partial = False
+    output = open(path, 'a', encoding='utf-8')
+    if partial:
+        output.write('\n')
+    return output
+
+def rank_results(results: List[Dict], metric: str = 'return_pct', min_trades: int = 1) -> List[Dict]:
+    """依指標由大到小排名（同分時比較報酬率），交易數少於 min_trades 的組合不列入"""
+    if metric not in RANK_METRICS:
+        raise ValueError(f"不支援的排名指標: {metric}（可用 {', '.join(RANK_METRICS)}）")
+    eligible = [record for record in results if record['summary']['trades'] >= min_trades]
+    ranked = sorted(eligible, key=lambda record: (-record['summary'][metric], -record['summary']['return_pct'],
+                                                  record['key']))
+    return [{'rank': rank, **record} for rank, record in enumerate(ranked, 1)]
+
+# 工作程序狀態（_init_worker 於每個程序設定一次）
+_worker: Dict = {}
+
+def _init_worker(candle_handle, analysis_handle, costs: Tuple[float, float, float]):
+    candles = SharedArrays.attach(candle_handle)
+    _worker.update(
+        candles=candles,
+        analysis=SharedArrays.attach(analysis_handle),
+        costs=costs,
+        # simulate 只讀取開盤/收盤價，直接包裝共享記憶體的陣列
+        prices=pd.DataFrame({'open': candles['open'], 'close': candles['close']}, copy=False)
+    )
+
+def _worker_frame() -> pd.DataFrame:
+    """由共享記憶體重建K線DataFrame（每個程序一次，依賴圖的指標快取可在各組設定間重複使用）"""
+    if 'frame' not in _worker:
+        candles = _worker['candles']
+        _worker['frame'] = pd.DataFrame({name: candles[name] for name in
+                                         ('timestamp', 'open', 'high', 'low', 'close', 'volume')})
+    return _worker['frame']
+
+def _analysis_task(slot: int, analyzer_config: Dict) -> Optional[int]:
+    """計算一組 analyzer 設定的警報輸入並寫入共享記憶體，回傳第一個有效的K線位置（資料不足時為None）"""
+    analyzer = AdvancedCryptoAnalyzer()
+    analyzer.config.update(analyzer_config)
+    inputs = AlertBacktester(analyzer=analyzer).alert_inputs(_worker_frame())
+    if inputs is None:
+        return None
+    start = int(inputs['position'][0])
+    analysis = _worker['analysis']
+    for column in ANALYSIS_COLUMNS:
+        analysis[f"{slot}.{column}"][start:] = inputs[column]
+    return start
+
+def _sweep_task(items: List[Tuple[object, int, int, Dict, Optional[Tuple[int, int]]]]) -> List[Tuple[object, Dict]]:
+    """回測一批 (標籤, 設定槽, 起始位置, 警報規則, K線區間)，回傳各組的摘要
+    
+    區間 (lo, hi) 只回測該段K線（自 lo 空手開始），指標與綜合分析沿用整段歷史的計算結果；
+    區間為None時回測全部K線
+    """
+    candles, analysis = _worker['candles'], _worker['analysis']
+    results = []
+    for tag, slot, start, rules, window in items:
+        lo, hi = window or (0, len(candles['close']))
+        first = max(start, lo)
+        inputs = {
+            'position': np.arange(first, hi),
+            **{column: analysis[f"{slot}.{column}"][first:hi] for column in ANALYSIS_COLUMNS},
+            'macd': candles['macd'][first:hi],
+            'macd_signal': candles['macd_signal'][first:hi],
+            'prev_macd': candles['macd'][first - 1:hi - 1],
+            'prev_signal': candles['macd_signal'][first - 1:hi - 1],
+            'rsi': candles['rsi'][first:hi]
+        }
+        backtester = AlertBacktester(rules, *_worker['costs'])
+        candidates = backtester.candidates_from_inputs(inputs)
+        sent = candidates.iloc[backtester.filter_alerts(candidates, candles['close_time'])]
+        sent = sent.assign(position=sent['position'] - lo)  # simulate 的位置相對於區間起點
+        summary = backtester.simulate(_worker['prices'].iloc[lo:hi], sent)['summary']
+        drawdown = abs(summary['max_drawdown_pct'])
+        summary['return_to_drawdown'] = summary['return_pct'] / drawdown if drawdown else summary['return_pct']
+        summary['alerts_sent'] = len(sent)
+        summary['alerts_suppressed'] = len(candidates) - len(sent)
+        results.append((tag, summary))
+    return results
+
+class SweepSession:
+    """參數掃描的共享記憶體與工作程序池
+    
+    進入時將K線與標準MACD/RSI寫入共享記憶體，並平行計算每組 analyzer 設定的綜合分析；
+    之後可對任意K線區間重複回測（例如 walk_forward 的各訓練/測試區間），不需重新計算指標
+    """
+    
+    def __init__(self, df: pd.DataFrame, period: int, analyzer_configs: List[Dict], workers: int,
+                 costs: Tuple[float, float, float], chunk_size: int = None):
+        self.df = df
+        self.period = period
+        self.analyzer_configs = analyzer_configs
+        self.workers = workers
+        self.costs = costs
+        self.chunk_size = chunk_size
+        self.starts: List[Optional[int]] = []
+        self.logger = logging.getLogger('ParameterSweep')
+        self._candles = self._analysis = self._pool = None
+    
+    def __enter__(self) -> 'SweepSession':
+        df, n = self.df, len(self.df)
+        self._candles = SharedArrays.create({name: ((n,), dtype) for name, dtype in CANDLE_COLUMNS})
+        self._analysis = SharedArrays.create({
+            f"{slot}.{column}": ((n,), bool if column.endswith(('_buy', '_sell')) else np.float64)
+            for slot in range(len(self.analyzer_configs)) for column in ANALYSIS_COLUMNS
+        })
+        try:
+            candles = self._candles
+            for name in ('open', 'high', 'low', 'close', 'volume'):
+                candles[name][:] = df[name].to_numpy(dtype=np.float64)
+            candles['timestamp'][:] = df['timestamp'].to_numpy().astype('datetime64[ns]')
+            candles['close_time'][:] = close_times(df, self.period)
+            ctx = indicators_for(df)
+            macd_key = node_key('macd', 12, 26, 9)
+            candles['macd'][:] = ctx[f"{macd_key}.macd"]
+            candles['macd_signal'][:] = ctx[f"{macd_key}.signal"]
+            candles['rsi'][:] = ctx[node_key('rsi', 14)]
+            
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(candles.handle, self._analysis.handle, self.costs))
+            self.starts = list(self._pool.map(_analysis_task, range(len(self.analyzer_configs)),
+                                              self.analyzer_configs))
+            return self
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+    
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for block in (self._candles, self._analysis):
+            if block is not None:
+                block.close()
+        self._candles = self._analysis = None
+        return False
+    
+    @property
+    def first_position(self) -> Optional[int]:
+        """全部 analyzer 設定都已有綜合分析結果的第一根K線位置"""
+        valid = [start for start in self.starts if start is not None]
+        return max(valid) if valid else None
+    
+    def run(self, tasks: List[Tuple[object, int, Dict, Optional[Tuple[int, int]]]]) -> Iterator[Tuple[object, Dict]]:
+        """平行回測 (標籤, 設定槽, 警報規則, K線區間) 並依完成順序產生 (標籤, 摘要)；K線不足的設定略過"""
+        items = []
+        for tag, slot, rules, window in tasks:
+            if self.starts[slot] is None:
+                self.logger.warning(f"K線不足，略過: {tag}")
+                continue
+            items.append((tag, slot, self.starts[slot], rules, window))
+        
+        chunk_size = self.chunk_size or max(1, math.ceil(len(items) / (self.workers * 4)))
+        futures = [self._pool.submit(_sweep_task, items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+class ParameterSweep:
+    """以多程序平行回測多組警報規則與綜合分析設定"""
+    
+    def __init__(self, fee_rate: float = DEFAULT_FEE_RATE, slippage: float = DEFAULT_SLIPPAGE,
+                 initial_capital: float = DEFAULT_CAPITAL, workers: int = None, base_rules: Dict = None,
+                 chunk_size: int = None):
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.initial_capital = initial_capital
+        self.workers = workers or os.cpu_count() or 1
+        self.base_rules = dict(base_rules or {})  # 未掃描的警報規則（例如 monitor_config.json 的設定）
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger('ParameterSweep')
+    
+    def run(self, df: pd.DataFrame, period: int, configs: List[Dict], checkpoint: str = None,
+            metric: str = 'return_pct', min_trades: int = 1) -> Optional[Dict]:
+        """回測全部參數組合並排名；指定 checkpoint 時跳過已完成的組合，新結果逐筆附加"""
+        try:
+            started = time.perf_counter()
+            df = df.reset_index(drop=True)
+            run = {
+                'bars': len(df),
+                'start': str(df['timestamp'].iloc[0]),
+                'end': str(df['timestamp'].iloc[-1]),
+                'period': period,
+                'fee_rate': self.fee_rate,
+                'slippage': self.slippage,
+                'initial_capital': self.initial_capital,
+                'base_rules': self.base_rules
+            }
+            unique = {config_key(params): params for params in configs}
+            done = load_checkpoint(checkpoint, run)
+            results = [done[key] for key in unique if key in done]
+            pending = {key: params for key, params in unique.items() if key not in done}
+            if results:
+                self.logger.info(f"♻️ 檢查點已有 {len(results)} 組結果，剩餘 {len(pending)} 組")
+            if pending:
+                results.extend(self._evaluate(df, period, run, pending, checkpoint))
+            
+            seconds = time.perf_counter() - started
+            self.logger.info(f"🔎 參數掃描完成：{len(pending)} 組（{self.workers} 個程序）耗時 {seconds:.1f} 秒")
+            return {
+                'run': run,
+                'configs': len(unique),
+                'evaluated': len(pending),
+                'resumed': len(unique) - len(pending),
+                'workers': self.workers,
+                'seconds': seconds,
+                'configs_per_second': len(pending) / seconds if seconds else 0.0,
+                'metric': metric,
+                'results': rank_results(results, metric, min_trades)
+            }
+        
+        except Exception as e:
+            self.logger.error(f"❌ 參數掃描失敗: {e}")
+            return None
+    
+    def assign_slots(self, params_by_key: Dict[str, Dict]) -> Tuple[List[Dict], Dict[str, Tuple[int, Dict]]]:
+        """依 analyzer 設定分組：每組設定的綜合分析只計算一次，佔用共享記憶體中的一個槽；
+        回傳 (各槽的 analyzer 設定, {參數鍵: (設定槽, 警報規則)})"""
+        slots: Dict[str, int] = {}
+        analyzer_configs, assigned = [], {}
+        for key, params in params_by_key.items():
+            analyzer_config, rules = split_params(params)
+            slot = slots.setdefault(config_key(analyzer_config), len(slots))
+            if slot == len(analyzer_configs):
+                analyzer_configs.append(analyzer_config)
+            assigned[key] = (slot, {**self.base_rules, **rules})
+        return analyzer_configs, assigned
+    
+    def session(self, df: pd.DataFrame, period: int, analyzer_configs: List[Dict]) -> SweepSession:
+        return SweepSession(df, period, analyzer_configs, self.workers,
+                            (self.fee_rate, self.slippage, self.initial_capital), self.chunk_size)
+    
+    def _evaluate(self, df: pd.DataFrame, period: int, run: Dict, pending: Dict[str, Dict],
+                  checkpoint: str = None) -> List[Dict]:
+        analyzer_configs, assigned = self.assign_slots(pending)
+        results = []
+        with self.session(df, period, analyzer_configs) as session:
+            output = open_checkpoint(checkpoint) if checkpoint else None
+            try:
+                tasks = [(key, slot, rules, None) for key, (slot, rules) in assigned.items()]
+                for key, summary in session.run(tasks):
+                    record = {'key': key, 'run': run, 'params': pending[key], 'summary': summary}
+                    results.append(record)
+                    if output:
+                        output.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                        output.flush()
+            finally:
+                if output:
+                    output.close()
+        return results
+
+def parse_values(text: str) -> List:
+    """將 'a,b,c' 解析為數值或字串列表"""
+    values = []
+    for item in text.split(','):
+        try:
+            values.append(json.loads(item))
+        except json.JSONDecodeError:
+            values.append(item)
+    return values
+
+def build_configs(grid: List[str], ranges: List[str] = (), samples: int = None, seed: int = None) -> List[Dict]:
+    """由命令列的 'key=v1,v2'（候選值）與 'key=low:high'（抽樣區間）產生參數組合，參數錯誤時引發 ValueError"""
+    space = {}
+    for item in grid:
+        key, values = item.split('=', 1)
+        space[key] = parse_values(values)
+    for item in ranges:
+        key, bounds = item.split('=', 1)
+        low, high = parse_values(bounds.replace(':', ','))
+        space[key] = {'low': low, 'high': high}
+    if not space:
+        raise ValueError('請以 --grid 或 --range 指定要掃描的參數')
+    if ranges and not samples:
+        raise ValueError('--range 需搭配 --samples 隨機抽樣')
+    configs = random_configs(space, samples, seed) if samples else grid_configs(space)
+    for params in configs:
+        split_params(params)
+    return configs
+
+def print_ranking(report: Dict, top: int = 10):
+    run = report['run']
+    print(f"📊 {run['start']} ~ {run['end']}（{run['bars']} 根 {run['period']} 分鐘K線）")
+    print(f"🔎 {report['configs']} 組參數：計算 {report['evaluated']}，檢查點續用 {report['resumed']}，"
+          f"{report['workers']} 個程序 {report['seconds']:.1f} 秒（{report['configs_per_second']:.1f} 組/秒）")
+    print(f"🏆 依 {report['metric']} 排名前 {top} 組:")
+    for record in report['results'][:top]:
+        summary = record['summary']
+        print(f"   #{record['rank']} 報酬 {summary['return_pct']:.2f}%，最大回撤 {summary['max_drawdown_pct']:.2f}%，"
+              f"交易 {summary['trades']} 筆，勝率 {summary['hit_rate']:.1%} ← {record['key']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='警報參數掃描')
+    parser.add_argument('--market', default='btctwd')
+    parser.add_argument('--period', type=int, default=1, help='K線週期（分鐘）')
+    parser.add_argument('--candle-store', default=CANDLE_STORE_DIR, help='CandleStore 目錄')
+    parser.add_argument('--recording', help='MAX API錄製檔')
+    parser.add_argument('--days', type=float, help='只回測最後幾天')
+    parser.add_argument('--config', help='監控設定檔（未掃描的警報規則以此為準）')
+    parser.add_argument('--grid', action='append', default=[], help='候選值，例如 cooldown_period=300,900')
+    parser.add_argument('--range', action='append', default=[], help='隨機抽樣區間，例如 analyzer.bb_std=1.5:3')
+    parser.add_argument('--samples', type=int, help='隨機抽樣組數（未指定時為網格搜尋）')
+    parser.add_argument('--seed', type=int, help='隨機抽樣種子')
+    parser.add_argument('--workers', type=int, help='工作程序數（預設為CPU核心數）')
+    parser.add_argument('--checkpoint', help='結果檢查點（JSONL，可續跑）')
+    parser.add_argument('--metric', default='return_pct', choices=RANK_METRICS, help='排名指標')
+    parser.add_argument('--min-trades', type=int, default=1, help='列入排名的最少交易數')
+    parser.add_argument('--top', type=int, default=10, help='顯示前幾名')
+    parser.add_argument('--fee', type=float, default=DEFAULT_FEE_RATE, help='單邊手續費率')
+    parser.add_argument('--slippage', type=float, default=DEFAULT_SLIPPAGE, help='滑價比例')
+    parser.add_argument('--capital', type=float, default=DEFAULT_CAPITAL, help='初始資金')
+    parser.add_argument('--output', help='排名結果JSON檔')
+    args = parser.parse_args()
+    
+    try:
+        configs = build_configs(args.grid, args.range, args.samples, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    df = load_candles(args.market, args.period, args.candle_store, args.recording, args.days)
+    if df is None:
+        print(f"❌ 找不到 {args.market} {args.period} 分鐘K線")
+        return
+    
+    base_rules = load_monitor_rules(args.config) if args.config else None
+    sweep = ParameterSweep(args.fee, args.slippage, args.capital, args.workers, base_rules)
+    report = sweep.run(df, args.period, configs, args.checkpoint, args.metric, args.min_trades)
+    if report is None:
+        print("❌ 參數掃描失敗")
+        return
+    print_ranking(report, args.top)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"💾 排名結果已寫入 {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MAX API限流排程器
+以令牌桶控制各類端點的請求速率，遇到429時遵守Retry-After並以
+帶抖動的指數退避重試；緊急請求（互動回覆的價格查詢）優先於背景K線更新
+"""
+
+import asyncio
+import itertools
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+# 請求優先級（數字越小越優先）
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+# 各類端點的速率限制: (每秒補充令牌數, 桶容量)
+DEFAULT_RATE_LIMITS = {
+    'global': (10.0, 20),   # 整體（同一IP）上限
+    'ticker': (5.0, 10),
+    'kline': (2.0, 6),
+    'markets': (0.2, 2)
+}
+
+class TokenBucket:
+    """令牌桶"""
+    
+    def __init__(self, rate: float, capacity: float, now: float = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+    
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay(self) -> float:
+        """取得一個令牌還需等待的秒數"""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class _Ticket:
+    """等待中的請求"""
+    
+    def __init__(self, endpoint: str, priority: int, seq: int, enqueued: float):
+        self.endpoint = endpoint
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = enqueued
+    
+    def ahead_of(self, other: '_Ticket') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class RateLimitScheduler:
+    """依端點分類的令牌桶排程器（同時支援執行緒與asyncio）"""
+    
+    POLL_INTERVAL = 0.05
+    
+    def __init__(self, rate_limits: Dict[str, tuple] = None, base_backoff: float = 1.0,
+                 max_backoff: float = 60.0, clock=time.monotonic, sleep=time.sleep, async_sleep=asyncio.sleep):
+        # 時鐘與等待函式可替換（測試時以假時鐘推進，不實際等待）
+        self.clock = clock
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        limits = rate_limits or DEFAULT_RATE_LIMITS
+        now = clock()
+        self.buckets = {name: TokenBucket(rate, capacity, now) for name, (rate, capacity) in limits.items()}
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._blocked_until: Dict[str, float] = {}
+        
+        self.metrics = {
+            'requests': 0,
+            'throttled': 0,      # 收到429的次數
+            'total_wait': 0.0,
+            'max_wait': 0.0
+        }
+    
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        if endpoint not in self.buckets:
+            self.buckets[endpoint] = TokenBucket(*DEFAULT_RATE_LIMITS['ticker'], now=self.clock())
+        return self.buckets[endpoint]
+    
+    def _ready(self, endpoint: str, now: float) -> bool:
+        """該端點是否可立即發出請求（不考慮整體上限）"""
+        return self._blocked_until.get(endpoint, 0) <= now and self._bucket(endpoint).tokens >= 1
+    
+    def _try_acquire(self, ticket: _Ticket) -> float:
+        """嘗試取得令牌（需持有鎖），成功回傳0，否則回傳建議等待秒數"""
+        now = self.clock()
+        for bucket in self.buckets.values():
+            bucket.refill(now)
+        
+        blocked = self._blocked_until.get(ticket.endpoint, 0) - now
+        if blocked > 0:
+            return blocked
+        
+        bucket = self._bucket(ticket.endpoint)
+        if bucket.tokens < 1:
+            return bucket.delay()
+        
+        # 有更優先且已就緒的請求時讓它先走
+        for other in self._waiting:
+            if other is not ticket and other.ahead_of(ticket) and self._ready(other.endpoint, now):
+                return self.POLL_INTERVAL
+        
+        global_bucket = self.buckets.get('global')
+        if global_bucket is not None:
+            if global_bucket.tokens < 1:
+                return global_bucket.delay()
+            global_bucket.tokens -= 1
+        
+        bucket.tokens -= 1
+        self._waiting.remove(ticket)
+        
+        waited = now - ticket.enqueued
+        self.metrics['requests'] += 1
+        self.metrics['total_wait'] += waited
+        self.metrics['max_wait'] = max(self.metrics['max_wait'], waited)
+        return 0.0
+    
+    def _enqueue(self, endpoint: str, priority: int) -> _Ticket:
+        with self._lock:
+            ticket = _Ticket(endpoint, priority, next(self._seq), self.clock())
+            self._waiting.append(ticket)
+            return ticket
+    
+    def acquire(self, endpoint: str, priority: int = PRIORITY_NORMAL) -> float:
+        """阻塞直到可以發出請求，回傳等待秒數"""
+        ticket = self._enqueue(endpoint, priority)
+        while True:
+            with self._lock:
+                delay = self._try_acquire(ticket)
+            if delay <= 0:
+                return self.clock() - ticket.enqueued
+            self.sleep(min(delay, self.POLL_INTERVAL))
+    
+    async def acquire_async(self, endpoint: str, priority: int = PRIORITY_NORMAL) -> float:
+        """非同步等待直到可以發出請求，回傳等待秒數"""
+        ticket = self._enqueue(endpoint, priority)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_acquire(ticket)
+                if delay <= 0:
+                    return self.clock() - ticket.enqueued
+                await self.async_sleep(min(delay, self.POLL_INTERVAL))
+        except asyncio.CancelledError:
+            with self._lock:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+            raise
+    
+    def backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """計算重試等待時間：優先使用Retry-After，否則為帶抖動的指數退避"""
+        if retry_after:
+            try:
+                return min(self.max_backoff, max(0.0, float(retry_after)))
+            except (TypeError, ValueError):
+                pass
+        delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+    
+    def on_throttled(self, endpoint: str, attempt: int, retry_after: Optional[str] = None) -> float:
+        """收到429時暫停該類端點，回傳暫停秒數"""
+        delay = self.backoff_delay(attempt, retry_after)
+        with self._lock:
+            self.metrics['throttled'] += 1
+            until = self.clock() + delay
+            self._blocked_until[endpoint] = max(self._blocked_until.get(endpoint, 0), until)
+        return delay
+    
+    def get_metrics(self) -> Dict:
+        """取得排隊深度與等待時間統計"""
+        with self._lock:
+            queue_depth = {}
+            for ticket in self._waiting:
+                queue_depth[ticket.endpoint] = queue_depth.get(ticket.endpoint, 0) + 1
+            requests = self.metrics['requests']
+            return {
+                'requests': requests,
+                'throttled': self.metrics['throttled'],
+                'queue_depth': sum(queue_depth.values()),
+                'queue_depth_by_endpoint': queue_depth,
+                'avg_wait_ms': round(self.metrics['total_wait'] / requests * 1000, 1) if requests else 0.0,
+                'max_wait_ms': round(self.metrics['max_wait'] * 1000, 1)
+            }
+
+# 同一程序內所有MAX客戶端共用的排程器
+default_scheduler = RateLimitScheduler()
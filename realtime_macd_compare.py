@@ -33,6 +33,9 @@ def realtime_compare():
             
             print("\n📊 不同週期MACD值:")
             
+            # 預先載入1分鐘K線，其餘週期由快取合成（快取會自動往前補足長週期所需的根數）
+            max_api.get_kline_array('btctwd', period=1, limit=10000)
+            
             for period in periods_to_test:
                 try:
                     # 獲取K線
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+API請求合併器
+同時發出的相同請求（相同市場、週期、數量）只呼叫一次交易所API，
+所有呼叫者共用結果，並在短暫TTL內直接回傳快取結果
+"""
+
+import asyncio
+import copy
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+_MISSING = object()
+
+class _InFlightCall:
+    """進行中的同步請求"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class RequestCoalescer:
+    """單飛請求合併器（同時支援執行緒與asyncio）"""
+    
+    def __init__(self, ttl: float = 2.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _InFlightCall] = {}
+        # 進行中的非同步請求以 (事件迴圈, key) 為鍵：Future 只能在建立它的事件迴圈中等待
+        self._async_inflight: Dict[tuple, asyncio.Future] = {}
+        self._results: Dict[Hashable, tuple] = {}
+        
+        self.stats = {
+            'hits': 0,        # 未發出新請求即取得結果（TTL快取或共用進行中請求）
+            'misses': 0,      # 實際呼叫API的次數
+            'coalesced': 0    # 其中共用進行中請求的次數
+        }
+    
+    def _cached(self, key):
+        """取得TTL內的快取結果（需持有鎖）"""
+        entry = self._results.get(key)
+        if entry is None:
+            return _MISSING
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._results[key]
+            return _MISSING
+        return value
+    
+    def _store(self, key, result):
+        """保存成功的結果（需持有鎖），失敗結果(None)不快取"""
+        if result is not None and self.ttl > 0:
+            self._results[key] = (time.monotonic(), result)
+    
+    def call(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """同步呼叫：相同key的並行呼叫共用同一次執行"""
+        with self._lock:
+            cached = self._cached(key)
+            if cached is not _MISSING:
+                self.stats['hits'] += 1
+                return copy.copy(cached)
+            
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlightCall()
+                self._inflight[key] = flight
+                self.stats['misses'] += 1
+            else:
+                self.stats['hits'] += 1
+                self.stats['coalesced'] += 1
+        
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.copy(flight.result)
+        
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if flight.error is None:
+                    self._store(key, flight.result)
+            flight.event.set()
+        
+        # 回傳副本，避免呼叫者修改到共用的快取結果
+        return copy.copy(flight.result)
+    
+    async def call_async(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """非同步呼叫：相同事件迴圈中相同key的並行協程共用同一次執行
+        
+        發出請求的協程被取消時，等待中的協程改由其中一個重新發出請求。
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self._lock:
+            cached = self._cached(key)
+            if cached is not _MISSING:
+                self.stats['hits'] += 1
+                return copy.copy(cached)
+            
+            future = self._async_inflight.get(flight_key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._async_inflight[flight_key] = future
+                self.stats['misses'] += 1
+            else:
+                self.stats['hits'] += 1
+                self.stats['coalesced'] += 1
+        
+        if not leader:
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # 等待者本身被取消
+                return await self.call_async(key, coro_fn)
+            return copy.copy(result)
+        
+        try:
+            result = await coro_fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 標記已讀取，避免沒有等待者時出現警告
+            raise
+        else:
+            future.set_result(result)
+            with self._lock:
+                self._store(key, result)
+        finally:
+            with self._lock:
+                self._async_inflight.pop(flight_key, None)
+        
+        return copy.copy(result)
+    
+    def invalidate(self, key: Hashable = None):
+        """清除快取結果（不指定則全部清除）"""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """取得命中統計"""
+        total = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(self.stats['hits'] / total * 100, 1) if total else 0.0,
+            'in_flight': len(self._inflight) + len(self._async_inflight)
+        }
+
+# 同一程序內所有MAX客戶端共用的合併器
+default_coalescer = RequestCoalescer()
@@ -13,6 +13,8 @@ import pandas as pd
 from datetime import datetime, timedelta
 from max_api import MaxAPI
 from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from indicator_engine import LazyIndicatorFrame
+from indicator_graph import node_key
 import requests
 
 logging.basicConfig(
@@ -64,9 +66,11 @@ class ReversalPointDetector:
         try:
             period = self.config['support_resistance_period']
             
-            # 計算局部高點和低點
-            highs = df['high'].rolling(window=period, center=True).max()
-            lows = df['low'].rolling(window=period, center=True).min()
+            # 計算局部高點和低點（置中視窗 = 共用依賴圖的滾動高低點往前移半個視窗）
+            frame = df if isinstance(df, LazyIndicatorFrame) else LazyIndicatorFrame(df)
+            offset = (period - 1) // 2
+            highs = frame[node_key('highest', period)].shift(-offset)
+            lows = frame[node_key('lowest', period)].shift(-offset)
             
             # 找出明顯的支撐和阻力位
             current_price = df['close'].iloc[-1]
@@ -241,8 +245,8 @@ class ReversalPointDetector:
                     await asyncio.sleep(60)
                     continue
                 
-                # 計算技術指標
-                klines_with_indicators = self.analyzer.calculate_all_indicators(klines_df)
+                # 計算技術指標（按需計算，只算實際用到的欄位）
+                klines_with_indicators = self.analyzer.indicator_frame(klines_df)
                 if klines_with_indicators is None:
                     logger.warning("❌ 無法計算技術指標")
                     await asyncio.sleep(60)
@@ -15,7 +15,9 @@ from aiohttp import web, web_request
 from aiohttp.web import middleware
 import aiohttp_cors
 
-from max_api import MaxAPI
+from max_api import AsyncMaxAPI
+from max_websocket import MaxWebSocketFeed
+from live_candle import LiveCandle
 from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
 
 class StreamingAnalysisAPI:
@@ -23,7 +25,12 @@ class StreamingAnalysisAPI:
     
     def __init__(self, port: int = 8888):
         self.port = port
-        self.max_api = MaxAPI()
+        self.max_api = AsyncMaxAPI()
+        # WebSocket即時價格（斷線時自動改用REST輪詢）
+        self.market_feed = MaxWebSocketFeed(['btcusdt'], channels=['ticker', 'trade'], rest_api=self.max_api)
+        # 逐筆更新形成中的1小時K線與其MACD
+        self.live_candle = LiveCandle('btcusdt', 60)
+        self.market_feed.add_callback(self.live_candle.on_event)
         self.analyzer = AdvancedCryptoAnalyzer()
         
         # 設置日誌
@@ -118,8 +125,10 @@ class StreamingAnalysisAPI:
         try:
             self.logger.info("💰 收到價格查詢請求")
             
-            # 獲取最新價格
-            ticker = self.max_api.get_ticker('btcusdt')
+            # 獲取最新價格（優先使用WebSocket推送，推送過期時改用REST）
+            ticker = self.market_feed.latest_ticker('btcusdt')
+            if not ticker:
+                ticker = await self.max_api.get_ticker('btcusdt')
             if not ticker:
                 raise Exception("無法獲取價格數據")
             
@@ -133,6 +142,15 @@ class StreamingAnalysisAPI:
                 'timestamp': datetime.now().isoformat()
             }
             
+            # 盤中（形成中K線）的MACD/RSI，隨逐筆成交更新
+            live = self.live_candle.snapshot()
+            if live and self.live_candle.tracker.ready:
+                price_data['live_bar'] = {
+                    'timestamp': live['timestamp'].isoformat(),
+                    **{key: float(live[key]) for key in ('open', 'high', 'low', 'close', 'volume', 'macd',
+                                                          'macd_signal', 'macd_histogram', 'rsi')}
+                }
+            
             return web.json_response(price_data)
             
         except Exception as e:
@@ -145,21 +163,20 @@ class StreamingAnalysisAPI:
     async def update_analysis(self):
         """更新AI分析數據"""
         try:
-            # 獲取市場數據
-            ticker = self.max_api.get_ticker('btcusdt')
+            # 同時獲取市場數據與K線數據
+            ticker, kline_data = await self.max_api.get_ticker_and_klines('btcusdt', period=60, limit=200)
             if not ticker:
                 raise Exception("無法獲取市場數據")
             
-            # 獲取K線數據
-            kline_data = self.max_api.get_klines('btcusdt', period=60, limit=200)
             if kline_data is None or kline_data.empty:
                 raise Exception("無法獲取K線數據")
             
             current_price = float(ticker['price'])
+            self.live_candle.load(kline_data)
             
             # 執行AI分析
             self.logger.info("🤖 執行AI技術分析...")
-            ai_analysis = self.analyzer.comprehensive_analysis(kline_data, current_price)
+            ai_analysis = self.analyzer.comprehensive_analysis(kline_data, current_price, 'btcusdt', 60)
             
             # 組織數據
             self.latest_analysis = {
@@ -211,8 +228,9 @@ class StreamingAnalysisAPI:
         self.logger.info("📊 執行初始分析...")
         await self.update_analysis()
         
-        # 啟動定期更新任務
+        # 啟動定期更新任務與即時價格訂閱
         asyncio.create_task(self.periodic_update())
+        await self.market_feed.start()
         
         # 啟動web服務器
         runner = web.AppRunner(self.app)
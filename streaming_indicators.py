@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+串流式技術指標
+EMA / MACD / RSI 以O(1)狀態逐根更新：新K線呼叫 update()，形成中K線價格變動呼叫 revise()，
+計算結果與 ta 批次計算一致；狀態可快照保存，重啟後不需重新預熱
+"""
+
+import math
+from typing import Dict, Optional
+
+import pandas as pd
+
+NAN = float('nan')
+
+class StreamingEMA:
+    """指數移動平均（與 ta.trend.EMAIndicator 相同：adjust=False，前 window-1 根為NaN）"""
+    
+    def __init__(self, window: int, alpha: float = None):
+        self.window = window
+        self.alpha = alpha if alpha is not None else 2.0 / (window + 1)
+        # 不含最後一根K線的狀態，revise() 由此重新計算
+        self._base_value: Optional[float] = None
+        self._base_count = 0
+        self._value: Optional[float] = None
+        self._count = 0
+    
+    def _step(self, value: Optional[float], x: float) -> float:
+        return x if value is None else value + self.alpha * (x - value)
+    
+    def update(self, x: float) -> float:
+        """加入新K線"""
+        self._base_value, self._base_count = self._value, self._count
+        self._value = self._step(self._base_value, x)
+        self._count = self._base_count + 1
+        return self.value
+    
+    def revise(self, x: float) -> float:
+        """修正最後一根（形成中）K線"""
+        if self._count == 0:
+            return self.update(x)
+        self._value = self._step(self._base_value, x)
+        return self.value
+    
+    @property
+    def ready(self) -> bool:
+        return self._count >= self.window
+    
+    @property
+    def value(self) -> float:
+        return self._value if self.ready else NAN
+    
+    def snapshot(self) -> Dict:
+        return {
+            'window': self.window,
+            'alpha': self.alpha,
+            'base_value': self._base_value,
+            'base_count': self._base_count,
+            'value': self._value,
+            'count': self._count
+        }
+    
+    @classmethod
+    def restore(cls, state: Dict) -> 'StreamingEMA':
+        ema = cls(state['window'], state['alpha'])
+        ema._base_value = state['base_value']
+        ema._base_count = state['base_count']
+        ema._value = state['value']
+        ema._count = state['count']
+        return ema
+
+class StreamingMACD:
+    """MACD（與 ta.trend.MACD 相同）"""
+    
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self._signal_on_last = False  # 最後一根K線是否已計入信號線
+    
+    def _macd(self) -> float:
+        return self.fast.value - self.slow.value
+    
+    def update(self, close: float) -> Dict[str, float]:
+        self.fast.update(close)
+        self.slow.update(close)
+        # 信號線從MACD有值的第一根開始計算
+        self._signal_on_last = self.slow.ready
+        if self._signal_on_last:
+            self.signal.update(self._macd())
+        return self.values
+    
+    def revise(self, close: float) -> Dict[str, float]:
+        self.fast.revise(close)
+        self.slow.revise(close)
+        if self._signal_on_last:
+            self.signal.revise(self._macd())
+        return self.values
+    
+    @property
+    def values(self) -> Dict[str, float]:
+        macd = self._macd() if self.slow.ready else NAN
+        signal = self.signal.value
+        return {
+            'ema_fast': self.fast.value,
+            'ema_slow': self.slow.value,
+            'macd': macd,
+            'macd_signal': signal,
+            'macd_histogram': macd - signal
+        }
+    
+    def snapshot(self) -> Dict:
+        return {
+            'fast': self.fast.snapshot(),
+            'slow': self.slow.snapshot(),
+            'signal': self.signal.snapshot(),
+            'signal_on_last': self._signal_on_last
+        }
+    
+    @classmethod
+    def restore(cls, state: Dict) -> 'StreamingMACD':
+        macd = cls()
+        macd.fast = StreamingEMA.restore(state['fast'])
+        macd.slow = StreamingEMA.restore(state['slow'])
+        macd.signal = StreamingEMA.restore(state['signal'])
+        macd._signal_on_last = state['signal_on_last']
+        return macd
+
+class StreamingRSI:
+    """RSI（與 ta.momentum.RSIIndicator 相同：Wilder平滑，第一根的漲跌視為0）"""
+    
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.up = StreamingEMA(window, alpha=1.0 / window)
+        self.down = StreamingEMA(window, alpha=1.0 / window)
+        self._base_close: Optional[float] = None  # 最後一根之前的收盤價
+        self._close: Optional[float] = None
+    
+    def _moves(self, close: float):
+        if self._base_close is None:
+            return 0.0, 0.0
+        diff = close - self._base_close
+        return max(diff, 0.0), max(-diff, 0.0)
+    
+    def update(self, close: float) -> float:
+        self._base_close = self._close
+        self._close = close
+        gain, loss = self._moves(close)
+        self.up.update(gain)
+        self.down.update(loss)
+        return self.value
+    
+    def revise(self, close: float) -> float:
+        if self._close is None:
+            return self.update(close)
+        self._close = close
+        gain, loss = self._moves(close)
+        self.up.revise(gain)
+        self.down.revise(loss)
+        return self.value
+    
+    @property
+    def value(self) -> float:
+        if not self.up.ready:
+            return NAN
+        down = self.down.value
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + self.up.value / down)
+    
+    def snapshot(self) -> Dict:
+        return {
+            'window': self.window,
+            'up': self.up.snapshot(),
+            'down': self.down.snapshot(),
+            'base_close': self._base_close,
+            'close': self._close
+        }
+    
+    @classmethod
+    def restore(cls, state: Dict) -> 'StreamingRSI':
+        rsi = cls(state['window'])
+        rsi.up = StreamingEMA.restore(state['up'])
+        rsi.down = StreamingEMA.restore(state['down'])
+        rsi._base_close = state['base_close']
+        rsi._close = state['close']
+        return rsi
+
+class StreamingMACDTracker:
+    """依K線序列自動判斷新K線或形成中K線的MACD/RSI追蹤器
+    
+    每次傳入最新的K線DataFrame，只處理上次之後的新K線（O(新K線數)），
+    欄位名稱與 EnhancedMACDAnalyzer.calculate_macd 相同。
+    """
+    
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, rsi_window: int = 14):
+        self.macd = StreamingMACD(fast, slow, signal)
+        self.rsi = StreamingRSI(rsi_window)
+        self.last_timestamp: Optional[pd.Timestamp] = None
+        self.previous: Dict[str, float] = {}
+        # 最後一根K線與上一根（已收盤）K線加入前的狀態，sync() 時據此以 /k 的收盤價重算
+        self._opened: Optional[Dict] = None
+        self._closed: Optional[Dict] = None
+    
+    @property
+    def params(self) -> tuple:
+        """(fast, slow, signal, rsi_window)，用於確認還原的狀態與目前參數相符"""
+        return (self.macd.fast.window, self.macd.slow.window, self.macd.signal.window, self.rsi.window)
+    
+    def reset(self):
+        """清除狀態（保留參數）"""
+        self.__init__(*self.params)
+    
+    def _row(self) -> Dict[str, float]:
+        values = self.macd.values
+        return {
+            'ema_12': values['ema_fast'],
+            'ema_26': values['ema_slow'],
+            'macd': values['macd'],
+            'macd_signal': values['macd_signal'],
+            'macd_histogram': values['macd_histogram'],
+            'rsi': self.rsi.value
+        }
+    
+    def update(self, timestamp, close: float, remember: bool = True) -> Dict[str, float]:
+        """處理一根K線：時間戳與最後一根相同時視為形成中K線的修正
+        
+        remember=False 時不保存新K線加入前的狀態（預熱時只需保留最後兩根）。
+        """
+        timestamp = pd.Timestamp(timestamp)
+        if self.last_timestamp is not None and timestamp == self.last_timestamp:
+            self.macd.revise(close)
+            self.rsi.revise(close)
+        elif self.last_timestamp is None or timestamp > self.last_timestamp:
+            self._closed = self._opened and {**self._opened, 'close': self.rsi._close}
+            self._opened = {'timestamp': timestamp, 'state': self.snapshot()} if remember else None
+            self.previous = self._row()
+            self.macd.update(close)
+            self.rsi.update(close)
+            self.last_timestamp = timestamp
+        return self._row()
+    
+    def revise(self, close: float) -> Dict[str, float]:
+        """修正最後一根（形成中）K線的收盤價（逐筆更新用，不需比對時間戳）"""
+        if self.last_timestamp is None:
+            raise ValueError("尚無K線可修正")
+        self.macd.revise(close)
+        self.rsi.revise(close)
+        return self._row()
+    
+    def sync(self, df: pd.DataFrame) -> Dict[str, float]:
+        """由K線DataFrame同步（第一次呼叫時以全部資料預熱）
+        
+        資料不再包含上次的最後一根K線時（停機太久，中間有缺漏），狀態無法接續，改以全部資料重新預熱。
+        上一根K線由逐筆資料收盤時，若交易所已收盤的K線收盤價不同，回到該K線加入前的狀態重新計算。
+        """
+        if self.last_timestamp is not None and len(df) and df['timestamp'].iloc[0] > self.last_timestamp:
+            self.reset()
+        elif self._closed is not None and len(df) and df['timestamp'].iloc[-1] > self._closed['timestamp']:
+            closed = df['close'][df['timestamp'] == self._closed['timestamp']]
+            if len(closed) and float(closed.iloc[-1]) != self._closed['close']:
+                self._load(self._closed['state'])
+        if self.last_timestamp is not None:
+            df = df[df['timestamp'] >= self.last_timestamp]
+        remember_from = len(df) - 2
+        for i, (timestamp, close) in enumerate(zip(df['timestamp'], df['close'])):
+            self.update(timestamp, float(close), remember=i >= remember_from)
+        return self._row()
+    
+    def seed(self, timestamp, rows: int, latest: Dict[str, float], previous: Dict[str, float]):
+        """以批次計算（如 BatchIndicatorEngine）的最後兩列設定狀態，之後可照常 update/revise/sync
+        
+        rows 為計算用的K線數；latest/previous 需含 close、ema_12、ema_26、macd_signal、avg_gain、avg_loss，
+        previous 另需 macd、macd_histogram、rsi。
+        """
+        macd, rsi = self.macd, self.rsi
+        signal_rows = rows - macd.slow.window + 1  # 信號線從MACD有值的第一根開始計算
+        for ema, key, count in ((macd.fast, 'ema_12', rows), (macd.slow, 'ema_26', rows),
+                                (macd.signal, 'macd_signal', signal_rows),
+                                (rsi.up, 'avg_gain', rows), (rsi.down, 'avg_loss', rows)):
+            ema._base_value, ema._value = previous[key], latest[key]
+            ema._base_count, ema._count = count - 1, count
+        macd._signal_on_last = True
+        rsi._base_close, rsi._close = previous['close'], latest['close']
+        self.last_timestamp = pd.Timestamp(timestamp)
+        self.previous = {key: previous[key] for key in
+                         ('ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_histogram', 'rsi')}
+        self._opened = self._closed = None
+        return self._row()
+    
+    @property
+    def latest(self) -> Dict[str, float]:
+        """最後一根（可能形成中）K線的指標"""
+        return self._row()
+    
+    @property
+    def ready(self) -> bool:
+        row = self._row()
+        return not any(math.isnan(row[key]) for key in ('macd_signal', 'rsi'))
+    
+    def snapshot(self) -> Dict:
+        return {
+            'macd': self.macd.snapshot(),
+            'rsi': self.rsi.snapshot(),
+            'last_timestamp': self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+            'previous': self.previous
+        }
+    
+    def closed_snapshot(self) -> Dict:
+        """最後一根（形成中）K線加入前的快照，寫入檢查點用；還原後由 sync 以交易所資料重算該K線"""
+        return self._opened['state'] if self._opened is not None else self.snapshot()
+    
+    def _load(self, state: Dict) -> 'StreamingMACDTracker':
+        self.macd = StreamingMACD.restore(state['macd'])
+        self.rsi = StreamingRSI.restore(state['rsi'])
+        self.last_timestamp = pd.Timestamp(state['last_timestamp']) if state['last_timestamp'] else None
+        self.previous = state['previous']
+        self._opened = self._closed = None
+        return self
+    
+    @classmethod
+    def restore(cls, state: Dict) -> 'StreamingMACDTracker':
+        return cls()._load(state)
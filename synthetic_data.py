@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成K線資料
+產生可重現的隨機OHLCV，供離線測試與效能基準使用（不需連線）
+"""
+
+import numpy as np
+import pandas as pd
+
+def random_ohlcv(n=600, seed=3):
+    """以常態隨機漫步產生 n 根1分鐘K線（含平盤與高低點相同的K線）"""
+    rng = np.random.default_rng(seed)
+    close = 3_000_000 + np.cumsum(rng.normal(0, 3000, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.uniform(0, 1500, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 1500, n)
+    volume = rng.uniform(0.01, 5, n)
+    # 加入平盤與高低點相同的K線，覆蓋除以0的情況
+    close[100:105] = close[99]
+    high[100:105] = low[100:105] = close[99]
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='min'),
+        'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume
+    })
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試指標與分析結果快取（離線）
+"""
+
+import copy
+import logging
+import time
+
+import pandas as pd
+
+from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from analysis_cache import IndicatorResultCache, frame_fingerprint, last_closed_timestamp
+from synthetic_data import random_ohlcv
+
+def hourly_klines(n=300, period=60, seed=4):
+    """1小時K線，最後一根為形成中"""
+    df = random_ohlcv(n, seed=seed)
+    step = period * 60
+    current = int(time.time()) // step * step
+    df['timestamp'] = pd.to_datetime([current - (n - 1 - i) * step for i in range(n)], unit='s')
+    return df
+
+def test_last_closed_timestamp():
+    df = hourly_klines(120)
+    ts = [int(t.timestamp()) for t in df['timestamp']]
+    assert last_closed_timestamp(df, 60) == ts[-2]
+    assert last_closed_timestamp(df, 60, now=ts[-1] + 3600) == ts[-1]
+    print("✅ 形成中K線不算已收盤")
+
+def test_analysis_hits_and_copies():
+    cache = IndicatorResultCache()
+    analyzer = AdvancedCryptoAnalyzer(result_cache=cache)
+    df = hourly_klines()
+    price = float(df['close'].iloc[-1])
+    
+    first = analyzer.comprehensive_analysis(df, price, 'btctwd', 60)
+    first['bullish_signals'].append('被呼叫者修改')
+    second = analyzer.comprehensive_analysis(df.copy(), price, 'btctwd', 60)
+    assert 'signal' in second and '被呼叫者修改' not in second['bullish_signals']
+    stats = cache.get_stats()
+    # 第一次分析與其指標框架各一次未命中，第二次直接命中分析結果
+    assert stats['misses'] == 2 and stats['hits'] == 1, stats
+    
+    # 形成中K線或價格變動時重新計算
+    analyzer.comprehensive_analysis(df, price + 100, 'btctwd', 60)
+    assert cache.get_stats()['misses'] == 3
+    print(f"✅ 相同K線與價格命中快取: {cache.get_stats()}")
+
+def test_new_candle_invalidates():
+    cache = IndicatorResultCache()
+    analyzer = AdvancedCryptoAnalyzer(result_cache=cache)
+    df = hourly_klines()
+    analyzer.comprehensive_analysis(df.iloc[:-1], float(df['close'].iloc[-2]), 'btctwd', 60)
+    size = cache.get_stats()['size']
+    
+    # 新K線收盤：同市場/週期的舊結果失效，其他市場不受影響
+    analyzer.comprehensive_analysis(df, float(df['close'].iloc[-1]), 'btcusdt', 60)
+    shifted = df.copy()
+    shifted['timestamp'] = shifted['timestamp'] + pd.Timedelta(hours=1)
+    analyzer.comprehensive_analysis(shifted, float(df['close'].iloc[-1]), 'btctwd', 60)
+    stats = cache.get_stats()
+    assert stats['invalidations'] == size, stats
+    assert stats['size'] == 2 * size
+    print("✅ 新K線收盤時舊結果失效")
+
+def test_fingerprint_covers_repaired_rows():
+    df = hourly_klines()
+    repaired = df.copy()
+    # 缺口修補只改變中段的K線，筆數與首尾不變
+    repaired.loc[100, 'close'] += 1.0
+    assert frame_fingerprint(repaired) != frame_fingerprint(df)
+    assert frame_fingerprint(df.copy()) == frame_fingerprint(df)
+    print("✅ 中段K線修補後指紋改變")
+
+def test_cached_frame_copies_usage():
+    cache = IndicatorResultCache()
+    analyzer = AdvancedCryptoAnalyzer(result_cache=cache)
+    df = hourly_klines()
+    first = analyzer.indicator_frame(df, 'btctwd', 60)
+    first['rsi']
+    second = analyzer.indicator_frame(df, 'btctwd', 60)
+    assert cache.get_stats()['hits'] == 1
+    
+    # 快取取出的框架有各自的使用紀錄與欄位，互不影響
+    assert second.used == [] and first.used == ['rsi']
+    assert second['rsi'].equals(first['rsi']) and second.used == ['rsi']
+    second['macd']
+    assert 'macd' not in first.used and 'macd' not in first._series
+    
+    clone = copy.copy(second)
+    assert clone.used == [] and clone._series is not second._series
+    print("✅ 快取命中的指標框架不共用使用紀錄")
+
+def test_lru_eviction():
+    cache = IndicatorResultCache(max_entries=2)
+    for i in range(4):
+        cache.get_or_compute(('analysis', f"m{i}", 60, 0, 'x'), i, lambda: {'i': i})
+    assert cache.get_or_compute(('analysis', 'm3', 60, 0, 'x'), 3, lambda: None) == {'i': 3}
+    stats = cache.get_stats()
+    assert stats['evictions'] == 2 and stats['size'] == 2
+    print("✅ 超過容量時淘汰最久未使用的結果")
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    print("🧪 結果快取測試")
+    print("=" * 40)
+    test_last_closed_timestamp()
+    test_analysis_hits_and_copies()
+    test_new_candle_invalidates()
+    test_fingerprint_covers_repaired_rows()
+    test_cached_frame_copies_usage()
+    test_lru_eviction()
+    print("\n🎉 全部通過")
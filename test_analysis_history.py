@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試整段歷史的向量化綜合分析：每一列與逐列呼叫 comprehensive_analysis 的結果相同（離線）
+"""
+
+import logging
+import time
+
+from advanced_crypto_analyzer import BULLISH_SIGNALS, MIN_ANALYSIS_ROWS, AdvancedCryptoAnalyzer
+from indicator_engine import warmup_rows
+from synthetic_data import random_ohlcv
+
+logging.getLogger('AdvancedCryptoAnalyzer').setLevel(logging.WARNING)
+
+def assert_rows_match(analyzer, df, history):
+    for position in range(len(history)):
+        sub = df.iloc[:history.index[position] + 1]
+        expected = analyzer.comprehensive_analysis(sub, float(sub['close'].iloc[-1]))
+        assert analyzer.analysis_from_history(history, position) == expected, position
+
+def test_every_row_matches_scalar():
+    df = random_ohlcv(320, seed=7)
+    analyzer = AdvancedCryptoAnalyzer()
+    history = analyzer.comprehensive_analysis_history(df)
+    assert len(history) == len(df) - warmup_rows() - MIN_ANALYSIS_ROWS + 1
+    assert history['timestamp'].iloc[-1] == df['timestamp'].iloc[-1]
+    assert_rows_match(analyzer, df, history)
+    assert set(history['signal']) - {'HOLD'}
+    
+    # 位元遮罩與信號數、分數一致
+    masks = history['bullish_mask'].to_numpy()
+    counts = sum((masks >> bit) & 1 for bit in range(len(BULLISH_SIGNALS)))
+    assert (counts == history['bullish_count'].to_numpy()).all()
+    print(f"✅ {len(history)} 列與逐列分析結果相同")
+
+def test_current_price_and_modes():
+    df = random_ohlcv(260, seed=12)
+    analyzer = AdvancedCryptoAnalyzer()
+    price = float(df['close'].iloc[-1]) * 0.98
+    history = analyzer.comprehensive_analysis_history(df, price)
+    assert analyzer.analysis_from_history(history) == analyzer.comprehensive_analysis(df, price)
+    
+    # 精簡模式與 ta 逐項計算的路徑也相同
+    analyzer.compact_indicators = True
+    assert_rows_match(analyzer, df, analyzer.comprehensive_analysis_history(df).tail(30))
+    analyzer.compact_indicators = False
+    analyzer.use_fused_engine = False
+    assert_rows_match(analyzer, df, analyzer.comprehensive_analysis_history(df).tail(10))
+    analyzer.use_fused_engine = True
+    
+    # RSI門檻取自 config（參數掃描可調整）
+    analyzer.config.update(rsi_overbought=55, rsi_oversold=45)
+    history = analyzer.comprehensive_analysis_history(df)
+    assert_rows_match(analyzer, df, history.tail(40))
+    assert (history['bullish_mask'] & 0b1100).any()
+    
+    assert analyzer.comprehensive_analysis_history(df.iloc[:120]) is None
+    print("✅ 指定目前價格、精簡模式與 ta 路徑的最後一列皆相同")
+
+def test_history_is_faster():
+    df = random_ohlcv(2000, seed=3)
+    analyzer = AdvancedCryptoAnalyzer()
+    started = time.perf_counter()
+    history = analyzer.comprehensive_analysis_history(df)
+    vectorized = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for end in range(len(df) - 20, len(df)):
+        analyzer.comprehensive_analysis(df.iloc[:end + 1], float(df['close'].iloc[end]))
+    per_row = (time.perf_counter() - started) / 20
+    assert vectorized < per_row * len(history)
+    print(f"✅ {len(history)} 列一次計算 {vectorized * 1e3:.1f}ms，逐列約 {per_row * len(history):.1f}s")
+
+if __name__ == "__main__":
+    print("🧪 歷史綜合分析測試")
+    print("=" * 40)
+    test_every_row_matches_scalar()
+    test_current_price_and_modes()
+    test_history_is_faster()
+    print("\n🎉 全部通過")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試非同步MAX API客戶端：429重試與並行價格查詢合併（離線，假連線池）
+"""
+
+import asyncio
+
+from max_api import AsyncMaxAPI
+from max_recorder import AsyncReplayResponse
+from rate_limit_scheduler import RateLimitScheduler
+from request_coalescer import RequestCoalescer
+
+TICKER = {'last': '65000.5', 'vol': '12.5', 'high': '66000', 'low': '64000'}
+
+class FakeSession:
+    """取代 aiohttp.ClientSession：依序回傳預先排好的回應"""
+    
+    closed = False
+    
+    def __init__(self, responses, delay=0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.calls = []
+    
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(url)
+        status, data, headers = self.responses.pop(0)
+        response = DelayedResponse(status, data, self.delay)
+        response.headers = headers
+        return response
+    
+    async def close(self):
+        self.closed = True
+
+class DelayedResponse(AsyncReplayResponse):
+    """進入 async with 時等待 delay 秒，模擬網路延遲"""
+    
+    def __init__(self, status, data, delay):
+        super().__init__(status, data)
+        self.delay = delay
+    
+    async def __aenter__(self):
+        await asyncio.sleep(self.delay)
+        return self
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    async def sleep(self, seconds):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+def make_api(session, max_retries=3):
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(rate_limits={'global': (1e9, 1e9), 'ticker': (1e9, 1e9)},
+                                   clock=clock, async_sleep=clock.sleep)
+    api = AsyncMaxAPI(coalescer=RequestCoalescer(ttl=0), scheduler=scheduler, max_retries=max_retries)
+    api._session = session
+    return api, clock
+
+def test_get_json_retries_after_429():
+    session = FakeSession([(429, None, {'Retry-After': '2'}), (429, None, {}), (200, TICKER, {})])
+    api, clock = make_api(session)
+    
+    data = asyncio.run(api._get_json('ticker', '/tickers/btcusdt'))
+    assert data == TICKER and len(session.calls) == 3
+    # 第一次依 Retry-After 暫停該端點，之後以指數退避重試
+    assert clock.now >= 2.0
+    assert api.scheduler.get_metrics()['throttled'] == 2
+    
+    # 重試次數用完時拋出例外，get_ticker 記錄錯誤並回傳None
+    session = FakeSession([(429, None, {'Retry-After': '0'})] * 2)
+    api, _ = make_api(session, max_retries=1)
+    assert asyncio.run(api.get_ticker('btcusdt')) is None
+    assert len(session.calls) == 2
+    print("✅ 429時依Retry-After與退避重試")
+
+def test_concurrent_tickers_coalesced():
+    session = FakeSession([(200, TICKER, {})], delay=0.02)
+    api, _ = make_api(session)
+    
+    async def scenario():
+        return await asyncio.gather(*(api.get_ticker('btcusdt') for _ in range(5)))
+    
+    tickers = asyncio.run(scenario())
+    assert len(session.calls) == 1 and session.calls[0].endswith('/tickers/btcusdt')
+    assert all(ticker['price'] == 65000.5 and ticker['symbol'] == 'BTCUSDT' for ticker in tickers)
+    assert api.coalescer.stats['coalesced'] == 4
+    print("✅ 並行的相同價格查詢只呼叫一次API")
+
+if __name__ == "__main__":
+    print("🧪 非同步MAX API測試")
+    print("=" * 40)
+    test_get_json_retries_after_429()
+    test_concurrent_tickers_coalesced()
+    print("\n🎉 全部通過")
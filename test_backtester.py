@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試警報規則回測（離線）
+"""
+
+import logging
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtester import AlertBacktester, load_candles
+from candle_store import CandleStore
+from enhanced_macd_analyzer import EnhancedMACDAnalyzer
+from kline_decoder import KlineArray
+from synthetic_data import random_ohlcv
+
+logging.getLogger('AdvancedCryptoAnalyzer').setLevel(logging.WARNING)
+
+def test_basic_alerts_follow_monitor_rules():
+    df = random_ohlcv(1500, seed=9)
+    candidates = AlertBacktester().alert_candidates(df)
+    assert not candidates['type'].str.startswith('AI_').any()  # 線上規則讀取 recommendation，AI警報不觸發
+    
+    # 以 _analyze_basic_alerts 的判斷逐列計算
+    macd_df = EnhancedMACDAnalyzer().calculate_macd(df)
+    expected = []
+    for position in range(candidates['position'].min(), len(df)):
+        current, previous = macd_df.loc[position], macd_df.loc[position - 1]
+        if previous['macd'] <= previous['macd_signal'] and current['macd'] > current['macd_signal']:
+            expected.append((position, 'MACD_GOLDEN_CROSS'))
+        elif previous['macd'] >= previous['macd_signal'] and current['macd'] < current['macd_signal']:
+            expected.append((position, 'MACD_DEATH_CROSS'))
+        if current['rsi'] >= 80:
+            expected.append((position, 'RSI_OVERBOUGHT'))
+        elif current['rsi'] <= 20:
+            expected.append((position, 'RSI_OVERSOLD'))
+    assert list(zip(candidates['position'], candidates['type'])) == expected
+    
+    ai = AlertBacktester({'ai_signal_field': 'signal'}).alert_candidates(df)
+    assert ai['type'].str.startswith('AI_').any()
+    print(f"✅ {len(expected)} 個基本警報與逐列判斷相同")
+
+def test_cooldown_and_fills():
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=6, freq='min'),
+        'open': [100.0, 100.0, 110.0, 120.0, 90.0, 100.0],
+        'close': [100.0, 110.0, 120.0, 90.0, 100.0, 100.0]
+    })
+    alerts = pd.DataFrame({
+        'position': [0, 0, 1, 2, 3, 4],
+        'code': [2, 3, 4, 2, 3, 2],
+        'action': ['BUY', 'SELL', 'SELL', 'BUY', 'SELL', 'BUY'],
+        'strength': [85.0, 85.0, 60.0, 85.0, 85.0, 85.0]
+    })
+    backtester = AlertBacktester({'cooldown_period': 150}, fee_rate=0.001, slippage=0.0)
+    close_times = np.arange(6) * 60 + 60
+    sent = backtester.filter_alerts(alerts, close_times)
+    assert list(sent) == [0, 1, 2, 4, 5]  # 第2個金叉距上次只有120秒
+    
+    # 下一根開盤成交；同一根只成交一次；強度60的RSI警報低於門檻70不交易
+    result = backtester.simulate(df, alerts.iloc[sent])
+    first, last = result['trades']
+    assert (first['entry_position'], first['exit_position'], first['open']) == (1, 4, False)
+    assert np.isclose(first['pnl'], 100000 * (0.9 * 0.999 / 1.001 - 1))
+    assert last['entry_position'] == 5 and last['open'] is True
+    summary = result['summary']
+    assert summary['trades'] == 2 and summary['wins'] == 0 and summary['open_position']
+    assert np.isclose(summary['max_drawdown_pct'], (90 * 0.999 / 1.001 / 120 - 1) * 100)  # 高點120，再次買進後
+    print("✅ 冷卻期、強度門檻與成交規則正確")
+
+def test_run_from_candle_store():
+    df = random_ohlcv(20000, seed=2)
+    df['timestamp'] = pd.date_range('2024-01-01', periods=len(df), freq='min')
+    with tempfile.TemporaryDirectory() as root:
+        CandleStore(root).append('btctwd', 1, KlineArray.from_dataframe(df), now=2_000_000_000)
+        candles = load_candles('btctwd', 1, candle_store=root)
+        assert len(candles) == len(df)
+        
+        started = time.perf_counter()
+        report = AlertBacktester().run(candles, 1)
+        elapsed = time.perf_counter() - started
+    
+    summary = report['summary']
+    assert report['bars'] == len(df) and summary['trades'] > 0
+    assert sum(report['alerts']['sent'].values()) + report['alerts']['suppressed'] == \
+        sum(report['alerts']['generated'].values())
+    assert elapsed < 10
+    print(f"✅ {len(df)} 根K線回測 {elapsed:.2f} 秒：{summary['trades']} 筆交易，勝率 {summary['hit_rate']:.1%}，"
+          f"最大回撤 {summary['max_drawdown_pct']:.1f}%")
+
+if __name__ == "__main__":
+    print("🧪 警報規則回測測試")
+    print("=" * 40)
+    test_basic_alerts_follow_monitor_rules()
+    test_cooldown_and_fills()
+    test_run_from_candle_store()
+    print("\n🎉 全部通過")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試多市場批次指標計算：各市場結果與逐一計算一致（離線）
+"""
+
+import time
+
+import numpy as np
+import ta
+
+from batch_indicators import BatchIndicatorEngine, MACD_COLUMNS
+from benchmark_batch_indicators import run_benchmark
+from enhanced_macd_analyzer import EnhancedMACDAnalyzer
+from indicator_graph import ewm
+from indicator_kernels import ewm_columns
+from streaming_indicators import StreamingMACDTracker
+from synthetic_data import random_ohlcv
+
+def sample_frames():
+    """長度不同的多個市場（含資料不足者）"""
+    return {
+        'btctwd': random_ohlcv(300, seed=1),
+        'ethtwd': random_ohlcv(180, seed=2),
+        'usdttwd': random_ohlcv(120, seed=3),
+        'newtwd': random_ohlcv(120, seed=4).iloc[:20]
+    }
+
+def assert_close(actual, expected, label):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                               rtol=1e-9, atol=1e-6, err_msg=label)
+
+def test_matches_macd_analyzer():
+    frames = sample_frames()
+    result = BatchIndicatorEngine().compute(frames)
+    assert result.symbols == ['btctwd', 'ethtwd', 'usdttwd']
+    assert 'newtwd' not in result
+    
+    analyzer = EnhancedMACDAnalyzer()
+    for symbol in result.symbols:
+        expected = analyzer.calculate_macd(frames[symbol])
+        actual = result.frame(symbol, columns=MACD_COLUMNS, dropna=True)
+        assert list(actual.columns) == list(expected.columns), symbol
+        assert (actual.index == expected.index).all(), symbol
+        for col in MACD_COLUMNS:
+            assert_close(actual[col], expected[col], f"{symbol} {col}")
+    print("✅ 各市場MACD/RSI與 EnhancedMACDAnalyzer 一致")
+
+def test_bollinger_atr_match_ta():
+    frames = sample_frames()
+    result = BatchIndicatorEngine().compute(frames)
+    for symbol in result.symbols:
+        df = frames[symbol]
+        view = result.view(symbol)
+        bb = ta.volatility.BollingerBands(close=df['close'], window=20, window_dev=2)
+        atr = ta.volatility.AverageTrueRange(high=df['high'], low=df['low'], close=df['close'], window=14)
+        assert_close(view['bb_upper'], bb.bollinger_hband(), f"{symbol} bb_upper")
+        assert_close(view['bb_middle'], bb.bollinger_mavg(), f"{symbol} bb_middle")
+        assert_close(view['bb_lower'], bb.bollinger_lband(), f"{symbol} bb_lower")
+        assert_close(view['atr'], atr.average_true_range(), f"{symbol} atr")
+    print("✅ 布林帶與ATR與 ta 一致")
+
+def test_views_share_memory():
+    result = BatchIndicatorEngine().compute(sample_frames())
+    view = result.view('ethtwd')
+    assert len(view['macd']) == 180
+    assert np.shares_memory(view['macd'], result.arrays['macd'])
+    print("✅ 各市場結果為二維陣列的視圖")
+
+def test_missing_close_matches_pandas():
+    frames = sample_frames()
+    frames['btctwd'].loc[150, 'close'] = np.nan
+    result = BatchIndicatorEngine().compute(frames)
+    for symbol in ('btctwd', 'ethtwd'):
+        expected = frames[symbol]['close'].ewm(span=12, adjust=False, min_periods=12).mean()
+        assert_close(result.view(symbol)['ema_12'], expected, f"{symbol} ema_12")
+    print("✅ 中途缺值時與 pandas 的EMA一致")
+
+def test_ewm_columns_uses_graph_ewm():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(1_000_000, 6)).cumsum(axis=0)
+    values[:500, 2] = np.nan  # 前段補齊的欄位
+    alphas = np.repeat([2 / 13, 2 / 27, 1 / 14], 2)
+    started = time.perf_counter()
+    out = ewm_columns(values, alphas, 1)
+    elapsed = time.perf_counter() - started
+    
+    # 與依賴圖的EMA逐位元相同（同一個編譯過的遞迴）
+    for i in range(values.shape[1]):
+        assert np.array_equal(out[:, i], ewm(values[:, i], alphas[i]), equal_nan=True), i
+    assert elapsed < 5
+    print(f"✅ 100萬根×6欄EMA {elapsed:.2f} 秒，與依賴圖的EMA相同")
+
+class CountingEngine(BatchIndicatorEngine):
+    """記錄 compute 被呼叫的市場"""
+    
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+    
+    def compute(self, frames):
+        self.calls.append(sorted(frames))
+        return super().compute(frames)
+
+def test_alert_values_have_one_source():
+    frames = sample_frames()
+    analyzer = EnhancedMACDAnalyzer()
+    engine = CountingEngine()
+    results = analyzer.alert_indicators(frames, 15, engine)
+    
+    # 一次批次計算全部市場，警報數值即為批次結果（與 calculate_macd 一致）
+    assert engine.calls == [sorted(frames)]
+    assert sorted(results) == ['btctwd', 'ethtwd', 'usdttwd']
+    for symbol, payload in results.items():
+        assert payload['source'] == 'batch'
+        expected = analyzer.calculate_macd(frames[symbol])
+        for key, value in payload['technical'].items():
+            assert_close(value, expected[key].iloc[-1], f"{symbol} {key}")
+        for key, value in payload['previous'].items():
+            assert_close(value, expected[key].iloc[-2], f"{symbol} previous {key}")
+    
+    # 串流狀態只保存已收盤的K線，最後一根形成中的K線另外加入
+    df = random_ohlcv(301, seed=1)
+    tracker = analyzer.streaming_trackers['btctwd:15']
+    assert tracker.closed_snapshot()['last_timestamp'] == df['timestamp'].iloc[-3].isoformat()
+    
+    # 之後的呼叫由串流狀態逐根推進，不再批次計算，結果與重新計算一致
+    expected = analyzer.calculate_macd(df).iloc[-1]
+    payload = analyzer.alert_indicators({'btctwd': df.iloc[-200:]}, 15, engine)['btctwd']
+    assert engine.calls == [sorted(frames)]
+    assert payload['source'] == 'streaming'
+    for key in MACD_COLUMNS:
+        assert_close(payload['technical'][key], expected[key], f"streaming {key}")
+    
+    # 重啟後K線不足以批次計算的市場，由還原的串流狀態接續（不重複計算）
+    restarted = EnhancedMACDAnalyzer()
+    restarted.streaming_trackers['btctwd:15'] = StreamingMACDTracker.restore(tracker.closed_snapshot())
+    payload = restarted.alert_indicators({'btctwd': df.iloc[-20:]}, 15, engine)['btctwd']
+    assert payload['source'] == 'streaming' and engine.calls == [sorted(frames)]
+    assert_close(payload['technical']['macd'], expected['macd'], "restored macd")
+    
+    # 互動查詢不改變串流狀態
+    state = tracker.snapshot()
+    later = random_ohlcv(305, seed=1)
+    payload = analyzer.alert_indicators({'btctwd': later.iloc[-200:]}, 15, engine, advance=False)['btctwd']
+    assert_close(payload['technical']['macd'], analyzer.calculate_macd(later)['macd'].iloc[-1], "read-only macd")
+    assert analyzer.streaming_trackers['btctwd:15'].snapshot() == state
+    
+    # 非標準算法不經過批次引擎
+    analyzer.set_macd_variant('wilder')
+    calls = len(engine.calls)
+    results = analyzer.alert_indicators(frames, 15, engine)
+    assert len(engine.calls) == calls
+    assert {payload['source'] for payload in results.values()} == {'calculate_macd'}
+    assert_close(results['ethtwd']['technical']['macd'], analyzer.calculate_macd(frames['ethtwd'])['macd'].iloc[-1],
+                 "wilder macd")
+    print("✅ 警報數值只來自一個來源（批次計算，並推進串流狀態）")
+
+def test_batch_indicators_benchmark():
+    results = run_benchmark(symbol_counts=(5,))
+    assert results[0]['batch_ms'] > 0 and results[0]['loop_ms'] > 0
+    print("✅ 效能比較工具可執行")
+
+if __name__ == "__main__":
+    print("🧪 多市場批次指標測試")
+    print("=" * 40)
+    test_matches_macd_analyzer()
+    test_bollinger_atr_match_ta()
+    test_views_share_memory()
+    test_missing_close_matches_pandas()
+    test_ewm_columns_uses_graph_ewm()
+    test_alert_values_have_one_source()
+    test_batch_indicators_benchmark()
+    print("\n🎉 全部通過")
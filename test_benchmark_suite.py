@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試指標一致性與效能基準工具（離線，小型模擬資料）
+"""
+
+import json
+import os
+import tempfile
+
+from benchmark_suite import find_regressions, run_suite, synthetic_datasets, timing_targets, write_results
+
+def test_benchmark_suite():
+    results = run_suite(synthetic_datasets(sizes=(200,)), verbose=False)
+    failed = [p['check'] for p in results['parity'] if not p['passed']]
+    assert not failed, failed
+    assert len(results['timings']) == len(timing_targets())
+    assert results['compact'][0]['saved_bytes'] > 0
+    print("✅ 各實作結果一致")
+
+def test_find_regressions():
+    results = run_suite(synthetic_datasets(sizes=(200,)), verbose=False)
+    path = os.path.join(tempfile.mkdtemp(), 'results.json')
+    write_results(results, path)
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    assert find_regressions(results, baseline) == []
+    
+    # 基準耗時減半時，全部項目都應列為退化
+    for timing in baseline['timings']:
+        timing['ms'] /= 2
+    assert len(find_regressions(results, baseline)) == len(results['timings'])
+    print("✅ 與基準結果比對找出效能退化")
+
+if __name__ == "__main__":
+    print("🧪 基準測試工具測試")
+    print("=" * 40)
+    test_benchmark_suite()
+    test_find_regressions()
+    print("\n🎉 全部通過")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試K線持久化儲存（離線）
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from candle_store import CandleStore
+from kline_decoder import decode_klines
+from max_api import CandleCache, MaxAPI
+from max_recorder import ReplayResponse
+from rate_limit_scheduler import RateLimitScheduler
+from request_coalescer import RequestCoalescer
+
+NOW = 1_700_000_000 // 60 * 60 + 30  # 目前分鐘的第30秒
+
+class FakeKlineSession:
+    """模擬 /k：依 timestamp 與 limit 回傳連續的1分鐘K線（最多到形成中的K線）"""
+    
+    def __init__(self):
+        self.now = NOW
+        self.calls = []
+    
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(dict(params))
+        current = self.now // 60 * 60
+        limit = params['limit']
+        start = params.get('timestamp', current - (limit - 1) * 60)
+        end = min(current, start + (limit - 1) * 60)
+        data = [[t, 100.0 + t % 7, 103.0, 97.0, 101.0, 1.0] for t in range(start, end + 1, 60)]
+        return ReplayResponse(200, data)
+
+def make_api():
+    api = MaxAPI(use_kline_cache=False, coalescer=RequestCoalescer(ttl=0),
+                 scheduler=RateLimitScheduler(rate_limits={'global': (1e9, 1e9), 'kline': (1e9, 1e9)}))
+    api.session = FakeKlineSession()
+    return api
+
+def test_backfill_and_reopen():
+    print("💾 測試補齊與重新開啟...")
+    root = tempfile.mkdtemp()
+    store = CandleStore(root)
+    api = make_api()
+    
+    # 空儲存：補齊最近1天（1440根已收盤K線）
+    written = store.backfill(api, 'btcusdt', 1, days=1, now=NOW)
+    assert written == 1440, written
+    assert len(api.session.calls) == 1
+    
+    # 10分鐘後再補齊，只抓新的K線
+    api.session.now = NOW + 600
+    written = store.backfill(api, 'btcusdt', 1, days=1, now=NOW + 600)
+    assert written == 10, written
+    assert api.session.calls[-1]['timestamp'] == NOW // 60 * 60
+    
+    # 重新開啟後資料仍在，且時間連續
+    reopened = CandleStore(root)
+    ts = reopened.range('btcusdt', 1)['timestamp']
+    assert len(ts) == 1450
+    assert (np.diff(ts) == 60).all()
+    print("✅ 補齊與重新開啟")
+
+def test_append_and_range():
+    print("🔎 測試追加與範圍查詢...")
+    store = CandleStore(tempfile.mkdtemp())
+    base = NOW // 60 * 60 - 100 * 60
+    data = [[base + i * 60, 1.0, 2.0, 0.5, 1.5, 3.0] for i in range(101)]
+    
+    # 最後一根仍在形成中，不寫入；重複資料不會重複寫入
+    assert store.append('btcusdt', 1, decode_klines(data), now=NOW) == 100
+    assert store.append('btcusdt', 1, decode_klines(data[-5:]), now=NOW) == 0
+    
+    window = store.range('btcusdt', 1, start=base + 10 * 60, end=base + 20 * 60)
+    assert len(window) == 10 and window['timestamp'][0] == base + 10 * 60
+    
+    last = store.window('btcusdt', 1, 30)
+    assert len(last) == 30 and last.last_timestamp() == base + 99 * 60
+    # 視圖直接指向記憶體映射，不複製資料
+    assert isinstance(last.records.base, np.memmap) or isinstance(last.records, np.memmap)
+    assert not last.records.flags.writeable
+    print("✅ 追加與範圍查詢")
+
+def test_insert_fills_gap():
+    print("🩹 測試插入缺口K線...")
+    store = CandleStore(tempfile.mkdtemp())
+    base = NOW // 60 * 60 - 100 * 60
+    data = [[base + i * 60, 1.0, 2.0, 0.5, 1.5, 3.0] for i in range(100)]
+    store.append('btcusdt', 1, decode_klines(data[:40] + data[45:]), now=NOW)
+    before = store.range('btcusdt', 1)
+    assert len(before) == 95
+    
+    # 缺少的時間戳插入，已存在的時間戳以補抓的資料覆寫
+    patch = [[t, 9.0, 9.0, 9.0, 9.0, 9.0] for t, *_ in data[38:47]]
+    assert store.insert('btcusdt', 1, decode_klines(patch), now=NOW) == 9
+    ts = store.range('btcusdt', 1)['timestamp']
+    assert len(ts) == 100 and (np.diff(ts) == 60).all()
+    assert store.range('btcusdt', 1, start=base + 37 * 60, end=base + 48 * 60)['open'].tolist() == \
+        [1.0] + [9.0] * 9 + [1.0]
+    assert store.insert('btcusdt', 1, decode_klines(patch), now=NOW) == 0
+    # 插入前取得的視圖仍可讀取
+    assert len(before) == 95 and before['timestamp'][40] == base + 45 * 60
+    
+    # 只修正既有K線時就地寫入，不重寫檔案，已開啟的視圖直接看到新資料
+    path = store._path('btcusdt', 1)
+    inode = os.stat(path).st_ino
+    view = store.window('btcusdt', 1, 100)
+    fixed = [[base + 10 * 60, 5.0, 6.0, 4.0, 5.5, 7.0]]
+    assert store.insert('btcusdt', 1, decode_klines(fixed), now=NOW) == 1
+    assert os.stat(path).st_ino == inode
+    assert view['close'][10] == 5.5 and store.count('btcusdt', 1) == 100
+    
+    # 比現有資料新的K線等同追加（形成中的K線不寫入）
+    newer = [[base + i * 60, 1.0, 2.0, 0.5, 1.5, 3.0] for i in range(100, 102)]
+    assert store.insert('btcusdt', 1, decode_klines(newer), now=NOW + 60) == 1
+    assert CandleStore(store.root).count('btcusdt', 1) == 101
+    print("✅ 插入缺口K線")
+
+def test_seed_copies_view():
+    store = CandleStore(tempfile.mkdtemp())
+    base = NOW // 60 * 60 - 100 * 60
+    data = [[base + i * 60, 1.0, 2.0, 0.5, 1.5, 3.0] for i in range(100)]
+    store.append('btcusdt', 1, decode_klines(data[:40] + data[45:]), now=NOW)
+    cache = CandleCache()
+    cache.seed('btcusdt', 1, store.window('btcusdt', 1, cache.max_rows))
+    seeded = cache.get('btcusdt', 1)
+    assert not isinstance(seeded.records.base, np.memmap) and not isinstance(seeded.records, np.memmap)
+    
+    # 儲存檔案被取代後快取內容不受影響
+    store.insert('btcusdt', 1, decode_klines(data[40:45]), now=NOW)
+    assert store.count('btcusdt', 1) == 100
+    assert len(seeded) == 95 and seeded['timestamp'][40] == base + 45 * 60
+    print("✅ 預熱快取時複製儲存的資料")
+
+def test_persist_from_api():
+    print("📥 測試由API抓取時自動寫入...")
+    store = CandleStore(tempfile.mkdtemp())
+    api = make_api()
+    api.candle_store = store
+    klines = api.get_klines('btcusdt', period=1, limit=50)
+    assert len(klines) == 50
+    assert store.count('btcusdt', 1) == 50  # 模擬資料皆已收盤
+    print("✅ 自動寫入")
+
+if __name__ == "__main__":
+    print("🧪 K線儲存測試")
+    print("=" * 40)
+    test_backfill_and_reopen()
+    test_append_and_range()
+    test_insert_fills_gap()
+    test_seed_copies_view()
+    test_persist_from_api()
+    print("\n🎉 全部通過")
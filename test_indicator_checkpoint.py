@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試串流指標狀態檢查點：重啟後只需停機期間的K線即可接續（離線）
+"""
+
+import math
+import os
+import tempfile
+
+import pandas as pd
+
+from enhanced_macd_analyzer import EnhancedMACDAnalyzer
+from indicator_checkpoint import IndicatorCheckpoint
+from synthetic_data import random_ohlcv
+
+KEY = 'btctwd:60'
+
+def hourly_frame(n=400, seed=6):
+    df = random_ohlcv(n, seed=seed)
+    df['timestamp'] = pd.date_range('2024-01-01', periods=n, freq='h')
+    return df
+
+def assert_rows_equal(actual, expected):
+    for key, value in expected.items():
+        if math.isnan(value):
+            assert math.isnan(actual[key]), key
+        else:
+            assert abs(actual[key] - value) <= 1e-6 * max(1.0, abs(value)), (key, actual[key], value)
+
+def test_restart_needs_only_missed_candles():
+    df = hourly_frame()
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'state', 'indicator_state.json')
+        analyzer = EnhancedMACDAnalyzer(checkpoint=IndicatorCheckpoint(path))
+        for end in range(200, 301):
+            analyzer.get_streaming_macd(df.iloc[end - 200:end], KEY)
+        # 每根新K線寫入一次（第一次同步也算）
+        assert analyzer.checkpoint.stats['saves'] == 101
+        
+        # 不中斷的參考結果
+        reference = EnhancedMACDAnalyzer()
+        reference.get_streaming_macd(df.iloc[:300], KEY)
+        expected = reference.get_streaming_macd(df.iloc[:320], KEY)
+        
+        # 檢查點只保存已收盤的K線，停機前形成中的最後一根重啟後重算
+        restarted = EnhancedMACDAnalyzer(checkpoint=IndicatorCheckpoint(path))
+        assert restarted.streaming_trackers[KEY].last_timestamp == df['timestamp'].iloc[298]
+        
+        # 重啟：只傳入檢查點最後一根起的K線，資料不足以重新計算MACD
+        missed = df.iloc[298:320]
+        assert restarted.calculate_macd(missed) is None
+        result = restarted.get_streaming_macd(missed, KEY)
+        assert result['ready']
+        assert_rows_equal(result['latest'], expected['latest'])
+        assert_rows_equal(result['previous'], expected['previous'])
+    print("✅ 重啟後以停機期間的K線接續，結果與不中斷相同")
+
+def test_forming_candle_does_not_checkpoint():
+    df = hourly_frame(250)
+    with tempfile.TemporaryDirectory() as root:
+        checkpoint = IndicatorCheckpoint(os.path.join(root, 'indicator_state.json'))
+        analyzer = EnhancedMACDAnalyzer(checkpoint=checkpoint)
+        analyzer.get_streaming_macd(df, KEY)
+        forming = df.copy()
+        forming.loc[forming.index[-1], 'close'] += 500
+        analyzer.get_streaming_macd(forming, KEY)
+        assert checkpoint.stats['saves'] == 1
+    print("✅ 形成中K線變動不寫入檢查點")
+
+def test_long_downtime_rewarms():
+    df = hourly_frame()
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'indicator_state.json')
+        EnhancedMACDAnalyzer(checkpoint=IndicatorCheckpoint(path)).get_streaming_macd(df.iloc[:150], KEY)
+        
+        # 停機期間缺漏超過取得的K線範圍：捨棄舊狀態，以目前資料重新預熱
+        restarted = EnhancedMACDAnalyzer(checkpoint=IndicatorCheckpoint(path))
+        result = restarted.get_streaming_macd(df.iloc[200:400], KEY)
+        expected = EnhancedMACDAnalyzer().get_streaming_macd(df.iloc[200:400], KEY)
+        assert_rows_equal(result['latest'], expected['latest'])
+    print("✅ 停機過久時重新預熱")
+
+def test_corrupt_or_mismatched_state_ignored():
+    df = hourly_frame(200)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'indicator_state.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"version": 1, "trackers": ')
+        assert EnhancedMACDAnalyzer(checkpoint=IndicatorCheckpoint(path)).streaming_trackers == {}
+        
+        
+        # 損壞的檢查點會在下一根K線收盤時被覆寫
+        EnhancedMACDAnalyzer(checkpoint=IndicatorCheckpoint(path)).get_streaming_macd(df, KEY)
+        restarted = EnhancedMACDAnalyzer(checkpoint=IndicatorCheckpoint(path))
+        assert KEY in restarted.streaming_trackers
+        restarted.slow_period = 30
+        assert restarted._restore_trackers() == {}
+    print("✅ 損壞或參數不同的狀態會被忽略")
+
+if __name__ == "__main__":
+    print("🧪 指標狀態檢查點測試")
+    print("=" * 40)
+    test_restart_needs_only_missed_candles()
+    test_forming_candle_does_not_checkpoint()
+    test_long_downtime_rewarms()
+    test_corrupt_or_mismatched_state_ignored()
+    print("\n🎉 全部通過")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試融合式指標引擎與 ta 逐項計算的一致性（離線）
+"""
+
+import numpy as np
+
+from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from indicator_engine import (COMPACT_COLUMNS, INDICATOR_COLUMNS, LazyIndicatorFrame, compact_report,
+                              compute_indicators, indicator_arrays, indicator_keys, warmup_rows)
+from indicator_graph import indicators_for
+from synthetic_data import random_ohlcv
+
+def both_paths(df):
+    analyzer = AdvancedCryptoAnalyzer()
+    fused = analyzer.calculate_all_indicators(df)
+    analyzer.use_fused_engine = False
+    reference = analyzer.calculate_all_indicators(df)
+    return fused, reference
+
+def test_parity_with_ta():
+    fused, reference = both_paths(random_ohlcv())
+    assert list(fused.columns) == list(reference.columns)
+    assert (fused.index == reference.index).all()
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(fused[col].values, reference[col].values,
+                                   rtol=1e-9, atol=1e-6, err_msg=col)
+    print(f"✅ {len(INDICATOR_COLUMNS)} 個指標與 ta 一致（{len(fused)} 筆）")
+
+def test_custom_config():
+    df = random_ohlcv(400, seed=11)
+    analyzer = AdvancedCryptoAnalyzer()
+    analyzer.config.update({'macd_fast': 8, 'macd_slow': 21, 'macd_signal': 5,
+                            'stoch_k': 9, 'williams_period': 21, 'rsi_period': 9})
+    fused = analyzer.calculate_all_indicators(df)
+    analyzer.use_fused_engine = False
+    reference = analyzer.calculate_all_indicators(df)
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(fused[col].values, reference[col].values,
+                                   rtol=1e-9, atol=1e-6, err_msg=col)
+    print("✅ 自訂參數時與 ta 一致")
+
+def test_results_are_graph_arrays():
+    df = random_ohlcv(300)
+    context = indicators_for(df)
+    cols = indicator_arrays(context)
+    keys = indicator_keys()
+    # 結果即依賴圖的節點陣列（不複製、唯讀）
+    for name in INDICATOR_COLUMNS:
+        assert np.shares_memory(cols[name], context[keys[name]]), name
+        assert not cols[name].flags.writeable, name
+    
+    standalone = compute_indicators(df['high'], df['low'], df['close'], df['volume'])
+    for name in INDICATOR_COLUMNS:
+        np.testing.assert_array_equal(standalone[name], cols[name], err_msg=name)
+    print("✅ 指標結果為依賴圖的唯讀陣列")
+
+def test_compact_mode():
+    df = random_ohlcv(400, seed=5)
+    analyzer = AdvancedCryptoAnalyzer()
+    full = analyzer.calculate_all_indicators(df)
+    analyzer.compact_indicators = True
+    compact = analyzer.calculate_all_indicators(df)
+    assert list(compact.columns) == list(full.columns)
+    for col in INDICATOR_COLUMNS:
+        expected = np.float32 if col in COMPACT_COLUMNS else np.float64
+        assert compact[col].dtype == expected, col
+        np.testing.assert_allclose(compact[col].values, full[col].values, rtol=1e-6, atol=1e-4, err_msg=col)
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        assert compact[col].dtype == np.float64
+    
+    # 按需框架與完整計算的型別相同
+    frame = LazyIndicatorFrame(df, warmup=warmup_rows(), compact=True)
+    assert frame['rsi'].dtype == np.float32 and frame['macd'].dtype == np.float64
+    price = float(df['close'].iloc[-1])
+    compact_analysis = analyzer.comprehensive_analysis(df, price)
+    analyzer.compact_indicators = False
+    assert compact_analysis == analyzer.comprehensive_analysis(df, price)
+    
+    report = compact_report(df)
+    assert 0 < report['saved_bytes'] < report['bytes_full']
+    assert all(drift['max_rel_error'] < 1e-6 for drift in report['drift'].values())
+    print(f"✅ 精簡模式節省 {report['saved_ratio']:.0%} 記憶體，最大相對誤差 "
+          f"{max(d['max_rel_error'] for d in report['drift'].values()):.1e}")
+
+if __name__ == "__main__":
+    print("🧪 融合式指標引擎測試")
+    print("=" * 40)
+    test_parity_with_ta()
+    test_custom_config()
+    test_results_are_graph_arrays()
+    test_compact_mode()
+    print("\n🎉 全部通過")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試指標依賴圖：各分析器共用記憶化結果，且數值與 ta 一致（離線）
+"""
+
+import numpy as np
+import pandas as pd
+import ta
+
+from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from enhanced_macd_analyzer import EnhancedMACDAnalyzer
+from indicator_graph import IndicatorGraph, get_indicator_graph, indicators_for, parse_key
+from macd_analyzer import MACDAnalyzer
+from reversal_point_detector import ReversalPointDetector
+from synthetic_data import random_ohlcv
+
+def assert_series_equal(actual, expected, label):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                               rtol=1e-9, atol=1e-6, err_msg=label)
+
+def test_shared_evaluation():
+    df = random_ohlcv(300)
+    graph = get_indicator_graph()
+    graph.clear()
+    before = dict(graph.stats['by_kind'])
+    
+    MACDAnalyzer().calculate_macd(df)
+    EnhancedMACDAnalyzer().calculate_macd(df)
+    AdvancedCryptoAnalyzer().calculate_all_indicators(df)
+    
+    evaluated = indicators_for(df).evaluated
+    assert len(evaluated) == len(set(evaluated))
+    counts = {kind: graph.stats['by_kind'].get(kind, 0) - before.get(kind, 0) for kind in graph.stats['by_kind']}
+    # 三個分析器都用到 EMA12/EMA26、MACD12/26/9、RSI14，但各只計算一次
+    assert counts['ema'] == 2, counts
+    assert counts['macd'] == 1, counts
+    assert counts['rsi'] == 1, counts
+    print(f"✅ 三個分析器共用 {len(evaluated)} 個節點，無重複計算")
+
+def test_macd_analyzers_match_ta():
+    df = random_ohlcv(300, seed=5)
+    close = df['close']
+    macd = ta.trend.MACD(close=close, window_fast=12, window_slow=26)
+    expected = {
+        'macd': macd.macd(),
+        'macd_signal': macd.macd_signal(),
+        'macd_histogram': macd.macd_diff(),
+        'ema_12': ta.trend.EMAIndicator(close=close, window=12).ema_indicator(),
+        'ema_26': ta.trend.EMAIndicator(close=close, window=26).ema_indicator(),
+        'rsi': ta.momentum.RSIIndicator(close=close, window=14).rsi()
+    }
+    
+    result = MACDAnalyzer().calculate_macd(df)
+    for col, values in expected.items():
+        assert_series_equal(result[col], values, f"MACDAnalyzer {col}")
+    
+    result = EnhancedMACDAnalyzer().calculate_macd(df)
+    kept = pd.DataFrame(expected).dropna().index
+    assert (result.index == kept).all()
+    for col, values in expected.items():
+        assert_series_equal(result[col], values.loc[kept], f"EnhancedMACDAnalyzer {col}")
+    print("✅ MACDAnalyzer / EnhancedMACDAnalyzer 與 ta 一致")
+
+def test_support_resistance_unchanged():
+    df = random_ohlcv(200, seed=9)
+    detector = ReversalPointDetector()
+    period = detector.config['support_resistance_period']
+    highs = df['high'].rolling(window=period, center=True).max()
+    lows = df['low'].rolling(window=period, center=True).min()
+    current = df['close'].iloc[-1]
+    recent_highs, recent_lows = highs.dropna().tail(10), lows.dropna().tail(10)
+    resistance = recent_highs[recent_highs > current].unique()
+    support = recent_lows[recent_lows < current].unique()
+    
+    result = detector.calculate_support_resistance(df)
+    assert result['resistance'] == (resistance.min() if len(resistance) else None)
+    assert result['support'] == (support.max() if len(support) else None)
+    print("✅ 支撐阻力位與原本的置中滾動視窗一致")
+
+def test_versioning_and_readonly():
+    graph = IndicatorGraph(max_versions=2)
+    df = random_ohlcv(150)
+    ctx = graph.context(df)
+    assert graph.context(df.copy()) is ctx  # 內容相同即為同一版本
+    
+    changed = df.copy()
+    changed.loc[changed.index[-1], 'close'] += 1
+    assert graph.context(changed) is not ctx
+    
+    values = ctx['macd:12/26/9.signal']
+    assert ctx['macd:12/26/9.signal'] is values
+    assert not values.flags.writeable
+    assert ctx.evaluated == ['ema:12', 'ema:26', 'macd:12/26/9']
+    
+    # 小數參數（布林帶標準差1.5）
+    bands = ta.volatility.BollingerBands(df['close'], window=20, window_dev=1.5)
+    assert_series_equal(ctx['bb:20/1.5.upper'], bands.bollinger_hband(), 'bb 1.5 upper')
+    assert parse_key('bb:20/1.5') == ('bb', (20, 1.5), None)
+    print("✅ 版本判斷與記憶化正確")
+
+if __name__ == "__main__":
+    print("🧪 指標依賴圖測試")
+    print("=" * 40)
+    test_shared_evaluation()
+    test_macd_analyzers_match_ta()
+    test_support_resistance_unchanged()
+    test_versioning_and_readonly()
+    print("\n🎉 全部通過")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試K線快取的增量更新：請求參數、形成中K線覆蓋、limit截取與斷線後全量取代（離線）
+"""
+
+import time
+
+import numpy as np
+
+from kline_decoder import decode_klines
+from max_api import CandleCache, MaxAPI
+from rate_limit_scheduler import RateLimitScheduler
+from request_coalescer import RequestCoalescer
+
+NOW = int(time.time()) // 60 * 60 + 30  # 增量更新以系統時間計算缺少的根數
+CURRENT = NOW // 60 * 60
+
+class StubExchange:
+    """取代 MaxAPI._get_json：依請求參數回傳交易所目前的1分鐘K線"""
+    
+    def __init__(self, last=CURRENT):
+        self.closes = {t: 100.0 + (t // 60) % 17 for t in range(last - 2000 * 60, last + 60, 60)}
+        self.calls = []
+    
+    def __call__(self, endpoint, url, params=None, priority=None):
+        self.calls.append(dict(params))
+        times = sorted(self.closes)
+        if 'timestamp' in params:
+            times = [t for t in times if t >= params['timestamp']][:params['limit']]
+        else:
+            times = times[-params['limit']:]
+        return [[t, 100.0, 110.0, 90.0, self.closes[t], 1.0] for t in times]
+
+def make_api(exchange, cache=None):
+    api = MaxAPI(coalescer=RequestCoalescer(ttl=0),
+                 scheduler=RateLimitScheduler(rate_limits={'global': (1e9, 1e9), 'kline': (1e9, 1e9)}))
+    if cache is not None:
+        api.kline_cache = cache
+    api._get_json = exchange
+    return api
+
+def test_second_call_is_incremental():
+    exchange = StubExchange()
+    api = make_api(exchange)
+    first = api.get_klines('btcusdt', period=1, limit=100)
+    assert len(first) == 100 and 'timestamp' not in exchange.calls[0]
+    
+    # 第二次只從最後一根（形成中）K線開始抓，根數為經過的分鐘數加上緩衝
+    params = api.kline_cache.incremental_params('btcusdt', 1, 100)
+    assert params == {'timestamp': CURRENT, 'limit': int((time.time() - CURRENT) // 60) + 2}
+    api.get_klines('btcusdt', period=1, limit=100)
+    assert exchange.calls[-1]['timestamp'] == CURRENT
+    assert exchange.calls[-1]['limit'] < 100
+    print("✅ 第二次請求只抓最後一根快取K線之後的資料")
+
+def test_forming_bar_replaced():
+    exchange = StubExchange()
+    api = make_api(exchange)
+    api.get_kline_array('btcusdt', period=1, limit=100)
+    
+    # 形成中的K線收盤價改變，並出現下一根新K線
+    exchange.closes[CURRENT] = 555.0
+    exchange.closes[CURRENT + 60] = 556.0
+    klines = api.get_kline_array('btcusdt', period=1, limit=100)
+    ts = klines['timestamp']
+    assert len(klines) == 100 and len(np.unique(ts)) == 100
+    assert (np.diff(ts) == 60).all()
+    assert ts[-1] == CURRENT + 60
+    assert klines['close'][-2] == 555.0 and klines['close'][-1] == 556.0
+    assert len(api.kline_cache.get('btcusdt', 1)) == 101
+    print("✅ 形成中的K線被覆蓋而非重複")
+
+def test_limit_trimming():
+    exchange = StubExchange()
+    api = make_api(exchange, CandleCache(max_rows=150))
+    api.get_kline_array('btcusdt', period=1, limit=150)
+    
+    # 回傳最近 limit 根，快取本身不超過保留上限
+    klines = api.get_kline_array('btcusdt', period=1, limit=50)
+    assert len(klines) == 50 and klines['timestamp'][-1] == CURRENT
+    assert len(exchange.calls) == 2 and 'timestamp' in exchange.calls[-1]
+    exchange.closes[CURRENT + 60] = 1.0
+    api.get_kline_array('btcusdt', period=1, limit=150)
+    cached = api.kline_cache.get('btcusdt', 1)
+    assert len(cached) == 150 and cached['timestamp'][-1] == CURRENT + 60
+    
+    # 快取根數少於 limit 時不做增量更新
+    assert api.kline_cache.incremental_params('btcusdt', 1, 151) is None
+    print("✅ limit 截取與快取上限")
+
+def test_replace_on_discontinuity():
+    cache = CandleCache()
+    # 快取停在很久以前：缺少的根數超過 limit，改為全量重抓並取代
+    stale = CURRENT - 500 * 60
+    cache.replace('btcusdt', 1, decode_klines([[t, 1.0, 1.0, 1.0, 1.0, 1.0]
+                                               for t in range(stale - 99 * 60, stale + 60, 60)]))
+    assert cache.incremental_params('btcusdt', 1, 100) is None
+    
+    exchange = StubExchange()
+    api = make_api(exchange, cache)
+    klines = api.get_kline_array('btcusdt', period=1, limit=100)
+    assert 'timestamp' not in exchange.calls[-1]
+    cached = cache.get('btcusdt', 1)
+    assert len(cached) == 100 and cached['timestamp'][0] == CURRENT - 99 * 60
+    assert np.array_equal(klines.records, cached.records)
+    assert (cached['close'] != 1.0).all()  # 舊資料全部被取代
+    print("✅ 斷線過久時全量取代快取")
+
+if __name__ == "__main__":
+    print("🧪 K線快取增量更新測試")
+    print("=" * 40)
+    test_second_call_is_incremental()
+    test_forming_bar_replaced()
+    test_limit_trimming()
+    test_replace_on_discontinuity()
+    print("\n🎉 全部通過")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試K線快速解碼器與原本的pandas解析路徑（max_api.parse_klines）結果一致（離線）
+"""
+
+import numpy as np
+import pandas as pd
+
+from kline_decoder import KLINE_DTYPE, KLINE_FIELDS, decode_klines
+from max_api import parse_klines
+
+START = 1_700_000_000 // 60 * 60
+
+def assert_same_as_pandas(data):
+    expected = parse_klines(data)
+    klines = decode_klines(data)
+    actual = klines.to_dataframe()
+    # 解碼器的價量一律為float64（pandas路徑遇到整數輸入時為int64），比較數值與欄位
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_index_type=False)
+    assert list(actual.columns) == list(KLINE_FIELDS)
+    assert klines.records.dtype == KLINE_DTYPE
+    assert all(actual[field].dtype == np.float64 for field in KLINE_FIELDS[1:])
+    return klines
+
+def test_normal_input():
+    rng = np.random.default_rng(7)
+    closes = 30000 + rng.normal(0, 50, 300).cumsum()
+    data = [[START + i * 60, c - 5, c + 10, c - 10, c, float(rng.uniform(0, 3))] for i, c in enumerate(closes)]
+    klines = assert_same_as_pandas(data)
+    assert len(klines) == 300 and klines.last_timestamp() == START + 299 * 60
+    
+    # 未排序的輸入兩條路徑都依時間排序
+    shuffled = [data[i] for i in rng.permutation(len(data))]
+    assert np.array_equal(assert_same_as_pandas(shuffled).records, klines.records)
+    print("✅ 一般輸入與pandas路徑一致")
+
+def test_empty_input():
+    klines = assert_same_as_pandas([])
+    assert klines.empty and len(klines.to_dataframe()) == 0
+    assert decode_klines(None).empty
+    print("✅ 空輸入")
+
+def test_single_row():
+    klines = assert_same_as_pandas([[START, 1, 2, 0.5, 1.5, 10]])
+    assert len(klines) == 1 and klines['close'][0] == 1.5
+    print("✅ 單筆K線")
+
+def test_string_numbers():
+    data = [[START + i * 60, '30000.1', '30010.25', '29990', f'{30000 + i}.5', '0.00012345'] for i in range(5)]
+    klines = assert_same_as_pandas(data)
+    assert klines['close'][-1] == 30004.5 and klines['volume'][0] == 0.00012345
+    
+    # 時間戳也是字串
+    stringly = [[str(row[0])] + row[1:] for row in data]
+    assert np.array_equal(decode_klines(stringly).records, klines.records)
+    print("✅ 字串型態的數值")
+
+if __name__ == "__main__":
+    print("🧪 K線解碼器測試")
+    print("=" * 40)
+    test_normal_input()
+    test_empty_input()
+    test_single_row()
+    test_string_numbers()
+    print("\n🎉 全部通過")
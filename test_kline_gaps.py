@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試K線缺口偵測與修補（離線）
+"""
+
+import tempfile
+
+import numpy as np
+
+from candle_store import CandleStore
+from kline_decoder import decode_klines
+from kline_gaps import find_gaps
+from max_api import CandleCache, MaxAPI
+from max_recorder import ReplayResponse
+from rate_limit_scheduler import RateLimitScheduler
+from request_coalescer import RequestCoalescer
+
+NOW = 1_700_000_000 // 60 * 60 + 30
+CURRENT = NOW // 60 * 60
+
+class GappySession:
+    """全量請求時缺少部分K線；指定起點補抓時可取得（永久缺口除外）"""
+    
+    def __init__(self, dropped, missing_forever):
+        self.dropped = set(dropped)
+        self.missing_forever = set(missing_forever)
+        self.calls = []
+    
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(dict(params))
+        limit = params['limit']
+        if 'timestamp' in params:
+            start = params['timestamp']
+            times = [t for t in range(start, CURRENT + 60, 60) if t not in self.missing_forever][:limit]
+        else:
+            times = [t for t in range(CURRENT - (limit - 1) * 60, CURRENT + 60, 60)
+                     if t not in self.dropped and t not in self.missing_forever]
+        return ReplayResponse(200, [[t, 100.0, 101.0, 99.0, 100.5, 1.0] for t in times])
+
+def test_find_gaps():
+    ts = np.array([0, 60, 120, 300, 360, 600])
+    assert find_gaps(ts, 1) == [(180, 300, 2), (420, 600, 3)]
+    assert find_gaps(ts[:3], 1) == []
+    print("✅ 缺口偵測")
+
+def test_gap_repair():
+    dropped = [CURRENT - 50 * 60, CURRENT - 49 * 60, CURRENT - 10 * 60]
+    missing_forever = [CURRENT - 80 * 60]
+    session = GappySession(dropped, missing_forever)
+    api = MaxAPI(coalescer=RequestCoalescer(ttl=0),
+                 scheduler=RateLimitScheduler(rate_limits={'global': (1e9, 1e9), 'kline': (1e9, 1e9)}))
+    api.session = session
+    
+    klines = api.get_klines('btcusdt', period=1, limit=100)
+    stats = api.kline_cache.gap_stats
+    assert stats['gaps_detected'] == 3
+    assert stats['gaps_repaired'] == 2 and stats['candles_filled'] == 3
+    assert stats['unfillable'] == 1
+    
+    # 只補抓缺少的區間
+    targeted = [c for c in session.calls if 'timestamp' in c]
+    assert sorted((c['timestamp'], c['limit']) for c in targeted) == sorted([
+        (CURRENT - 80 * 60, 1), (CURRENT - 50 * 60, 2), (CURRENT - 10 * 60, 1)])
+    
+    ts = klines['timestamp'].values.astype('datetime64[s]').astype(np.int64)
+    assert [gap[0] for gap in find_gaps(ts, 1)] == missing_forever
+    
+    # 交易所也沒有的缺口不再重複補抓
+    calls = len(session.calls)
+    assert api.kline_cache.pending_gaps('btcusdt', 1) == []
+    assert len(session.calls) == calls
+    print("✅ 缺口修補與統計")
+
+def test_repaired_gap_is_persisted():
+    dropped = [CURRENT - 50 * 60, CURRENT - 49 * 60, CURRENT - 10 * 60]
+    session = GappySession(dropped, [])
+    api = MaxAPI(coalescer=RequestCoalescer(ttl=0), candle_store=CandleStore(tempfile.mkdtemp()),
+                 scheduler=RateLimitScheduler(rate_limits={'global': (1e9, 1e9), 'kline': (1e9, 1e9)}))
+    api.session = session
+    api.get_klines('btcusdt', period=1, limit=100)
+    
+    # 補上的K線也寫入持久化儲存（回測、參數掃描讀取的歷史沒有缺口）
+    ts = api.candle_store.range('btcusdt', 1)['timestamp']
+    assert len(ts) == 100 and find_gaps(ts, 1) == []
+    assert set(dropped) <= set(ts.tolist())
+    print("✅ 修補的缺口寫入儲存")
+
+def test_unfillable_is_bounded():
+    cache = CandleCache(max_rows=100)
+    times = [t for t in range(CURRENT - 99 * 60, CURRENT + 60, 60) if t != CURRENT - 80 * 60]
+    cache.replace('btcusdt', 1, decode_klines([[t, 1.0, 1.0, 1.0, 1.0, 1.0] for t in times]))
+    (start, end, missing), = cache.pending_gaps('btcusdt', 1)
+    assert cache.fill_gap('btcusdt', 1, start, end, None) == 0
+    assert cache._unfillable == {('btcusdt', 1, CURRENT - 80 * 60)}
+    
+    # 缺口滑出快取範圍後移除紀錄
+    newer = [[t, 1.0, 1.0, 1.0, 1.0, 1.0] for t in range(CURRENT + 60, CURRENT + 30 * 60, 60)]
+    cache.merge('btcusdt', 1, decode_klines(newer))
+    assert cache.get('btcusdt', 1)['timestamp'][0] > CURRENT - 80 * 60
+    assert cache._unfillable == set()
+    print("✅ 無法補齊的缺口紀錄不會無限增長")
+
+if __name__ == "__main__":
+    print("🧪 K線缺口測試")
+    print("=" * 40)
+    test_find_gaps()
+    test_gap_repair()
+    test_repaired_gap_is_persisted()
+    test_unfillable_is_bounded()
+    print("\n🎉 全部通過")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試由1分鐘快取合成多週期K線（離線）
+"""
+
+import tempfile
+import time
+
+import numpy as np
+
+from candle_store import CandleStore
+from kline_decoder import decode_klines
+from kline_resampler import required_base_rows, resample_records
+from max_api import CandleCache, MaxAPI
+from max_recorder import ReplayResponse
+from rate_limit_scheduler import RateLimitScheduler
+from request_coalescer import RequestCoalescer
+
+NOW = int(time.time()) // 60 * 60 + 30  # 增量更新以系統時間計算缺少的根數
+CURRENT = NOW // 60 * 60
+HISTORY = 40000  # 交易所可提供的1分鐘K線根數
+
+def candle(t):
+    return [t, 100.0 + t % 13, 110.0 + t % 7, 90.0 - t % 5, 100.0 + t % 11, 1.0 + t % 3]
+
+class MinuteSession:
+    """模擬 /k 的K線（MAX單次最多回傳10000根），記錄每次請求的參數"""
+    
+    def __init__(self):
+        self.calls = []
+        self.first = CURRENT - (HISTORY - 1) * 60
+    
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(dict(params))
+        step = params['period'] * 60
+        current = NOW // step * step
+        limit = min(params['limit'], 10000)
+        start = max(self.first, params.get('timestamp', current - (limit - 1) * step))
+        end = min(current, start + (limit - 1) * step)
+        return ReplayResponse(200, [candle(t) for t in range(start, end + 1, step)])
+
+def make_api(candle_store=None):
+    api = MaxAPI(coalescer=RequestCoalescer(ttl=0), candle_store=candle_store, resample_max_age=1e9,
+                 scheduler=RateLimitScheduler(rate_limits={'global': (1e9, 1e9), 'kline': (1e9, 1e9)}))
+    api.session = MinuteSession()
+    return api
+
+def expected(period, limit):
+    base = decode_klines([candle(t) for t in range(CURRENT - (HISTORY - 1) * 60, CURRENT + 60, 60)])
+    return resample_records(base.records, period)[-limit:]
+
+def test_resample_records():
+    data = decode_klines([candle(t) for t in range(CURRENT - 62 * 60, CURRENT + 60, 60)])
+    bars = resample_records(data.records, 15)
+    # 第一個不完整的區間捨棄，最後一根為形成中的K線
+    assert (bars['timestamp'] % 900 == 0).all()
+    assert bars['timestamp'][0] >= data['timestamp'][0]
+    first = data.records[data['timestamp'] >= bars['timestamp'][0]][:15]
+    assert bars['open'][0] == first['open'][0] and bars['close'][0] == first['close'][-1]
+    assert bars['high'][0] == first['high'].max() and bars['low'][0] == first['low'].min()
+    assert bars['volume'][0] == first['volume'].sum()
+    assert required_base_rows(60, 200) == 12060 > CandleCache().max_rows
+    assert not CandleCache().can_resample('btcusdt', 1440, 200)  # 超過 max_base_rows 直接呼叫 /k
+    print("✅ 區間對齊與OHLCV合成")
+
+def test_long_periods_from_api():
+    api = make_api()
+    api.get_kline_array('btcusdt', period=1, limit=10000)
+    
+    # 60分鐘所需的1分鐘K線超過預設的10000根，但只差一次 /k 請求：往前補足後由快取合成
+    calls = len(api.session.calls)
+    klines = api.get_kline_array('btcusdt', period=60, limit=200)
+    assert np.array_equal(klines.records, expected(60, 200))
+    assert [call['period'] for call in api.session.calls[calls:]] == [1]
+    assert len(api.kline_cache.get('btcusdt', 1)) == required_base_rows(60, 200)
+    
+    # 240分鐘需要再補抓數萬根1分鐘K線（多次請求），改為直接抓取該週期
+    calls = len(api.session.calls)
+    klines = api.get_kline_array('btcusdt', period=240, limit=150)
+    assert len(klines) == 150
+    assert [call['period'] for call in api.session.calls[calls:]] == [240]
+    assert len(api.kline_cache.get('btcusdt', 1)) == required_base_rows(60, 200)
+    
+    # 快取已涵蓋所需區間的週期直接合成，不發出任何請求
+    calls = len(api.session.calls)
+    klines = api.get_kline_array('btcusdt', period=30, limit=400)
+    assert np.array_equal(klines.records, expected(30, 400))
+    assert len(api.session.calls) == calls
+    
+    # 之後只增量更新1分鐘K線，不再對長週期發出請求
+    api.kline_cache._updated.clear()
+    assert len(api.get_kline_array('btcusdt', period=60, limit=200)) == 200
+    assert len(api.session.calls) == calls + 1 and 'timestamp' in api.session.calls[-1]
+    assert api.session.calls[-1]['period'] == 1
+    assert len(api.kline_cache.get('btcusdt', 1)) == required_base_rows(60, 200)
+    print("✅ 快取涵蓋或只差一次請求時才由1分鐘快取合成")
+
+def test_extend_from_store():
+    store = CandleStore(tempfile.mkdtemp())
+    older = range(CURRENT - 40000 * 60, CURRENT - 9000 * 60, 60)
+    store.append('btcusdt', 1, decode_klines([candle(t) for t in older]))
+    api = make_api(store)
+    api.get_kline_array('btcusdt', period=1, limit=10000)
+    calls = len(api.session.calls)
+    
+    # 較舊的1分鐘K線優先由持久化儲存讀取：即使需要數萬根也不呼叫 /k
+    klines = api.get_kline_array('btcusdt', period=240, limit=150)
+    assert np.array_equal(klines.records, expected(240, 150))
+    assert len(api.session.calls) == calls
+    assert len(api.kline_cache.get('btcusdt', 1)) == required_base_rows(240, 150)
+    print("✅ 往前補足時優先讀取持久化儲存")
+
+if __name__ == "__main__":
+    print("🧪 多週期K線合成測試")
+    print("=" * 40)
+    test_resample_records()
+    test_long_periods_from_api()
+    test_extend_from_store()
+    print("\n🎉 全部通過")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試按需計算的指標框架：只計算讀到的欄位，結果與完整計算一致（離線）
+"""
+
+import numpy as np
+
+from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from indicator_engine import INDICATOR_COLUMNS, IndicatorUsage, LazyIndicatorFrame, warmup_rows
+from indicator_graph import get_indicator_graph, indicators_for
+from reversal_point_detector import ReversalPointDetector
+from synthetic_data import random_ohlcv
+
+def test_materialize_matches_eager():
+    df = random_ohlcv(400, seed=21)
+    analyzer = AdvancedCryptoAnalyzer()
+    eager = analyzer.calculate_all_indicators(df)
+    frame = analyzer.indicator_frame(df)
+    assert len(frame) == len(eager) and (frame.index == eager.index).all()
+    materialized = frame.materialize()
+    assert list(materialized.columns) == list(eager.columns)
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_array_equal(materialized[col].values, eager[col].values, err_msg=col)
+    print(f"✅ 暖機根數 {warmup_rows()} 與 dropna 結果一致")
+
+def test_comprehensive_analysis_reads_subset():
+    df = random_ohlcv(300, seed=4)
+    graph = get_indicator_graph()
+    graph.clear()
+    
+    analyzer = AdvancedCryptoAnalyzer()
+    lazy_result = analyzer.comprehensive_analysis(df, float(df['close'].iloc[-1]))
+    evaluated = set(indicators_for(df).evaluated)
+    for skipped in ('adx:14', 'mfi:14', 'cci:20', 'obv', 'vpt', 'stoch:14/3', 'williams:14', 'atr:14'):
+        assert skipped not in evaluated, skipped
+    
+    # 與完整計算的結果相同
+    analyzer.indicator_frame = lambda df, *args: analyzer.calculate_all_indicators(df)
+    eager_result = analyzer.comprehensive_analysis(df, float(df['close'].iloc[-1]))
+    assert lazy_result == eager_result
+    print(f"✅ 綜合分析只計算 {len(evaluated)} 個節點，結果與完整計算相同")
+
+def test_used_columns_recorded():
+    df = random_ohlcv(200, seed=8)
+    usage = IndicatorUsage()
+    frame = LazyIndicatorFrame(df, warmup=warmup_rows(), usage=usage)
+    assert 'rsi' in frame.columns and frame.used == []
+    
+    detector = ReversalPointDetector()
+    sr = detector.calculate_support_resistance(frame)
+    detector.detect_low_point_bounce(frame, sr)
+    detector.detect_high_point_pullback(frame, sr)
+    
+    indicator_columns = [name for name in frame.used if name in INDICATOR_COLUMNS]
+    assert set(indicator_columns) <= {'rsi', 'macd'}
+    report = usage.report()
+    assert report['frames'] == (1 if indicator_columns else 0)
+    assert 'adx' in report['unused'] and 'mfi' in report['unused']
+    print(f"✅ 轉折點檢測實際使用的指標: {indicator_columns or '無'}")
+
+if __name__ == "__main__":
+    print("🧪 按需指標框架測試")
+    print("=" * 40)
+    test_materialize_matches_eager()
+    test_comprehensive_analysis_reads_subset()
+    test_used_columns_recorded()
+    print("\n🎉 全部通過")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試逐筆更新形成中K線：K線與指標與重新抓取整段K線後計算的結果一致（離線）
+"""
+
+import numpy as np
+import pandas as pd
+
+from enhanced_macd_analyzer import EnhancedMACDAnalyzer
+from live_candle import LiveCandle
+from synthetic_data import random_ohlcv
+
+PERIOD = 60
+
+def hourly_klines(n=200, seed=12):
+    df = random_ohlcv(n, seed=seed)
+    df['timestamp'] = pd.date_range('2024-01-01', periods=n, freq='h')
+    return df
+
+def epoch(ts):
+    return pd.Timestamp(ts).timestamp()
+
+def assert_matches_batch(snapshot, df):
+    expected = EnhancedMACDAnalyzer().calculate_macd(df).iloc[-1]
+    for key in ('macd', 'macd_signal', 'macd_histogram', 'rsi', 'ema_12', 'ema_26'):
+        np.testing.assert_allclose(snapshot[key], expected[key], rtol=1e-9, atol=1e-6, err_msg=key)
+
+def test_trades_update_open_bar():
+    df = hourly_klines()
+    candle = LiveCandle('btcusdt', PERIOD)
+    candle.load(df)
+    
+    start = epoch(df['timestamp'].iloc[-1])
+    rng = np.random.default_rng(1)
+    prices = df['close'].iloc[-1] + rng.normal(0, 8000, 50)
+    for i, price in enumerate(prices):
+        snapshot = candle.on_tick(float(price), start + 60 + i, volume=0.1)
+    
+    # 與「重新抓取 /k」後的結果相同：最後一列以逐筆資料更新
+    refetched = df.copy()
+    last = refetched.index[-1]
+    refetched.loc[last, 'high'] = max(df['high'].iloc[-1], prices.max())
+    refetched.loc[last, 'low'] = min(df['low'].iloc[-1], prices.min())
+    refetched.loc[last, 'close'] = prices[-1]
+    refetched.loc[last, 'volume'] = df['volume'].iloc[-1] + 5.0
+    for field in ('high', 'low', 'close', 'volume'):
+        assert abs(snapshot[field] - refetched.loc[last, field]) < 1e-6, field
+    assert_matches_batch(snapshot, refetched)
+    
+    applied = candle.apply_to(df)
+    assert applied is df and applied.loc[last, 'close'] == prices[-1]
+    print("✅ 逐筆成交更新形成中K線，指標與重新計算一致")
+
+def test_tick_opens_next_bar():
+    df = hourly_klines()
+    candle = LiveCandle('btcusdt', PERIOD)
+    candle.load(df)
+    
+    next_start = epoch(df['timestamp'].iloc[-1]) + PERIOD * 60
+    candle.on_tick(3_010_000.0, next_start + 5, volume=0.5)
+    snapshot = candle.on_tick(3_020_000.0, next_start + 30, volume=0.25)
+    assert snapshot['open'] == 3_010_000.0 and snapshot['volume'] == 0.75
+    
+    extended = candle.apply_to(df)
+    assert len(extended) == len(df) + 1
+    assert_matches_batch(snapshot, extended)
+    
+    # 屬於上一根（已收盤）的延遲成交不影響形成中K線
+    assert candle.on_tick(1.0, next_start - 10) is None
+    assert candle.stats['late_ticks'] == 1 and candle.bar['low'] == 3_010_000.0
+    print("✅ 跨入下一根時開新K線，延遲成交被忽略")
+
+def test_kline_reconciles_tick_closed_bar():
+    df = hourly_klines()
+    candle = LiveCandle('btcusdt', PERIOD)
+    candle.load(df.iloc[:-1])
+    
+    # 最後一根由逐筆資料形成並收盤，收盤價與交易所的K線不同
+    start = epoch(df['timestamp'].iloc[-1])
+    candle.on_tick(float(df['open'].iloc[-1]), start + 1)
+    candle.on_tick(float(df['close'].iloc[-1]) + 25_000.0, start + PERIOD * 60 - 1)
+    candle.on_tick(3_010_000.0, start + PERIOD * 60 + 5, volume=0.5)
+    
+    # /k 回傳已收盤的K線與新的形成中K線：以交易所的收盤價重算已收盤K線之後的指標
+    refetched = pd.concat([df, pd.DataFrame([{'timestamp': df['timestamp'].iloc[-1] + pd.Timedelta(hours=1),
+                                              'open': 3_010_000.0, 'high': 3_010_000.0, 'low': 3_010_000.0,
+                                              'close': 3_010_000.0, 'volume': 0.5}])], ignore_index=True)
+    snapshot = candle.load(refetched)
+    assert_matches_batch(snapshot, refetched)
+    np.testing.assert_allclose(candle.tracker.previous['macd'],
+                               EnhancedMACDAnalyzer().calculate_macd(df)['macd'].iloc[-1], rtol=1e-9)
+    
+    # 之後的逐筆更新接續重算後的狀態
+    snapshot = candle.on_tick(3_020_000.0, start + PERIOD * 60 + 30)
+    refetched.loc[refetched.index[-1], ['high', 'close']] = 3_020_000.0
+    assert_matches_batch(snapshot, refetched)
+    print("✅ /k 已收盤K線與逐筆收盤價不同時重算指標")
+
+def test_feed_events():
+    df = hourly_klines()
+    candle = LiveCandle('btcusdt', PERIOD)
+    candle.load(df)
+    start = df['timestamp'].iloc[-1]
+    
+    assert candle.on_event({'channel': 'trade', 'market': 'ethusdt',
+                            'data': {'price': 1.0, 'volume': 1.0, 'timestamp': epoch(start)}}) is None
+    candle.on_event({'channel': 'ticker', 'market': 'btcusdt',
+                     'data': {'price': 3_050_000.0, 'volume': 1234.0, 'timestamp': epoch(start) + 1}})
+    assert candle.bar['close'] == 3_050_000.0 and candle.bar['volume'] == df['volume'].iloc[-1]
+    
+    # kline 頻道的數值為準
+    kline = {'timestamp': start.to_pydatetime(), 'resolution': '1h', 'open': 1.0, 'high': 3_100_000.0,
+             'low': 0.5, 'close': 3_000_500.0, 'volume': 9.0, 'closed': False}
+    snapshot = candle.on_event({'channel': 'kline', 'market': 'btcusdt', 'data': kline})
+    assert snapshot['close'] == 3_000_500.0 and snapshot['volume'] == 9.0
+    refetched = df.copy()
+    refetched.loc[refetched.index[-1], 'close'] = 3_000_500.0
+    assert_matches_batch(snapshot, refetched)
+    print("✅ WebSocket事件依市場與頻道更新")
+
+if __name__ == "__main__":
+    print("🧪 形成中K線即時更新測試")
+    print("=" * 40)
+    test_trades_update_open_bar()
+    test_tick_opens_next_bar()
+    test_kline_reconciles_tick_closed_bar()
+    test_feed_events()
+    print("\n🎉 全部通過")
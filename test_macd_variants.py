@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試MACD算法變體：一次計算的結果與逐一計算一致，評分能找出參考值的算法（離線）
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import ta
+
+from enhanced_macd_analyzer import EnhancedMACDAnalyzer
+from indicator_graph import _ema
+from macd_variants import MACD_VARIANTS, evaluate_variants, score_variants
+from synthetic_data import random_ohlcv
+
+def assert_close(actual, expected, label):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                               rtol=1e-9, atol=1e-6, err_msg=label)
+
+def sma_seeded_ema(values, window):
+    """逐根計算以SMA為起點的EMA（參考實作）"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    first = np.flatnonzero(~np.isnan(values))[0]
+    seed = first + window - 1
+    out[seed] = values[first:seed + 1].mean()
+    alpha = 2.0 / (window + 1)
+    for i in range(seed + 1, len(values)):
+        out[i] = out[i - 1] + alpha * (values[i] - out[i - 1])
+    return out
+
+def reference_variants(close):
+    """以 pandas / ta 逐一計算各變體"""
+    def ema(series, window, **kwargs):
+        return series.ewm(span=window, min_periods=window, **kwargs).mean()
+    
+    def wilder(series, window):
+        return series.ewm(alpha=1.0 / window, min_periods=window, adjust=False).mean()
+    
+    macd = ta.trend.MACD(close=close)
+    fast, slow = ema(close, 12, adjust=False), ema(close, 26, adjust=False)
+    adjusted = ema(close, 12, adjust=True) - ema(close, 26, adjust=True)
+    seeded = pd.Series(sma_seeded_ema(close, 12) - sma_seeded_ema(close, 26))
+    percentage = (fast - slow) / slow * 100
+    wilder_macd = wilder(close, 12) - wilder(close, 26)
+    return {
+        'standard': (macd.macd(), macd.macd_signal()),
+        'adjusted': (adjusted, ema(adjusted, 9, adjust=True)),
+        'sma_seed': (seeded, pd.Series(sma_seeded_ema(seeded, 9))),
+        'sma_signal': (fast - slow, (fast - slow).rolling(9).mean()),
+        'percentage': (percentage, ema(percentage, 9, adjust=False)),
+        'wilder': (wilder_macd, wilder(wilder_macd, 9))
+    }
+
+def test_all_variants_match_reference():
+    close = random_ohlcv(400, seed=14)['close']
+    results = evaluate_variants(close)
+    assert set(results) == set(MACD_VARIANTS)
+    for name, (macd, signal) in reference_variants(close).items():
+        assert_close(results[name]['macd'], macd, f"{name} macd")
+        assert_close(results[name]['macd_signal'], signal, f"{name} signal")
+        assert_close(results[name]['macd_histogram'], macd - signal, f"{name} histogram")
+    print(f"✅ {len(results)} 種變體一次計算，與逐一計算一致")
+
+def test_scoring_finds_variant():
+    close = random_ohlcv(300, seed=15)['close']
+    results = evaluate_variants(close)
+    for name in ('sma_signal', 'wilder'):
+        target = results[name]
+        reference = {key: target[key][-3:] for key in ('macd', 'macd_signal', 'macd_histogram')}
+        ranking = score_variants(results, reference)
+        assert ranking[0]['name'] == name and ranking[0]['error'] < 1e-12, ranking[:2]
+    print("✅ 評分排序找出與參考值相同的算法")
+
+def test_analyzer_selects_variant():
+    df = random_ohlcv(300, seed=16)
+    analyzer = EnhancedMACDAnalyzer(macd_variant='sma_signal')
+    result = analyzer.calculate_macd(df)
+    expected = evaluate_variants(df['close'], ['sma_signal'])['sma_signal']
+    kept = result.index
+    assert_close(result['macd_signal'], expected['macd_signal'][kept], "sma_signal")
+    assert list(result.columns[-6:]) == ['ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_histogram', 'rsi']
+    assert analyzer.get_streaming_macd(df) is None
+    
+    assert not analyzer.set_macd_variant('不存在')
+    assert analyzer.macd_variant == 'sma_signal'
+    assert analyzer.set_macd_variant('standard')
+    standard = analyzer.calculate_macd(df)
+    assert_close(standard['macd_signal'], ta.trend.MACD(close=df['close']).macd_signal()[standard.index],
+                 "standard")
+    print("✅ EnhancedMACDAnalyzer 可依名稱選擇算法")
+
+def test_long_history_uses_compiled_ema():
+    close = 3_000_000 + np.cumsum(np.random.default_rng(17).normal(0, 3000, 1_000_000))
+    started = time.perf_counter()
+    results = evaluate_variants(close)
+    elapsed = time.perf_counter() - started
+    
+    # 標準變體與依賴圖的EMA/MACD逐位元相同（同一個編譯過的遞迴）
+    standard = results['standard']
+    assert np.array_equal(standard['ema_fast'], _ema(close, 12), equal_nan=True)
+    assert np.array_equal(standard['ema_slow'], _ema(close, 26), equal_nan=True)
+    assert elapsed < 10
+    print(f"✅ 100萬根K線 {len(results)} 個變體 {elapsed:.2f} 秒")
+
+if __name__ == "__main__":
+    print("🧪 MACD算法變體測試")
+    print("=" * 40)
+    test_all_variants_match_reference()
+    test_scoring_finds_variant()
+    test_analyzer_selects_variant()
+    test_long_history_uses_compiled_ema()
+    print("\n🎉 全部通過")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試MAX API錄製與回放（離線）
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from max_api import MaxAPI, AsyncMaxAPI
+from max_recorder import MaxRecorder, MaxReplay, ReplayResponse, load_recording, summarize
+from rate_limit_scheduler import RateLimitScheduler
+from request_coalescer import RequestCoalescer
+
+T0 = 1_700_000_040  # 對齊分鐘
+
+def ticker(price):
+    return {'last': str(price), 'vol': '12.5', 'high': '110', 'low': '90'}
+
+def candles(start, count, price=100.0):
+    return [[start + i * 60, price, price + 2, price - 2, price + 1, 1.5] for i in range(count)]
+
+class FakeSession:
+    """依序回傳預先準備的回應"""
+    
+    def __init__(self):
+        self.price = 100
+    
+    def get(self, url, params=None, timeout=None):
+        if url.endswith('/k'):
+            return ReplayResponse(200, candles(T0, params['limit']))
+        self.price += 1
+        return ReplayResponse(200, ticker(self.price))
+
+def synthetic_day():
+    """模擬的錄製內容：每10秒一筆價格，每60秒一筆K線增量"""
+    records = [{'t': T0 + 5, 'endpoint': 'kline', 'path': '/k',
+                'params': {'market': 'btcusdt', 'period': 1, 'limit': 150}, 'data': candles(T0 - 149 * 60, 150)}]
+    for i in range(6):
+        records.append({'t': T0 + 10 * i + 1, 'endpoint': 'ticker', 'path': '/tickers/btcusdt',
+                        'params': {}, 'data': ticker(100 + i)})
+    records.append({'t': T0 + 65, 'endpoint': 'kline', 'path': '/k',
+                    'params': {'market': 'btcusdt', 'period': 1, 'limit': 3, 'timestamp': T0},
+                    'data': candles(T0, 2, price=200.0)})
+    return records
+
+def test_record_roundtrip():
+    print("🎙️ 測試錄製...")
+    path = os.path.join(tempfile.mkdtemp(), 'day.jsonl.gz')
+    recorder = MaxRecorder(path)
+    api = MaxAPI(recorder=recorder, coalescer=RequestCoalescer(ttl=0), scheduler=RateLimitScheduler())
+    api.session = FakeSession()
+    
+    for _ in range(3):
+        api.get_ticker('btcusdt')
+    api.get_klines('btcusdt', period=1, limit=50)
+    recorder.close()
+    
+    records = load_recording(path)
+    assert [r['endpoint'] for r in records] == ['ticker', 'ticker', 'ticker', 'kline']
+    assert records[0]['path'] == '/tickers/btcusdt'
+    assert records[-1]['params']['limit'] == 50
+    assert summarize(path)['endpoints'] == {'ticker': 3, 'kline': 1}
+    
+    # 追加錄製
+    recorder = MaxRecorder(path)
+    api.recorder = recorder
+    api.get_ticker('btcusdt')
+    recorder.close()
+    assert len(load_recording(path)) == 5
+    print("✅ 錄製與追加寫入")
+
+def test_replay_step_mode():
+    print("▶️ 測試逐筆回放...")
+    replay = MaxReplay(records=synthetic_day(), speed=0)
+    api = MaxAPI(replay=replay)
+    
+    prices = [api.get_ticker('btcusdt')['price'] for _ in range(6)]
+    assert prices == [100.0, 101.0, 102.0, 103.0, 104.0, 105.0], prices
+    
+    # 第二次K線請求推進到增量資料，最後兩根被更新
+    first = api.get_klines('btcusdt', period=1, limit=100)
+    second = api.get_klines('btcusdt', period=1, limit=100)
+    assert first['close'].iloc[-1] == 101.0
+    assert second['close'].iloc[-1] == 201.0 and len(second) == 100
+    assert replay.exhausted
+    print("✅ 逐筆回放順序正確")
+
+def test_replay_speed_and_async():
+    print("⏩ 測試倍速與非同步回放...")
+    replay = MaxReplay(records=synthetic_day(), speed=1000)
+    
+    async def run():
+        api = AsyncMaxAPI(replay=replay)
+        first = await api.get_ticker('btcusdt')
+        await asyncio.sleep(0.08)  # 虛擬時間前進約80秒
+        ticker_data, klines = await api.get_ticker_and_klines('btcusdt', period=1, limit=100)
+        await api.close()
+        return first, ticker_data, klines
+    
+    first, later, klines = asyncio.run(run())
+    assert first['price'] == 100.0
+    assert later['price'] == 105.0
+    assert klines['close'].iloc[-1] == 201.0
+    print("✅ 倍速與非同步回放")
+
+def main():
+    print("🧪 MAX API錄製回放測試")
+    print("=" * 40)
+    start = time.time()
+    test_record_roundtrip()
+    test_replay_step_mode()
+    test_replay_speed_and_async()
+    print(f"\n🎉 全部通過 ({time.time() - start:.2f}秒)")
+
+if __name__ == "__main__":
+    main()
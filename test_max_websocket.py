@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MAX WebSocket訂閱器離線測試
+使用本地替身服務器驗證訂閱、事件分派、斷線重連與REST備援
+"""
+
+import asyncio
+import os
+import time
+
+import pandas as pd
+from kline_decoder import decode_klines
+from max_websocket import MaxWebSocketFeed, MaxWebSocketStandIn, parse_ws_message
+
+class FakeRestAPI:
+    """REST備援用的假客戶端"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def get_ticker(self, market='btcusdt'):
+        self.calls += 1
+        return {'symbol': market.upper(), 'price': 100.0, 'volume': 1.0,
+                'high': 101.0, 'low': 99.0, 'timestamp': pd.Timestamp.now().to_pydatetime()}
+    
+    async def get_klines(self, market='btcusdt', period=1, limit=200):
+        return None
+
+async def wait_for(condition, timeout=5.0):
+    """等待條件成立"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise TimeoutError("等待條件逾時")
+        await asyncio.sleep(0.02)
+
+async def run_feed_scenario():
+    server = MaxWebSocketStandIn()
+    await server.start()
+    
+    rest_api = FakeRestAPI()
+    feed = MaxWebSocketFeed(['btctwd'], ws_url=server.url, rest_api=rest_api,
+                            fallback_interval=0.05, max_backoff=0.2)
+    received = []
+    feed.add_callback(received.append)
+    
+    iterator_events = []
+    
+    async def consume():
+        async for event in feed.events():
+            iterator_events.append(event)
+    
+    consumer = asyncio.create_task(consume())
+    await feed.start()
+    
+    try:
+        # 1. 訂閱
+        await wait_for(lambda: server.client_count == 1 and len(server.subscriptions) == 1)
+        channels = {s['channel'] for s in server.subscriptions[0]['subscriptions']}
+        assert channels == {'ticker', 'trade', 'kline'}
+        print("✅ 訂閱請求正確")
+        
+        # 2. 推送行情
+        await server.broadcast({'c': 'ticker', 'M': 'btctwd', 'e': 'update',
+                                'tk': {'M': 'btctwd', 'O': '1', 'H': '3200000', 'L': '3100000',
+                                       'C': '3150000', 'v': '12.5'}, 'T': 1700000000000})
+        await server.broadcast({'c': 'kline', 'M': 'btctwd', 'e': 'update',
+                                'k': {'ST': 1700000000000, 'ET': 1700000059999, 'M': 'btctwd', 'R': '1m',
+                                      'O': '1', 'H': '2', 'L': '0.5', 'C': '1.5', 'v': '3', 'ti': 1, 'x': False},
+                                'T': 1700000000000})
+        await wait_for(lambda: len(received) >= 2 and len(iterator_events) >= 2)
+        assert feed.latest_ticker('btctwd')['price'] == 3150000.0
+        assert received[1]['data']['close'] == 1.5 and received[1]['source'] == 'ws'
+        print("✅ 回呼與迭代器皆收到事件")
+        
+        # 3. 斷線 -> REST備援 -> 自動重連並重新訂閱
+        await server.drop_connections()
+        await wait_for(lambda: rest_api.calls > 0)
+        assert any(e['source'] == 'rest' for e in received)
+        print("✅ 斷線時改用REST備援")
+        
+        await wait_for(lambda: feed.connected and len(server.subscriptions) == 2)
+        assert feed.stats['reconnects'] >= 1
+        print("✅ 自動重連並重新訂閱")
+    finally:
+        consumer.cancel()
+        await feed.stop()
+        await server.stop()
+
+def test_websocket_feed_offline():
+    """離線測試WebSocket訂閱器"""
+    asyncio.run(run_feed_scenario())
+
+async def run_stale_ticker_scenario():
+    feed = MaxWebSocketFeed(['btctwd'], ticker_max_age=0.1)
+    ticker = {'symbol': 'BTCTWD', 'price': 100.0, 'volume': 1.0, 'high': 101.0, 'low': 99.0,
+              'timestamp': pd.Timestamp.now().to_pydatetime()}
+    await feed._emit({'channel': 'ticker', 'market': 'btctwd', 'data': ticker, 'source': 'ws'})
+    assert feed.latest_ticker('btctwd') == ticker
+    
+    # 連線沉寂超過最長時間後不再回傳舊價格（呼叫端改用REST）
+    await asyncio.sleep(0.15)
+    assert feed.latest_ticker('btctwd') is None
+    assert feed.latest_ticker('ethtwd') is None
+    print("✅ 過期的最新價格回傳None")
+
+def test_stale_ticker_expires():
+    asyncio.run(run_stale_ticker_scenario())
+
+def test_timestamps_are_utc_naive():
+    ms = 1_700_000_000_000
+    # 以非UTC的本機時區解析（POSIX才能切換時區）
+    original_tz = os.environ.get('TZ')
+    os.environ['TZ'] = 'Asia/Taipei'
+    if hasattr(time, 'tzset'):
+        time.tzset()
+    try:
+        trade, = parse_ws_message({'c': 'trade', 'M': 'btctwd', 't': [{'p': '100', 'v': '1', 'tr': 'buy', 'T': ms}]})
+        kline, = parse_ws_message({'c': 'kline', 'M': 'btctwd', 'k': {
+            'ST': ms, 'R': '1m', 'O': '1', 'H': '2', 'L': '0.5', 'C': '1.5', 'v': '3', 'x': True}})
+    finally:
+        if original_tz is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = original_tz
+        if hasattr(time, 'tzset'):
+            time.tzset()
+    
+    # 成交與K線時間皆為不含時區的UTC，與REST解碼器一致（不受本機時區影響）
+    rest = decode_klines([[ms // 1000, 1, 2, 0.5, 1.5, 3]]).to_dataframe()['timestamp'].iloc[0]
+    assert trade['data']['timestamp'] == kline['data']['timestamp'] == rest.to_pydatetime()
+    assert trade['data']['timestamp'].tzinfo is None
+    print("✅ 成交與K線時間皆為UTC")
+
+if __name__ == "__main__":
+    test_websocket_feed_offline()
+    test_stale_ticker_expires()
+    test_timestamps_are_utc_naive()
+    print("🎉 WebSocket訂閱器測試通過")
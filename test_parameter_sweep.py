@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試警報參數掃描（離線）
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+import pytest
+
+from advanced_crypto_analyzer import AdvancedCryptoAnalyzer
+from backtester import AlertBacktester
+from parameter_sweep import ParameterSweep, grid_configs, random_configs, rank_results, split_params
+from synthetic_data import random_ohlcv
+
+logging.getLogger('AdvancedCryptoAnalyzer').setLevel(logging.WARNING)
+
+def test_configs_and_params():
+    space = {'analyzer.rsi_oversold': [25, 30, 35], 'cooldown_period': [300, 900]}
+    assert len(grid_configs(space)) == 6
+    
+    space['analyzer.bb_std'] = {'low': 1.5, 'high': 3.0}
+    samples = random_configs(space, 20, seed=4)
+    assert samples == random_configs(space, 20, seed=4) and len(samples) == 20
+    assert all(1.5 <= params['analyzer.bb_std'] <= 3.0 for params in samples)
+    assert len(random_configs({'cooldown_period': [300, 900]}, 10, seed=1)) == 2  # 重複組合只保留一次
+    
+    analyzer_config, rules = split_params({'analyzer.rsi_overbought': 75, 'rsi_overbought': 85})
+    assert analyzer_config == {'rsi_overbought': 75} and rules == {'rsi_overbought': 85}
+    with pytest.raises(ValueError):
+        split_params({'macd': 20})
+    with pytest.raises(ValueError):
+        rank_results([], metric='fees')
+    print("✅ 網格/隨機參數與參數分類正確")
+
+def test_sweep_matches_backtester():
+    df = random_ohlcv(1500, seed=9)
+    configs = grid_configs({
+        'analyzer.rsi_oversold': [30, 45],
+        'analyzer.bb_std': [2, 1.5],
+        'ai_signal_field': ['recommendation', 'signal'],
+        'cooldown_period': [300, 1800]
+    })
+    report = ParameterSweep(workers=2).run(df, 1, configs, min_trades=0)
+    assert report['evaluated'] == len(configs) == len(report['results'])
+    
+    # 每組結果與單獨執行 AlertBacktester 相同
+    for record in report['results']:
+        analyzer_config, rules = split_params(record['params'])
+        analyzer = AdvancedCryptoAnalyzer()
+        analyzer.config.update(analyzer_config)
+        expected = AlertBacktester(rules, analyzer=analyzer).run(df, 1)
+        summary = record['summary']
+        assert {key: summary[key] for key in expected['summary']} == expected['summary'], record['key']
+        assert summary['alerts_suppressed'] == expected['alerts']['suppressed']
+    
+    returns = [record['summary']['return_pct'] for record in report['results']]
+    assert returns == sorted(returns, reverse=True)
+    assert len({record['summary']['pnl'] for record in report['results']}) > 1
+    print(f"✅ {len(configs)} 組平行回測與逐組回測相同，最佳報酬 {returns[0]:.2f}%")
+
+def test_checkpoint_resume():
+    df = random_ohlcv(800, seed=5)
+    first = grid_configs({'signal_strength_threshold': [60, 85], 'cooldown_period': [300, 900]})
+    more = grid_configs({'signal_strength_threshold': [60, 85, 70], 'cooldown_period': [300, 900]})
+    sweep = ParameterSweep(workers=2)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'sweep.jsonl')
+        report = sweep.run(df, 1, first, checkpoint=path, min_trades=0)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"key": "中斷')  # 寫到一半的最後一行
+        
+        resumed = sweep.run(df, 1, more, checkpoint=path, min_trades=0)
+        assert (resumed['resumed'], resumed['evaluated']) == (4, 2)
+        previous = {record['key']: record['summary'] for record in report['results']}
+        assert all(record['summary'] == previous[record['key']]
+                   for record in resumed['results'] if record['key'] in previous)
+        
+        # 不同K線或交易成本不使用檢查點
+        other = ParameterSweep(fee_rate=0.001, workers=2).run(df, 1, first, checkpoint=path)
+        assert other['evaluated'] == 4
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert sum(1 for line in lines if line.startswith('{"key": "{')) == 10
+        assert json.loads(lines[-1])['run']['fee_rate'] == 0.001
+    print("✅ 檢查點續跑只計算未完成的組合")
+
+if __name__ == "__main__":
+    print("🧪 警報參數掃描測試")
+    print("=" * 40)
+    test_configs_and_params()
+    test_sweep_matches_backtester()
+    test_checkpoint_resume()
+    print("\n🎉 全部通過")
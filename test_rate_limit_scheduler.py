@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試限流排程器：優先級、Retry-After暫停、退避上限與同步/非同步令牌桶（離線，假時鐘）
+"""
+
+import asyncio
+
+from rate_limit_scheduler import PRIORITY_BACKGROUND, PRIORITY_URGENT, RateLimitScheduler
+
+class FakeClock:
+    """以等待時間推進的假時鐘"""
+    
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+    
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+        await asyncio.sleep(0)
+
+def make_scheduler(rate_limits, **kwargs):
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(rate_limits=rate_limits, clock=clock, sleep=clock.sleep,
+                                   async_sleep=clock.async_sleep, **kwargs)
+    return scheduler, clock
+
+def test_urgent_before_background():
+    scheduler, clock = make_scheduler({'global': (1.0, 1), 'ticker': (100.0, 100), 'kline': (100.0, 100)})
+    order = []
+    
+    async def request(endpoint, priority):
+        await scheduler.acquire_async(endpoint, priority)
+        order.append(endpoint)
+    
+    async def scenario():
+        await scheduler.acquire_async('ticker')  # 用掉整體上限的唯一令牌
+        background = asyncio.create_task(request('kline', PRIORITY_BACKGROUND))
+        await asyncio.sleep(0)
+        urgent = asyncio.create_task(request('ticker', PRIORITY_URGENT))
+        await asyncio.gather(background, urgent)
+    
+    asyncio.run(scenario())
+    # 背景請求先排隊，但令牌補充後由互動請求先取得
+    assert order == ['ticker', 'kline']
+    assert scheduler.get_metrics()['queue_depth'] == 0
+    print("✅ 互動請求優先於背景K線更新")
+
+def test_retry_after_pauses_endpoint():
+    scheduler, clock = make_scheduler({'global': (100.0, 100), 'kline': (100.0, 100), 'ticker': (100.0, 100)})
+    assert scheduler.on_throttled('kline', 0, '3') == 3.0
+    
+    # 其他端點不受影響
+    assert scheduler.acquire('ticker') == 0
+    waited = scheduler.acquire('kline')
+    assert 3.0 <= waited < 3.0 + scheduler.POLL_INTERVAL + 1e-9
+    assert max(clock.sleeps) <= scheduler.POLL_INTERVAL
+    assert scheduler.get_metrics()['throttled'] == 1
+    print("✅ Retry-After 暫停該類端點")
+
+def test_backoff_capped():
+    scheduler, _ = make_scheduler(None, base_backoff=1.0, max_backoff=10.0)
+    for attempt in range(30):
+        delay = scheduler.backoff_delay(attempt)
+        assert 0 < delay <= 10.0
+    assert all(5.0 <= scheduler.backoff_delay(20) <= 10.0 for _ in range(50))
+    assert scheduler.backoff_delay(0, '999') == 10.0
+    assert scheduler.backoff_delay(0, '-5') == 0.0
+    # 無法解析的 Retry-After 改用指數退避
+    assert 0.5 <= scheduler.backoff_delay(0, 'soon') <= 1.0
+    print("✅ 退避時間有上限")
+
+def test_sync_respects_bucket():
+    scheduler, clock = make_scheduler({'global': (100.0, 100), 'kline': (2.0, 2)})
+    assert scheduler.acquire('kline') == 0
+    assert scheduler.acquire('kline') == 0
+    # 桶已空：第三個請求需等待補充一個令牌（0.5秒）
+    waited = scheduler.acquire('kline')
+    assert 0.5 - 1e-9 <= waited < 0.5 + scheduler.POLL_INTERVAL
+    assert clock.sleeps
+    print("✅ 同步路徑遵守令牌桶")
+
+def test_async_respects_bucket():
+    scheduler, clock = make_scheduler({'global': (100.0, 100), 'kline': (2.0, 2)})
+    
+    async def scenario():
+        return await asyncio.gather(*(scheduler.acquire_async('kline') for _ in range(4)))
+    
+    start = clock.now
+    waits = asyncio.run(scenario())
+    waits = sorted(waits)
+    assert waits[:2] == [0, 0]
+    # 4個請求、容量2、每秒補充2個：第三個至少等0.5秒，全部完成至少需1秒
+    assert waits[2] >= 0.5 - 1e-9 and waits[3] > waits[2]
+    assert clock.now - start >= 1.0 - 1e-9
+    assert scheduler.get_metrics()['requests'] == 4
+    print("✅ 非同步路徑遵守令牌桶")
+
+if __name__ == "__main__":
+    print("🧪 限流排程器測試")
+    print("=" * 40)
+    test_urgent_before_background()
+    test_retry_after_pauses_endpoint()
+    test_backoff_capped()
+    test_sync_respects_bucket()
+    test_async_respects_bucket()
+    print("\n🎉 全部通過")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試API請求合併器：單飛、TTL快取、例外傳遞與asyncio取消（離線）
+"""
+
+import asyncio
+import threading
+import time
+
+from request_coalescer import RequestCoalescer
+
+def test_threads_share_one_call():
+    coalescer = RequestCoalescer(ttl=0)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'price': 1.0}
+    
+    results = []
+    leader = threading.Thread(target=lambda: results.append(coalescer.call('ticker', fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(coalescer.call('ticker', fetch)))
+                 for _ in range(8)]
+    for thread in followers:
+        thread.start()
+    while coalescer.stats['coalesced'] < 8:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    
+    assert len(calls) == 1 and len(results) == 9
+    assert all(result == {'price': 1.0} for result in results)
+    # 每個呼叫者拿到各自的副本
+    assert len({id(result) for result in results}) == 9
+    assert coalescer.get_stats()['in_flight'] == 0
+    print("✅ 多執行緒的相同請求只呼叫一次")
+
+def test_ttl_expiry():
+    coalescer = RequestCoalescer(ttl=0.05)
+    calls = []
+    fetch = lambda: calls.append(1) or len(calls)
+    assert coalescer.call('k', fetch) == 1
+    assert coalescer.call('k', fetch) == 1  # TTL內直接回傳快取
+    time.sleep(0.06)
+    assert coalescer.call('k', fetch) == 2
+    
+    # 失敗結果(None)不快取
+    assert coalescer.call('none', lambda: calls.append(1)) is None
+    assert coalescer.call('none', lambda: 'ok') == 'ok'
+    coalescer.invalidate('k')
+    assert coalescer.call('k', fetch) == 4
+    print("✅ TTL到期後重新呼叫，失敗結果不快取")
+
+def test_exception_reaches_all_waiters():
+    coalescer = RequestCoalescer(ttl=10)
+    started = threading.Event()
+    release = threading.Event()
+    
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ConnectionError("boom")
+    
+    errors = []
+    def run():
+        try:
+            coalescer.call('k', failing)
+        except ConnectionError as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=run)]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads[1:]:
+        thread.start()
+    while coalescer.stats['coalesced'] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert len(errors) == 4
+    # 例外不快取，下一次呼叫重新執行
+    assert coalescer.call('k', lambda: 'recovered') == 'recovered'
+    print("✅ 例外傳給所有等待者且不快取")
+
+def test_async_single_flight_and_cancel():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl=0)
+        calls = []
+        
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return [len(calls)]
+        
+        results = await asyncio.gather(*(coalescer.call_async('k', fetch) for _ in range(5)))
+        assert results == [[1]] * 5 and len(calls) == 1
+        
+        # 發出請求的協程被取消：等待者不會收到取消，而是重新發出請求
+        leader = asyncio.create_task(coalescer.call_async('k', fetch))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(coalescer.call_async('k', fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        assert leader.cancelled()
+        assert results == [[3]] * 3 and len(calls) == 3
+        
+        # 等待者本身被取消不影響其他呼叫者
+        leader = asyncio.create_task(coalescer.call_async('k', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(coalescer.call_async('k', fetch))
+        await asyncio.sleep(0)
+        follower.cancel()
+        assert await leader == [4]
+        assert follower.cancelled()
+        assert coalescer.get_stats()['in_flight'] == 0
+    
+    asyncio.run(scenario())
+    print("✅ asyncio單飛與取消")
+
+def test_async_separate_event_loops():
+    coalescer = RequestCoalescer(ttl=0)
+    started = threading.Event()
+    
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.05)
+        return 'loop-a'
+    
+    async def fast():
+        return 'loop-b'
+    
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(a=asyncio.run(coalescer.call_async('k', slow))))
+    thread.start()
+    started.wait(5)
+    # 另一個事件迴圈的相同請求不會等待屬於其他事件迴圈的Future
+    results['b'] = asyncio.run(coalescer.call_async('k', fast))
+    thread.join(5)
+    assert results == {'a': 'loop-a', 'b': 'loop-b'}
+    print("✅ 不同事件迴圈各自發出請求")
+
+if __name__ == "__main__":
+    print("🧪 請求合併器測試")
+    print("=" * 40)
+    test_threads_share_one_call()
+    test_ttl_expiry()
+    test_exception_reaches_all_waiters()
+    test_async_single_flight_and_cancel()
+    test_async_separate_event_loops()
+    print("\n🎉 全部通過")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試串流式指標與 ta 批次計算的一致性（離線）
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import ta
+
+from streaming_indicators import StreamingEMA, StreamingMACD, StreamingRSI, StreamingMACDTracker
+
+def random_closes(n=500, seed=7):
+    rng = np.random.default_rng(seed)
+    return 3_000_000 + np.cumsum(rng.normal(0, 3000, n))
+
+def batch_reference(closes):
+    close = pd.Series(closes)
+    macd = ta.trend.MACD(close=close, window_fast=12, window_slow=26, window_sign=9)
+    return pd.DataFrame({
+        'ema_12': ta.trend.EMAIndicator(close=close, window=12).ema_indicator(),
+        'ema_26': ta.trend.EMAIndicator(close=close, window=26).ema_indicator(),
+        'macd': macd.macd(),
+        'macd_signal': macd.macd_signal(),
+        'macd_histogram': macd.macd_diff(),
+        'rsi': ta.momentum.RSIIndicator(close=close, window=14).rsi()
+    })
+
+def assert_close(actual, expected, label):
+    if math.isnan(expected):
+        assert math.isnan(actual), f"{label}: 應為NaN，實際為 {actual}"
+    else:
+        assert math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-7), f"{label}: {actual} != {expected}"
+
+def test_parity_with_ta():
+    closes = random_closes()
+    expected = batch_reference(closes)
+    ema12, ema26 = StreamingEMA(12), StreamingEMA(26)
+    macd, rsi = StreamingMACD(), StreamingRSI(14)
+    
+    for i, close in enumerate(closes):
+        assert_close(ema12.update(close), expected['ema_12'][i], f"ema12[{i}]")
+        assert_close(ema26.update(close), expected['ema_26'][i], f"ema26[{i}]")
+        values = macd.update(close)
+        for key in ('macd', 'macd_signal', 'macd_histogram'):
+            assert_close(values[key], expected[key][i], f"{key}[{i}]")
+        assert_close(rsi.update(close), expected['rsi'][i], f"rsi[{i}]")
+    print("✅ 逐根更新與 ta 一致")
+
+def test_revise_open_bar():
+    closes = random_closes(300)
+    expected = batch_reference(closes)
+    rng = np.random.default_rng(1)
+    macd, rsi = StreamingMACD(), StreamingRSI(14)
+    
+    for i, close in enumerate(closes):
+        # 形成中K線多次修正，最後以收盤價定案
+        macd.update(close + rng.normal(0, 5000))
+        rsi.update(close + rng.normal(0, 5000))
+        for _ in range(3):
+            tick = close + rng.normal(0, 5000)
+            macd.revise(tick)
+            rsi.revise(tick)
+        values = macd.revise(close)
+        assert_close(values['macd_signal'], expected['macd_signal'][i], f"signal[{i}]")
+        assert_close(rsi.revise(close), expected['rsi'][i], f"rsi[{i}]")
+    print("✅ 形成中K線修正後與 ta 一致")
+
+def test_snapshot_restore():
+    closes = random_closes(400)
+    expected = batch_reference(closes)
+    timestamps = pd.date_range('2024-01-01', periods=len(closes), freq='h')
+    df = pd.DataFrame({'timestamp': timestamps, 'close': closes})
+    
+    tracker = StreamingMACDTracker()
+    tracker.sync(df.iloc[:250])
+    state = json.loads(json.dumps(tracker.snapshot()))
+    
+    # 重啟後只需傳入最後一根（形成中）之後的資料
+    restored = StreamingMACDTracker.restore(state)
+    row = restored.sync(df.iloc[249:])
+    for key in expected.columns:
+        assert_close(row[key], expected[key].iloc[-1], key)
+        assert_close(restored.previous[key], expected[key].iloc[-2], f"previous {key}")
+    assert restored.ready
+    print("✅ 快照還原後無需預熱")
+
+if __name__ == "__main__":
+    print("🧪 串流指標測試")
+    print("=" * 40)
+    test_parity_with_ta()
+    test_revise_open_bar()
+    test_snapshot_restore()
+    print("\n🎉 全部通過")
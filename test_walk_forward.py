@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試警報參數的滾動前進最佳化（離線）
+"""
+
+import logging
+
+import numpy as np
+import pytest
+
+from advanced_crypto_analyzer import MIN_ANALYSIS_ROWS, AdvancedCryptoAnalyzer
+from backtester import AlertBacktester, close_times
+from indicator_engine import warmup_rows
+from parameter_sweep import ParameterSweep, grid_configs, rank_results, split_params
+from synthetic_data import random_ohlcv
+from walk_forward import WalkForwardOptimizer, walk_forward_windows
+
+logging.getLogger('AdvancedCryptoAnalyzer').setLevel(logging.WARNING)
+
+def window_backtest(df, params, window, base_rules=None):
+    """以整段K線計算警報後只取區間內的部分，自區間起點空手回測"""
+    analyzer_config, rules = split_params(params)
+    analyzer = AdvancedCryptoAnalyzer()
+    analyzer.config.update(analyzer_config)
+    backtester = AlertBacktester({**(base_rules or {}), **rules}, analyzer=analyzer)
+    candidates = backtester.alert_candidates(df)
+    lo, hi = window
+    candidates = candidates[(candidates['position'] >= lo) & (candidates['position'] < hi)].reset_index(drop=True)
+    sent = candidates.iloc[backtester.filter_alerts(candidates, close_times(df, 1))]
+    return backtester.simulate(df.iloc[lo:hi], sent.assign(position=sent['position'] - lo))['summary']
+
+def test_windows():
+    assert walk_forward_windows(100, 40, 20) == [(0, 40, 40, 60), (20, 60, 60, 80), (40, 80, 80, 100)]
+    assert walk_forward_windows(100, 40, 20, step_bars=30, start=5) == [(5, 45, 45, 65), (35, 75, 75, 95)]
+    assert walk_forward_windows(100, 40, 20, anchored=True)[-1] == (0, 80, 80, 100)
+    assert walk_forward_windows(50, 40, 20) == []
+    with pytest.raises(ValueError):
+        walk_forward_windows(100, 0, 20)
+    print("✅ 滾動/固定起點的訓練與測試區間正確")
+
+def test_walk_forward_matches_window_backtests():
+    df = random_ohlcv(2400, seed=9)
+    configs = grid_configs({
+        'analyzer.rsi_oversold': [30, 45],
+        'ai_signal_field': ['recommendation', 'signal'],
+        'cooldown_period': [300, 1800]
+    })
+    optimizer = WalkForwardOptimizer(600, 300, metric='return_pct', min_trades=1, sweep=ParameterSweep(workers=2))
+    report = optimizer.run(df, 1, configs)
+    assert report is not None and len(report['folds']) == report['out_of_sample']['folds'] >= 5
+    # 區間自第一列綜合分析結果開始（指標預熱 + MIN_ANALYSIS_ROWS）
+    windows = walk_forward_windows(len(df), 600, 300, start=warmup_rows() + MIN_ANALYSIS_ROWS - 1)
+    assert [fold['test'][0] for fold in report['folds']] == [str(df['timestamp'].iloc[w[2]]) for w in windows]
+    
+    for fold, (train_lo, train_hi, test_lo, test_hi) in zip(report['folds'], windows):
+        # 訓練區間選出的參數確實是全部組合中的最佳者
+        in_sample = [{'key': str(i), 'params': params, 'summary': window_backtest(df, params, (train_lo, train_hi))}
+                     for i, params in enumerate(configs)]
+        best = rank_results(in_sample, 'return_pct', 1)[0]
+        assert fold['in_sample']['return_pct'] == best['summary']['return_pct']
+        # 測試區間與逐區間回測相同（重用整段歷史的指標）
+        expected = window_backtest(df, fold['params'], (test_lo, test_hi))
+        assert {key: fold['out_of_sample'][key] for key in expected} == expected
+        assert fold['baseline']['return_pct'] == window_backtest(df, {}, (test_lo, test_hi))['return_pct']
+    
+    returns = [fold['out_of_sample']['return_pct'] / 100 for fold in report['folds']]
+    assert np.isclose(report['out_of_sample']['return_pct'], (np.prod(np.add(returns, 1)) - 1) * 100)
+    print(f"✅ {len(windows)} 個區間 × {len(configs)} 組參數與逐區間回測相同："
+          f"樣本外 {report['out_of_sample']['return_pct']:.2f}%，基準 {report['baseline']['return_pct']:.2f}%")
+
+def test_insufficient_history():
+    df = random_ohlcv(400, seed=5)
+    optimizer = WalkForwardOptimizer(600, 300, sweep=ParameterSweep(workers=1))
+    assert optimizer.run(df, 1, grid_configs({'cooldown_period': [300, 900]})) is None
+    with pytest.raises(ValueError):
+        WalkForwardOptimizer(600, 300, metric='fees')
+    print("✅ K線不足時回傳None")
+
+if __name__ == "__main__":
+    print("🧪 滾動前進最佳化測試")
+    print("=" * 40)
+    test_windows()
+    test_walk_forward_matches_window_backtests()
+    test_insufficient_history()
+    print("\n🎉 全部通過")
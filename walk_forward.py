@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+警報參數的滾動前進（walk-forward）最佳化與樣本外評估
+將本地保存的K線切成連續的訓練/測試區間：每個訓練區間以 parameter_sweep 的參數組合回測並選出最佳參數，
+再以該組參數回測緊接在後的測試區間；串接全部測試區間的結果即為樣本外績效，
+並與未調整的預設參數（基準）比較，用來檢查 comprehensive_analysis 的手調分數是否過度擬合
+
+指標與綜合分析對整段K線只計算一次（每組 analyzer 設定一份，放在共享記憶體），
+各訓練/測試區間直接取用對應的片段，全部區間一起送入工作程序池平行回測。
+每個區間自空手開始，但指標沿用區間之前的歷史，與線上監控持續運作時相同
+
+使用方式：
+    python walk_forward.py --market btctwd --period 1 --days 180 --train-days 30 --test-days 7 \\
+        --grid "analyzer.rsi_oversold=25,30,35" --grid "cooldown_period=300,900,1800"
+    python walk_forward.py --period 15 --train-days 60 --test-days 15 --anchored \\
+        --samples 100 --range "analyzer.bb_std=1.5:3" --metric return_to_drawdown --output wf.json
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester import DEFAULT_CAPITAL, DEFAULT_FEE_RATE, DEFAULT_SLIPPAGE, load_candles, load_monitor_rules
+from config import CANDLE_STORE_DIR
+from parameter_sweep import RANK_METRICS, ParameterSweep, build_configs, config_key, rank_results, split_params
+
+# 基準：不調整任何參數（監控設定檔的警報規則與 AdvancedCryptoAnalyzer 的預設設定）
+BASELINE_PARAMS: Dict = {}
+
+def walk_forward_windows(bars: int, train_bars: int, test_bars: int, step_bars: int = None,
+                         anchored: bool = False, start: int = 0) -> List[Tuple[int, int, int, int]]:
+    """滾動的 (訓練起點, 訓練終點, 測試起點, 測試終點) K線位置（終點不含）
+    
+    測試區間每次前進 step_bars（預設等於 test_bars，測試區間首尾相接不重疊）；
+    anchored 時訓練區間固定自 start 開始逐步擴大，否則為緊接在測試區間前的 train_bars 根
+    """
+    if train_bars <= 0 or test_bars <= 0:
+        raise ValueError("訓練與測試區間必須大於0根K線")
+    step_bars = step_bars or test_bars
+    windows = []
+    test_lo = start + train_bars
+    while test_lo + test_bars <= bars:
+        windows.append((start if anchored else test_lo - train_bars, test_lo, test_lo, test_lo + test_bars))
+        test_lo += step_bars
+    return windows
+
+def summarize_folds(summaries: List[Dict]) -> Dict:
+    """串接各測試區間的回測摘要：報酬以複利連乘，最大回撤取最差的區間"""
+    if not summaries:
+        return {'folds': 0}
+    returns = np.array([summary['return_pct'] for summary in summaries]) / 100
+    buy_and_hold = np.array([summary['buy_and_hold_pct'] for summary in summaries]) / 100
+    trades = sum(summary['trades'] for summary in summaries)
+    wins = sum(summary['wins'] for summary in summaries)
+    return {
+        'folds': len(summaries),
+        'return_pct': float(np.prod(1 + returns) - 1) * 100,
+        'mean_return_pct': float(returns.mean()) * 100,
+        'positive_folds': int((returns > 0).sum()),
+        'trades': trades,
+        'hit_rate': wins / trades if trades else 0.0,
+        'worst_drawdown_pct': float(min(summary['max_drawdown_pct'] for summary in summaries)),
+        'fees': float(sum(summary['fees'] for summary in summaries)),
+        'buy_and_hold_pct': float(np.prod(1 + buy_and_hold) - 1) * 100
+    }
+
+class WalkForwardOptimizer:
+    """滾動訓練/測試區間的參數最佳化與樣本外評估"""
+    
+    def __init__(self, train_bars: int, test_bars: int, step_bars: int = None, anchored: bool = False,
+                 metric: str = 'return_pct', min_trades: int = 1, sweep: ParameterSweep = None):
+        if metric not in RANK_METRICS:
+            raise ValueError(f"不支援的排名指標: {metric}（可用 {', '.join(RANK_METRICS)}）")
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.step_bars = step_bars
+        self.anchored = anchored
+        self.metric = metric
+        self.min_trades = min_trades
+        self.sweep = sweep or ParameterSweep()
+        self.logger = logging.getLogger('WalkForwardOptimizer')
+    
+    def run(self, df: pd.DataFrame, period: int, configs: List[Dict]) -> Optional[Dict]:
+        """執行滾動最佳化，回傳各區間的最佳參數、樣本內/樣本外績效與基準比較"""
+        try:
+            started = time.perf_counter()
+            df = df.reset_index(drop=True)
+            candidates = {config_key(params): params for params in configs}
+            params_by_key = {**candidates, config_key(BASELINE_PARAMS): BASELINE_PARAMS}
+            for params in params_by_key.values():
+                split_params(params)
+            analyzer_configs, assigned = self.sweep.assign_slots(params_by_key)
+            
+            with self.sweep.session(df, period, analyzer_configs) as session:
+                # 區間自全部設定都有綜合分析結果的位置開始
+                start = session.first_position
+                if start is None:
+                    self.logger.warning("K線不足，無法進行滾動最佳化")
+                    return None
+                windows = walk_forward_windows(len(df), self.train_bars, self.test_bars, self.step_bars,
+                                               self.anchored, start)
+                if not windows:
+                    self.logger.warning(f"K線不足以切出訓練 {self.train_bars} + 測試 {self.test_bars} 根的區間")
+                    return None
+                
+                # 1. 全部訓練區間 × 全部參數組合一起平行回測
+                in_sample = defaultdict(list)
+                tasks = [((fold, key), *assigned[key], (train_lo, train_hi))
+                         for fold, (train_lo, train_hi, _, _) in enumerate(windows) for key in candidates]
+                for (fold, key), summary in session.run(tasks):
+                    in_sample[fold].append({'key': key, 'params': candidates[key], 'summary': summary})
+                
+                # 2. 各區間的最佳參數（沒有組合達到最少交易數時沿用基準）回測下一段測試區間，基準一併回測
+                chosen = {}
+                for fold in range(len(windows)):
+                    ranked = rank_results(in_sample[fold], self.metric, self.min_trades)
+                    chosen[fold] = ranked[0] if ranked else None
+                baseline_key = config_key(BASELINE_PARAMS)
+                tasks = []
+                for fold, (_, _, test_lo, test_hi) in enumerate(windows):
+                    best_key = chosen[fold]['key'] if chosen[fold] else baseline_key
+                    tasks.append(((fold, 'optimized'), *assigned[best_key], (test_lo, test_hi)))
+                    tasks.append(((fold, 'baseline'), *assigned[baseline_key], (test_lo, test_hi)))
+                out_of_sample = {tag: summary for tag, summary in session.run(tasks)}
+            
+            timestamps = df['timestamp']
+            folds = []
+            for fold, (train_lo, train_hi, test_lo, test_hi) in enumerate(windows):
+                best = chosen[fold]
+                folds.append({
+                    'fold': fold,
+                    'train': [str(timestamps.iloc[train_lo]), str(timestamps.iloc[train_hi - 1])],
+                    'test': [str(timestamps.iloc[test_lo]), str(timestamps.iloc[test_hi - 1])],
+                    'params': best['params'] if best else BASELINE_PARAMS,
+                    'in_sample': best['summary'] if best else None,
+                    'out_of_sample': out_of_sample[(fold, 'optimized')],
+                    'baseline': out_of_sample[(fold, 'baseline')]
+                })
+            
+            optimized = summarize_folds([fold['out_of_sample'] for fold in folds])
+            chosen_in_sample = [fold['in_sample'] for fold in folds if fold['in_sample']]
+            in_sample_mean = float(np.mean([summary['return_pct'] for summary in chosen_in_sample])) \
+                if chosen_in_sample else 0.0
+            # 樣本外每根K線報酬相對於樣本內的比例：遠低於1表示參數過度擬合訓練區間
+            train_bars = float(np.mean([train_hi - train_lo for train_lo, train_hi, _, _ in windows]))
+            efficiency = (optimized['mean_return_pct'] / self.test_bars) / (in_sample_mean / train_bars) \
+                if in_sample_mean > 0 else None
+            
+            seconds = time.perf_counter() - started
+            report = {
+                'bars': len(df),
+                'period': period,
+                'start': str(timestamps.iloc[0]),
+                'end': str(timestamps.iloc[-1]),
+                'train_bars': self.train_bars,
+                'test_bars': self.test_bars,
+                'step_bars': self.step_bars or self.test_bars,
+                'anchored': self.anchored,
+                'metric': self.metric,
+                'configs': len(candidates),
+                'backtests': len(candidates) * len(windows) + 2 * len(windows),
+                'workers': self.sweep.workers,
+                'folds': folds,
+                'out_of_sample': optimized,
+                'baseline': summarize_folds([fold['baseline'] for fold in folds]),
+                'in_sample_mean_return_pct': in_sample_mean,
+                'walk_forward_efficiency': efficiency,
+                'seconds': seconds
+            }
+            self.logger.info(f"🚶 滾動最佳化 {len(windows)} 個區間 × {len(candidates)} 組參數，耗時 {seconds:.1f} 秒："
+                             f"樣本外報酬 {optimized['return_pct']:.2f}%，基準 {report['baseline']['return_pct']:.2f}%")
+            return report
+        
+        except Exception as e:
+            self.logger.error(f"❌ 滾動最佳化失敗: {e}")
+            return None
+
+def print_report(report: Dict):
+    optimized, baseline = report['out_of_sample'], report['baseline']
+    print(f"📊 {report['start']} ~ {report['end']}（{report['bars']} 根 {report['period']} 分鐘K線）")
+    print(f"🚶 {optimized['folds']} 個區間（訓練 {report['train_bars']} / 測試 {report['test_bars']} 根"
+          f"{'，訓練起點固定' if report['anchored'] else ''}），{report['configs']} 組參數，"
+          f"{report['backtests']} 次回測，{report['workers']} 個程序 {report['seconds']:.1f} 秒")
+    for fold in report['folds']:
+        in_sample = fold['in_sample']
+        print(f"   #{fold['fold']} 測試 {fold['test'][0]} ~ {fold['test'][1]}："
+              f"樣本內 {in_sample['return_pct'] if in_sample else 0:.2f}% → 樣本外 {fold['out_of_sample']['return_pct']:.2f}%"
+              f"（基準 {fold['baseline']['return_pct']:.2f}%） {fold['params']}")
+    print(f"💰 樣本外報酬 {optimized['return_pct']:.2f}%（{optimized['positive_folds']}/{optimized['folds']} 區間獲利），"
+          f"基準 {baseline['return_pct']:.2f}%，買進持有 {optimized['buy_and_hold_pct']:.2f}%")
+    print(f"🎯 樣本外交易 {optimized['trades']} 筆，勝率 {optimized['hit_rate']:.1%}，"
+          f"最差區間回撤 {optimized['worst_drawdown_pct']:.2f}%")
+    efficiency = report['walk_forward_efficiency']
+    print(f"📐 樣本內平均報酬 {report['in_sample_mean_return_pct']:.2f}%，"
+          f"滾動效率 {'N/A' if efficiency is None else f'{efficiency:.2f}'}")
+
+def main():
+    parser = argparse.ArgumentParser(description='警報參數滾動前進最佳化')
+    parser.add_argument('--market', default='btctwd')
+    parser.add_argument('--period', type=int, default=1, help='K線週期（分鐘）')
+    parser.add_argument('--candle-store', default=CANDLE_STORE_DIR, help='CandleStore 目錄')
+    parser.add_argument('--recording', help='MAX API錄製檔')
+    parser.add_argument('--days', type=float, help='只使用最後幾天')
+    parser.add_argument('--train-days', type=float, required=True, help='訓練區間天數')
+    parser.add_argument('--test-days', type=float, required=True, help='測試區間天數')
+    parser.add_argument('--step-days', type=float, help='測試區間每次前進的天數（預設等於測試區間）')
+    parser.add_argument('--anchored', action='store_true', help='訓練區間固定自最早的K線開始')
+    parser.add_argument('--config', help='監控設定檔（未掃描的警報規則與基準以此為準）')
+    parser.add_argument('--grid', action='append', default=[], help='候選值，例如 cooldown_period=300,900')
+    parser.add_argument('--range', action='append', default=[], help='隨機抽樣區間，例如 analyzer.bb_std=1.5:3')
+    parser.add_argument('--samples', type=int, help='隨機抽樣組數（未指定時為網格搜尋）')
+    parser.add_argument('--seed', type=int, help='隨機抽樣種子')
+    parser.add_argument('--workers', type=int, help='工作程序數（預設為CPU核心數）')
+    parser.add_argument('--metric', default='return_pct', choices=RANK_METRICS, help='訓練區間的選擇指標')
+    parser.add_argument('--min-trades', type=int, default=1, help='訓練區間選入的最少交易數')
+    parser.add_argument('--fee', type=float, default=DEFAULT_FEE_RATE, help='單邊手續費率')
+    parser.add_argument('--slippage', type=float, default=DEFAULT_SLIPPAGE, help='滑價比例')
+    parser.add_argument('--capital', type=float, default=DEFAULT_CAPITAL, help='初始資金')
+    parser.add_argument('--output', help='報告JSON檔')
+    args = parser.parse_args()
+    
+    try:
+        configs = build_configs(args.grid, args.range, args.samples, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    df = load_candles(args.market, args.period, args.candle_store, args.recording, args.days)
+    if df is None:
+        print(f"❌ 找不到 {args.market} {args.period} 分鐘K線")
+        return
+    
+    bars_per_day = 1440 / args.period
+    base_rules = load_monitor_rules(args.config) if args.config else None
+    sweep = ParameterSweep(args.fee, args.slippage, args.capital, args.workers, base_rules)
+    optimizer = WalkForwardOptimizer(
+        int(args.train_days * bars_per_day), int(args.test_days * bars_per_day),
+        int(args.step_days * bars_per_day) if args.step_days else None,
+        args.anchored, args.metric, args.min_trades, sweep
+    )
+    report = optimizer.run(df, args.period, configs)
+    if report is None:
+        print("❌ 滾動最佳化失敗")
+        return
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"💾 報告已寫入 {args.output}")
+
+if __name__ == "__main__":
+    main()
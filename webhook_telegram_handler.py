@@ -158,7 +158,8 @@ class WebhookTelegramHandler:
             # AI技術分析
             self.logger.info("🔍 正在執行綜合多重技術指標分析...")
             tech_analysis = self.advanced_analyzer.comprehensive_analysis(
-                market_data['df'], price['current']
+                market_data['df'], price['current'],
+                market_data.get('symbol'), market_data.get('period')
             )
             
             # 綜合分析 - 結合技術面和新聞面